@@ -3,11 +3,15 @@ import pandas as pd
 from datetime import datetime
 from ipwhois import IPWhois
 from urllib.parse import urlparse
-from multiprocessing import Pool, cpu_count
-from tqdm import tqdm
 from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
 from sklearn.metrics import classification_report, accuracy_score
+from parallel_features import extract_features_matrix
+
+# 워커에 한 번에 보낼 URL 수
+# WHOIS/DNS 조회로 URL당 수백 ms가 걸려 프로세스 간 통신 비용은 무시할 만함 → 작게 나눠 워커 간 부하를 고르게
+# (정규식만 쓰는 추출은 parallel_features.MIN_CHUNK_SIZE 기본값 사용)
+CHUNK_SIZE = 64
 
 def safe_days(d) :
     try :
@@ -61,12 +65,6 @@ def extract_url_features(url) :
 
     return feature
 
-# 특징 병렬 추출
-# URL 개수가 많아 멀티코어 CPU 활용
-def extract_features_parallel(urls):
-    with Pool(cpu_count()) as pool:
-        return list(tqdm(pool.imap(extract_url_features, urls), total=len(urls), desc="Extracting Features"))
-    
 if __name__ == '__main__' :
     # 데이터 불러오기
     normal = pd.read_csv('정상url_10000.csv')
@@ -77,8 +75,9 @@ if __name__ == '__main__' :
     df = df.dropna(subset=['url']).drop_duplicates(subset=['url'])
 
     # Feature, Target 설정
-    features = extract_features_parallel(df['url'])
-    X = pd.DataFrame(features)
+    # 특징 병렬 추출 (청크 단위로 워커에 분배, 결과는 공유 메모리 행렬로 바로 기록)
+    features, columns = extract_features_matrix(df['url'], extract_url_features, chunk_size=CHUNK_SIZE)
+    X = pd.DataFrame(features, columns=columns)
     y = df['label'].astype(int)
 
     # 학습 데이터 및 테스트 데이터 분할
@@ -1,10 +1,12 @@
 import re, dns.resolver, pandas as pd
 from urllib.parse import urlparse
-from joblib import Parallel, delayed
-from tqdm import tqdm
 from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
 from sklearn.metrics import classification_report, accuracy_score
+from parallel_features import extract_features_matrix
+
+# 워커에 한 번에 보낼 URL 수 (DNS 조회가 URL당 최대 2초 → 작은 청크로 워커 간 부하를 고르게)
+CHUNK_SIZE = 64
 
 dns_cache = {}
 
@@ -52,13 +54,11 @@ if __name__ == '__main__' :
     df = pd.concat([normal, phishing], ignore_index=True)
     df = df.dropna(subset=['url']).drop_duplicates(subset=['url'])
 
-    # Feature 병렬 추출
-    features = Parallel(n_jobs=-1)(
-        delayed(extract_url_features)(url) for url in df['url']
-    )
+    # Feature 병렬 추출 (URL마다 작업을 보내지 않고 청크 단위로 워커에 분배)
+    features, columns = extract_features_matrix(df['url'], extract_url_features, chunk_size=CHUNK_SIZE)
 
     # Feature, Target 설정
-    X = pd.DataFrame(features)
+    X = pd.DataFrame(features, columns=columns)
     y = df['label'].astype(int)
 
     # 학습 데이터 및 테스트 데이터 분할
@@ -1,9 +1,9 @@
 import re, joblib, pandas as pd, numpy as np
 from urllib.parse import urlparse
-from tqdm import tqdm
 from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
 from sklearn.metrics import classification_report, accuracy_score
+from feature_store import load_features
 
 # 데이터 정규화
 def normalize_url(url):
@@ -11,6 +11,11 @@ def normalize_url(url):
     url = re.sub(r'^https?://', '', url)  # http:// 또는 https:// 제거
     return url
 
+# 정규식은 모듈 로드 시 한 번만 컴파일 (병렬 추출 시 워커 프로세스마다 한 번)
+IP_RE = re.compile(r'\d+\.\d+\.\d+\.\d+')       # IP 주소
+SPECIAL_CHAR_RE = re.compile(r'[^\w]')          # 특수문자
+DIGIT_RE = re.compile(r'\d')                    # 숫자
+
 # Feature 추출
 # 참고 자료 : https://archive.ics.uci.edu/dataset/327/phishing+websites
 def extract_url_features(url) :
@@ -25,11 +30,11 @@ def extract_url_features(url) :
     # 기본 URL 기반 Feature
     feature['url_length'] = int(len(url) > 75)                                      # URL 전체 문자열 길이
     feature['num_dots'] = np.log1p(url.count('.'))                                  # URL 내 점(.)의 개수
-    feature['has_ip'] = int(bool(re.search(r'\d+\.\d+\.\d+\.\d+', url)))            # IP 주소 포함 여부  
-    feature['num_special_chars'] = int(len(re.findall(r'[^\w]', url)) > 5)          # 특수문자 수 (@, ?, =, % 등)
+    feature['has_ip'] = int(bool(IP_RE.search(url)))                                # IP 주소 포함 여부  
+    feature['num_special_chars'] = int(len(SPECIAL_CHAR_RE.findall(url)) > 5)       # 특수문자 수 (@, ?, =, % 등)
     feature['has_at_symbol'] = int('@' in url)                                      # @ 기호 포함 여부
     feature['path_length'] = np.log1p(len(parsed.path))                             # URL 경로 길이
-    feature['num_digits'] = np.log1p(len(re.findall(r'\d', url)))                   # 숫자 개수
+    feature['num_digits'] = np.log1p(len(DIGIT_RE.findall(url)))                    # 숫자 개수
 
     return feature
     
@@ -48,11 +53,10 @@ if __name__ == '__main__' :
     # balanced.to_csv('data.csv', index=False, encoding='utf-8-sig')
     df = pd.read_csv('data.csv')
 
-    # 순차적 특징 추출
-    features = [extract_url_features(str(url)) for url in tqdm(df['url'].fillna(''), desc='Extracting Features')]
+    # 특징 추출 (feature_cache에 있는 URL은 건너뛰고 새 URL만 추출)
+    X = load_features(df['url'].fillna(''), extract_url_features)
 
     # Feature, Target 설정
-    X = pd.DataFrame(features)
     y = df['label'].astype(int)
 
     # 학습 데이터 및 테스트 데이터 분할
@@ -1,9 +1,19 @@
 import re, joblib, pandas as pd, numpy as np
 from urllib.parse import urlparse
-from tqdm import tqdm
 from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import classification_report, accuracy_score
+from feature_store import load_features
+from parallel_features import extract_features_matrix
+from calibration import threshold_sweep, save_model_meta
+
+MODEL_PATH = 'XGBoost_model.pkl'
+SWEEP_PATH = 'XGBoost_threshold_sweep.csv'
+
+# 운영 임계값 : 보정된 피싱 확률이 이 값 이상이면 악성으로 판정
+# XGBoost_threshold_sweep.csv 표를 보고 오탐(정상 → 악성)과 LLM 호출량 사이에서 조정
+OPERATING_THRESHOLD = 0.5
 
 # 데이터 정규화
 def normalize_url(url):
@@ -11,6 +21,11 @@ def normalize_url(url):
     url = re.sub(r'^https?://', '', url)  # http:// 또는 https:// 제거
     return url
 
+# 정규식은 모듈 로드 시 한 번만 컴파일 (병렬 추출 시 워커 프로세스마다 한 번)
+IP_RE = re.compile(r'\d+\.\d+\.\d+\.\d+')       # IP 주소
+SPECIAL_CHAR_RE = re.compile(r'[^\w]')          # 특수문자
+DIGIT_RE = re.compile(r'\d')                    # 숫자
+
 # Feature 추출
 # 참고 자료 : https://archive.ics.uci.edu/dataset/327/phishing+websites
 def extract_url_features(url) :
@@ -25,11 +40,11 @@ def extract_url_features(url) :
     # 기본 URL 기반 Feature
     feature['url_length'] = int(len(url) > 75)                                      # URL 전체 문자열 길이
     feature['num_dots'] = np.log1p(url.count('.'))                                  # URL 내 점(.)의 개수
-    feature['has_ip'] = int(bool(re.search(r'\d+\.\d+\.\d+\.\d+', url)))            # IP 주소 포함 여부  
-    feature['num_special_chars'] = int(len(re.findall(r'[^\w]', url)) > 5)          # 특수문자 수 (@, ?, =, % 등)
+    feature['has_ip'] = int(bool(IP_RE.search(url)))                                # IP 주소 포함 여부  
+    feature['num_special_chars'] = int(len(SPECIAL_CHAR_RE.findall(url)) > 5)       # 특수문자 수 (@, ?, =, % 등)
     feature['has_at_symbol'] = int('@' in url)                                      # @ 기호 포함 여부
     feature['path_length'] = np.log1p(len(parsed.path))                             # URL 경로 길이
-    feature['num_digits'] = np.log1p(len(re.findall(r'\d', url)))                   # 숫자 개수
+    feature['num_digits'] = np.log1p(len(DIGIT_RE.findall(url)))                    # 숫자 개수
 
     return feature
     
@@ -48,11 +63,10 @@ if __name__ == '__main__' :
     # balanced.to_csv('data.csv', index=False, encoding='utf-8-sig')
     df = pd.read_csv('data.csv')
 
-    # 순차적 특징 추출
-    features = [extract_url_features(str(url)) for url in tqdm(df['url'].fillna(''), desc='Extracting Features')]
+    # 특징 추출 (feature_cache에 있는 URL은 건너뛰고 새 URL만 멀티코어로 추출)
+    X = load_features(df['url'].fillna(''), extract_url_features, extract_many=extract_features_matrix)
 
     # Feature, Target 설정
-    X = pd.DataFrame(features)
     y = df['label'].astype(int)
 
     # 학습 데이터 및 테스트 데이터 분할
@@ -75,13 +89,29 @@ if __name__ == '__main__' :
         n_jobs=-1,                  # 사용할 CPU 쓰레드 수 : -1 : 모든 코어 사용
     )
 
-    xgb_model.fit(X_train, y_train)
+    # 확률 보정 : 트리 모델의 predict_proba는 실제 확률과 어긋나는 경우가 많아 Isotonic 회귀로 보정
+    # 학습 데이터를 3겹으로 나눠 XGBoost 학습 + 보정을 번갈아 수행
+    model = CalibratedClassifierCV(xgb_model, method='isotonic', cv=3)
+    model.fit(X_train, y_train)
 
-    # 예측 및 성능 평가
-    y_pred = xgb_model.predict(X_test)
+    # 예측 및 성능 평가 (운영 임계값 기준)
+    y_prob = model.predict_proba(X_test)[:, 1]
+    y_pred = (y_prob >= OPERATING_THRESHOLD).astype(int)
     print("\n정확도:", accuracy_score(y_test, y_pred))
     print(classification_report(y_test, y_pred))
 
-    # 모델 저장
-    joblib.dump(xgb_model, 'XGBoost_model.pkl')
+    # 임계값별 성능 표 저장
+    sweep = threshold_sweep(y_test, y_prob)
+    sweep.to_csv(SWEEP_PATH, index=False, encoding='utf-8-sig')
+    print(sweep.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    # 모델 및 메타(운영 임계값) 저장
+    joblib.dump(model, MODEL_PATH)
+    save_model_meta(
+        MODEL_PATH,
+        OPERATING_THRESHOLD,
+        calibration='isotonic',
+        features=list(X.columns),
+        threshold_sweep=SWEEP_PATH,
+    )
 
@@ -1,50 +1,152 @@
-import json, openai, os
+import json, logging, openai, os, threading
+from collections import deque
 from dotenv import load_dotenv
-from module import check_black_list
+from module import check_url
 from vector_store import vector_store_with_file
+from tracing import span, traced
 
 # .env 파일에서 환경 변수 불러오기 (예: API 키)
 load_dotenv()
 
 OPEN_API_KEY = os.getenv("OPEN_API_KEY")        # 환경 변수에서 OPEN_API_KEY 값을 불러와 변수에 저장
-client = openai.OpenAI(api_key=OPEN_API_KEY)    # OpenAI 클라이언트를 생성 및 API 키 인증
+# 하위 에이전트(agent_call)가 쓰는 OpenAI 클라이언트 — 처음 호출할 때 생성
+# (import만으로는 API 키가 필요 없도록: batch_eval --endpoint fake 등 오프라인 실행, 대신 쓸 클라이언트는 직접 대입)
+client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global client
+    with _client_lock:
+        if client is None:
+            client = openai.OpenAI(api_key=OPEN_API_KEY)    # OpenAI 클라이언트를 생성 및 API 키 인증
+        return client
+
+MODEL = "gpt-4o"
+KNOWLEDGE_FILE = "./악성url관련자료.pdf"
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# 프롬프트 캐싱
+# OpenAI는 요청 앞부분(tools → instructions/system → 이전 대화)이 이전 요청과 바이트 단위로 같으면
+# 그 부분을 캐시해서 입력 토큰 비용/지연을 줄여줌 (1024 토큰 이상부터 적용)
+# → system 프롬프트, tool 스키마는 모듈 상수로 고정하고, 호출마다 바뀌는 내용은 항상 맨 뒤 user 메시지에만 넣음
+# ---------------------------------------------------------------------------
+
+# 하위 에이전트 system 프롬프트 (고정)
+SUB_AGENT_PROMPT = (
+    "당신은 악성 URL 결과를 잘 리포팅해서 상위 에이전트에게 전달하는 한국어 에이전트입니다. "
+    "당신은 블랙리스트에 존재한다는 문자나 0 또는 1을 받습니다. 블랙리스트에 존재하면 악성 URL입니다. "
+    "0이면 정상 URL, 1이면 악성 URL을 뜻하고 이는 ML모델에 넣은 결과입니다. 피싱 확률이 함께 오면 모델이 판단한 악성일 확률(0~1)입니다. "
+    "정상 URL은 그냥 상위 에이전트에게 정상이라고 전달하면 되고 "
+    "악성 URL이면 벡터 스토어의 파일에는 악성 URL에 대한 자료가 있는데 이걸로 해당 URL에 대한 정보를 가져오는게 아니라 "
+    "왜 악성 URL인지에 대한 분석을 하는데 용이한 자료입니다. 해당 자료를 통해 악성 URL이면 분석결과까지 리포팅해서 "
+    "최대한 주 내용만 다 담아서 간단하게 답변을 구성해주세요."
+)
+
+# 상위 에이전트 system 프롬프트 (고정)
+MAIN_AGENT_PROMPT = (
+    "당신은 한국어 상담 에이전트입니다. 사용자로부터의 질문을 툴을 사용하게 적절하게 대답해주세요. "
+    "악성 URL에 관한 질문이 들어올 때만 다음과 같이 대답하면 됩니다.:\n"
+    "악성 URL에 대한 질문이 들어오면 Function call을 이용해 사용자의 입력으로부터 URL을 건내주어 응답을 받아야 합니다. "
+    "Function call에선 하위 에이전트가 URL을 분석해서 당신에게 리포팅을 해줄 것이며 당신은 그 결과를 받고 "
+    "정상이면 그냥 답변하면 되고, 블랙리스트에 존재하면 블랙리스트에 관해서 얘기해주고 블랙리스트에 존재하는 악성 url이라고 하면됩니다. "
+    "블랙리스트에 없는데 모델이 악성 url이라 판단하면 해당 사실을 알려주세요. 모델 결과 악성 url로 판단되면 하위 에이전트의 리포트를 참조하여 사용자에게 알려주세요. "
+    "그리고 Websearch 툴을 사용하여 대안 사이트 3~4개를 추천해주세요. 이때 사용자에게 목적을 물어보고 "
+    "목적이 확인되면 일반적이고 대중적인 사이트를 추천해주세요."
+)
+
+# 상위 에이전트 tool 스키마 (고정) : function(하위 에이전트) 호출, web_search
+MAIN_AGENT_TOOLS = [
+    {
+        "type": "function",
+        "name": "agent_call",
+        "description": "사용자로부터 악성 URL 관련 판단 질문을 받으면 URL 검사와 리포팅을 위해 하위 에이전트를 호출하는 함수입니다.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "url": {"type": "string"}
+            },
+            "required": ["url"],
+            "additionalProperties": False
+        },
+        "strict": True
+    },
+    {
+        "type": "web_search_preview"
+    }
+]
+
+# 같은 접두부를 가진 요청이 같은 캐시 서버로 가도록 힌트를 주는 키
+MAIN_CACHE_KEY = "phishingguard-main"
+SUB_CACHE_KEY = "phishingguard-sub"
+
+# 최근 호출별 토큰 사용량 기록 (캐시된 입력 토큰 / 캐시 안 된 입력 토큰)
+USAGE_LOG = deque(maxlen=1000)
+
+def log_usage(stage, response):
+    '''
+    responses.create 응답의 토큰 사용량을 기록하고 로그로 남기는 함수입니다.
+    반환: {"stage", "input_tokens", "cached_tokens", "uncached_tokens", "output_tokens"}
+    '''
+    usage = getattr(response, "usage", None)
+    input_tokens = getattr(usage, "input_tokens", 0) or 0
+    details = getattr(usage, "input_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    record = {
+        "stage": stage,
+        "input_tokens": input_tokens,
+        "cached_tokens": cached,
+        "uncached_tokens": input_tokens - cached,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+    }
+    USAGE_LOG.append(record)
+    logger.info("[usage] %s input=%d cached=%d uncached=%d output=%d",
+                stage, input_tokens, cached, input_tokens - cached, record["output_tokens"])
+    return record
+
+# 지식 파일 벡터 스토어는 프로세스당 한 번만 생성
+# (호출마다 새로 만들면 업로드 시간이 들고, store_id가 바뀌어 tool 스키마도 매번 달라짐)
+_store_ids = {}
+_store_lock = threading.Lock()
+
+def get_knowledge_store_id(client):
+    with _store_lock:
+        if KNOWLEDGE_FILE not in _store_ids:
+            with span("vector_store_upload"):
+                _store_ids[KNOWLEDGE_FILE] = vector_store_with_file(KNOWLEDGE_FILE, "knowledge_base", client)
+        return _store_ids[KNOWLEDGE_FILE]
 
 # 하위 에이전트 함수 정의
-# 악성 URL 판단 결과에 기반한 OpenAI 응답 생성 
+# 악성 URL 판단 결과에 기반한 OpenAI 응답 생성
+@traced("agent_call")
 def agent_call(url):
-    client = openai.OpenAI(api_key=OPEN_API_KEY)
-    store_id = vector_store_with_file(
-        "./악성url관련자료.pdf",
-        "knowledge_base",
-        client
-    )
-
     if url:
-        result = check_black_list(url)                  # 사용자 정의 함수(URL이 블랙리스트에 있는지 검사)
-        client = openai.OpenAI(api_key=OPEN_API_KEY)    # OpeinAI API클라이언트 생성
+        client = get_client()
+        store_id = get_knowledge_store_id(client)
+        result, prob = check_url(url)                   # 사용자 정의 함수(URL이 블랙리스트에 있는지 검사 + 모델 피싱 확률)
 
-        # 에이전트 역할 (system role), 사용자 입력 정의
+        # 에이전트 역할 (system role, 고정), 사용자 입력 정의 (호출마다 바뀌는 내용)
         input = [{
             "role" : "system",
-            "content" : "당신은 악성 URL 결과를 잘 리포팅해서 상위 에이전트에게 전달하는 한국어 에이전트입니다.\
-                당신은 블랙리스트에 존재한다는 문자나 0 또는 1을 받습니다. 블랙리스트에 존재하면 악성 URL입니다.\
-                0이면 정상 URL, 1이면 악성 URL을 뜻하고 이는 ML모델에 넣은 결과입니다. 정상 URL은 그냥 상위 에이전트에게 정상이라고 전달하면 되고\
-                악성 URL이면 벡터 스토어의 파일에는 악성 URL에 대한 자료가 있는데 이걸로 해당 URL에 대한 정보를 가져오는게 아니라\
-                왜 악성 URL인지에 대한 분석을 하는데 용이한 자료입니다. 해당 자료를 통해 악성 URL이면 분석결과까지 리포팅해서\
-                최대한 주 내용만 다 담아서 간단하게 답변을 구성해주세요."
+            "content" : SUB_AGENT_PROMPT
         },
         {
             "role" : "user",
             "content" : f"사용자 URL: {url} 결과 : {str(result)}"      # 사용자에게 받은 URL과 검사 결과 전달
+                        + (f" 피싱 확률 : {prob:.3f}" if prob is not None else "")
         }]
 
-        # OpenAI API 호출 
-        response = client.responses.create(
-            model="gpt-4o",
-            input = input,
-            tools=[{"type" : "file_search",
-                    "vector_store_ids" : [store_id]}]      # 생성된 벡터 스토어 ID 연결
-        )
+        # OpenAI API 호출
+        with span("llm.agent_call"):
+            response = client.responses.create(
+                model=MODEL,
+                input = input,
+                tools=[{"type" : "file_search",
+                        "vector_store_ids" : [store_id]}],     # 벡터 스토어 ID 연결 (프로세스 내에서 고정)
+                extra_body={"prompt_cache_key": SUB_CACHE_KEY}
+            )
+        log_usage("agent_call", response)
         return response.output_text     # OpenAI 응답 텍스트 반환
 
 # 상위 에이전트 클래스 정의(사용자 요청을 받아 function call로 하위 에이전트 호출 및 응답)
@@ -53,39 +155,15 @@ class Agent:
         self.client = client    # OpenAI API 클라이언트 저장
 
         # function(하위 에이전트) 호출, web_search
-        self.tools = [{
-            "type": "function",
-            "name": "agent_call",
-            "description": "사용자로부터 악성 URL 관련 판단 질문을 받으면 URL 검사와 리포팅을 위해 하위 에이전트를 호출하는 함수입니다.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "url": {"type": "string"}
-                },
-                "required": ["url"],
-                "additionalProperties": False
-            },
-            "strict": True
-        },
-        {
-            "type": "web_search_preview"
-        }
-        ]
+        self.tools = MAIN_AGENT_TOOLS
 
-        # context를 관리할 변수
+        # context를 관리할 변수 (system 프롬프트가 항상 맨 앞 → 이후 대화는 뒤에만 추가)
         self.messages = []
 
         # 에이전트 역할 (system role)
         self.messages.append(
             {"role" : "system",
-            "content" : "당신은 한국어 상담 에이전트입니다. 사용자로부터의 질문을 툴을 사용하게 적절하게 대답해주세요.\
-                악성 URL에 관한 질문이 들어올 때만 다음과 같이 대답하면 됩니다.:\n\
-                악성 URL에 대한 질문이 들어오면 Function call을 이용해 사용자의 입력으로부터 URL을 건내주어 응답을 받아야 합니다.\
-                Function call에선 하위 에이전트가 URL을 분석해서 당신에게 리포팅을 해줄 것이며 당신은 그 결과를 받고\
-                정상이면 그냥 답변하면 되고, 블랙리스트에 존재하면 블랙리스트에 관해서 얘기해주고 블랙리스트에 존재하는 악성 url이라고 하면됩니다.\
-                블랙리스트에 없는데 모델이 악성 url이라 판단하면 해당 사실을 알려주세요. 모델 결과 악성 url로 판단되면 하위 에이전트의 리포트를 참조하여 사용자에게 알려주세요.\
-                그리고 Websearch 툴을 사용하여 대안 사이트 3~4개를 추천해주세요. 이때 사용자에게 목적을 물어보고\
-                목적이 확인되면 일반적이고 대중적인 사이트를 추천해주세요."
+            "content" : MAIN_AGENT_PROMPT
             }
         )
 
@@ -96,17 +174,17 @@ class Agent:
         # 호출된 function 요청을 차례대로 처리
         for call in calls:
             if call.type != "function_call":    # type가 function_call이 아니면 무시
-                continue   
+                continue
 
             try :
                 result.append(call)                         # 호출 요청도 메시지에 포함
                 function_args = json.loads(call.arguments)  # OpenAI가 전달한 arguments를 JOSN으로 파싱
-                output = agent_call(**function_args)        # agent_call 함수 호출       
+                output = agent_call(**function_args)        # agent_call 함수 호출
 
                 # 호출 결과를 function_call_output 형태로 메시지에 추가
                 result.append({
                     "call_id": call.call_id,            # 어떤 호출의 응답인지 식별
-                    "type": "function_call_output",     # 응답 타입 
+                    "type": "function_call_output",     # 응답 타입
                     "output": str(output)               # 함수 실행 결과 텍스트
                 })
 
@@ -115,13 +193,14 @@ class Agent:
 
                 # 오류 발생 시 오류 메시지를 function_call_output으로 리턴
                 result.append({
-                    "call_id": call.call_id,            
+                    "call_id": call.call_id,
                     "type": "function_call_output",
                     "output": str(e)
                 })
         self.messages.extend(result)    # 처리 결과를 전체 메시지를 기록에 추가
 
-    def chat(self, query) : 
+    @traced("agent.chat")
+    def chat(self, query) :
         # context 추가
         self.messages.append({
             "role": "user",
@@ -129,12 +208,15 @@ class Agent:
         })
 
         # 모델에 응답 요청
-        response = self.client.responses.create(
-            model="gpt-4o",
-            input=self.messages,
-            tools=self.tools,
-            tool_choice="auto"
-        )
+        with span("llm.chat"):
+            response = self.client.responses.create(
+                model=MODEL,
+                input=self.messages,
+                tools=self.tools,
+                tool_choice="auto",
+                extra_body={"prompt_cache_key": MAIN_CACHE_KEY}
+            )
+        log_usage("chat", response)
 
         # function_call이 없는 경우, 바로 응답 반환
         if not response or not response.output or all(c.type != "function_call" for c in response.output):
@@ -143,15 +225,21 @@ class Agent:
                 "content" : response.output_text}
             )
             return response.output_text
-        
+
         # function_call이 있는 경우 처리
         self.function_call(response.output)
 
         # function_call 결과 포함해서 최종 응답 생성
-        final_response = self.client.responses.create(
-            model="gpt-4o",
-            input=self.messages
-        )
+        # tools를 빼면 캐시 접두부(tools → system → 대화)가 달라지므로 같은 tools를 주고 호출만 막음
+        with span("llm.chat_final"):
+            final_response = self.client.responses.create(
+                model=MODEL,
+                input=self.messages,
+                tools=self.tools,
+                tool_choice="none",
+                extra_body={"prompt_cache_key": MAIN_CACHE_KEY}
+            )
+        log_usage("chat_final", final_response)
 
         # context 추가
         self.messages.append(
@@ -163,6 +251,7 @@ class Agent:
         return final_response.output_text
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     client = openai.OpenAI(api_key=OPEN_API_KEY)
     agent = Agent(client)
     agent.chat("https://0586.yahwagsc.pro 이거 어때?")
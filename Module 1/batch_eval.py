@@ -0,0 +1,222 @@
+import argparse, asyncio, hashlib, json, os, random, re, time
+from types import SimpleNamespace
+import openai, pandas as pd
+import agent as agent_module
+import tracing
+from agent import Agent, USAGE_LOG, SUB_AGENT_PROMPT, OPEN_API_KEY
+
+URL_RE = re.compile(r'(?:https?://)?[\w.-]+\.[A-Za-z]{2,}(?:/\S*)?')
+
+# ---------------------------------------------------------------------------
+# 가짜 OpenAI 클라이언트 (네트워크/비용 없이 에이전트 흐름만 재현)
+#  - 상위 에이전트 첫 호출 : 질문에 URL이 있으면 agent_call function_call 반환
+#  - 하위 에이전트 호출     : 검사 결과(블랙리스트/0/1)를 그대로 문장으로 리포팅
+#  - 상위 에이전트 최종 호출 : 하위 에이전트 리포트를 그대로 전달
+#  - 토큰 수는 글자 수로 근사, 이전 요청과 같은 메시지 접두부는 캐시된 토큰으로 계산
+# ---------------------------------------------------------------------------
+class _FakeResponses:
+    def __init__(self, latency_ms, jitter_ms):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._seen_prefixes = set()
+        self._n = 0
+
+    @staticmethod
+    def _text_of(item):
+        if isinstance(item, dict):
+            return str(item.get("content") or item.get("output") or "")
+        return str(getattr(item, "arguments", "") or "")
+
+    # 메시지 단위 접두부 캐시 흉내 (1024 토큰 미만은 캐시 안 됨)
+    def _usage(self, messages, tools, output_text):
+        tokens = [len(json.dumps(tools, ensure_ascii=False)) // 2 if tools else 0] + [len(self._text_of(m)) // 2 + 4 for m in messages]
+        h = hashlib.sha256(json.dumps(tools, ensure_ascii=False, sort_keys=True).encode())
+        cached, running = 0, 0
+        for i, m in enumerate(messages):
+            h.update(self._text_of(m).encode())
+            running = sum(tokens[:i + 2])
+            key = h.hexdigest()
+            if key in self._seen_prefixes:
+                cached = running
+            self._seen_prefixes.add(key)
+        total = sum(tokens)
+        cached = cached if cached >= 1024 else 0
+        return SimpleNamespace(input_tokens=total, output_tokens=len(output_text) // 2,
+                               input_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+    def create(self, model, input, tools=None, tool_choice=None, **kwargs):
+        time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+        self._n += 1
+        output, text = [], ""
+
+        system = input[0].get("content") if input and isinstance(input[0], dict) else ""
+        last = input[-1]
+        has_function_tool = any(t.get("type") == "function" for t in (tools or []))
+
+        if system == SUB_AGENT_PROMPT:
+            content = str(last.get("content", ""))
+            if "블랙리스트" in content:
+                text = "블랙리스트에 존재하는 악성 URL입니다."
+            elif re.search(r'결과 : 1\b', content):
+                text = "ML 모델 판단 결과 악성 URL입니다."
+            else:
+                text = "ML 모델 판단 결과 정상 URL입니다."
+        elif has_function_tool and tool_choice != "none" and isinstance(last, dict) and last.get("role") == "user":
+            m = URL_RE.search(str(last.get("content", "")))
+            if m:
+                output.append(SimpleNamespace(type="function_call", name="agent_call", call_id=f"call_{self._n}",
+                                              arguments=json.dumps({"url": m.group(0)})))
+            else:
+                text = "URL이 포함된 질문이 아닙니다."
+        else:
+            reports = [m.get("output") for m in input if isinstance(m, dict) and m.get("type") == "function_call_output"]
+            text = reports[-1] if reports else "답변"
+
+        if text:
+            output.append(SimpleNamespace(type="message", content=text))
+        return SimpleNamespace(output=output, output_text=text, usage=self._usage(input, tools, text))
+
+class FakeOpenAI:
+    def __init__(self, latency_ms=300.0, jitter_ms=100.0):
+        self.responses = _FakeResponses(latency_ms, jitter_ms)
+        self.files = SimpleNamespace(create=lambda **kw: SimpleNamespace(id="file_fake"))
+        self.vector_stores = SimpleNamespace(
+            create=lambda **kw: SimpleNamespace(id="vs_fake"),
+            files=SimpleNamespace(create=lambda **kw: SimpleNamespace(id="vsf_fake")),
+        )
+
+# ---------------------------------------------------------------------------
+# 평가
+# ---------------------------------------------------------------------------
+
+# 최종 답변 → 판정 (1: 악성, 0: 정상, None: 판단 불가)
+def parse_verdict(text):
+    text = text or ""
+    malicious = "악성" in text and not re.search(r'악성\s*(URL|url)?\s*(이|가)?\s*아닙니다', text)
+    normal = "정상" in text
+    if malicious and not normal:
+        return 1
+    if normal and not malicious:
+        return 0
+    return None
+
+def _question_of(row):
+    q = str(row.get("question") or "").strip()
+    return q or f"{row['url']} 이거 어때?"
+
+async def run_batch(rows, client, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+
+    def run_one(row):
+        t0 = time.perf_counter()
+        try:
+            answer = Agent(client).chat(_question_of(row))
+            err = None
+        except Exception as e:
+            answer, err = "", str(e)
+        return {
+            "question": _question_of(row),
+            "label": int(row["label"]),
+            "answer": answer,
+            "verdict": parse_verdict(answer),
+            "latency_sec": time.perf_counter() - t0,
+            "error": err,
+        }
+
+    async def guarded(row):
+        async with sem:
+            return await asyncio.to_thread(run_one, row)
+
+    return await asyncio.gather(*(guarded(r) for r in rows))
+
+def summarize(results, wall_sec):
+    n = len(results)
+    lat = sorted(r["latency_sec"] for r in results)
+    judged = [r for r in results if r["verdict"] is not None]
+    correct = sum(1 for r in judged if r["verdict"] == r["label"])
+    usage = pd.DataFrame(list(USAGE_LOG))
+    tokens = {}
+    if not usage.empty:
+        tokens = {
+            "input_tokens": int(usage["input_tokens"].sum()),
+            "cached_tokens": int(usage["cached_tokens"].sum()),
+            "uncached_tokens": int(usage["uncached_tokens"].sum()),
+            "output_tokens": int(usage["output_tokens"].sum()),
+            "calls": int(len(usage)),
+        }
+    return {
+        "questions": n,
+        "errors": sum(1 for r in results if r["error"]),
+        "wall_sec": wall_sec,
+        "throughput_qps": n / wall_sec if wall_sec else 0.0,
+        "latency_p50_sec": lat[len(lat) // 2] if lat else 0.0,
+        "latency_p95_sec": lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else 0.0,
+        "accuracy": correct / len(judged) if judged else None,
+        "undetermined": n - len(judged),
+        "tokens": tokens,
+        "stages": tracing.snapshot(),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="라벨된 URL 질문 CSV로 PhishingGuard 에이전트 일괄 평가")
+    ap.add_argument("csv", help="컬럼: url, label(1=악성, 0=정상), question(선택)")
+    ap.add_argument("--concurrency", type=int, default=8, help="동시 실행 질문 수")
+    ap.add_argument("--limit", type=int, default=0, help="앞에서부터 N개만 평가 (0=전체)")
+    ap.add_argument("--endpoint", choices=["fake", "openai"], default="fake",
+                    help="fake: 가짜 클라이언트 / openai: 실제 API 또는 --base-url의 녹화·모의 서버")
+    ap.add_argument("--base-url", default="", help="OpenAI 호환 녹화/모의 서버 주소 (--endpoint openai)")
+    ap.add_argument("--fake-latency-ms", type=float, default=300.0, help="가짜 응답 평균 지연")
+    ap.add_argument("--keep-blacklist", action="store_true", help="평가 중 추가된 블랙리스트를 남김 (기본: 원복)")
+    ap.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.csv)
+    if args.limit:
+        df = df.head(args.limit)
+    # 라벨이 비었거나 숫자가 아닌 행은 정확도를 계산할 수 없으므로 제외
+    labels = pd.to_numeric(df["label"], errors="coerce")
+    if labels.isna().any():
+        print(f"라벨 없음/잘못된 라벨 {int(labels.isna().sum())}개 행 제외 (행 번호: {list(df.index[labels.isna()][:10])})")
+        df = df[labels.notna()]
+    rows = df.to_dict(orient="records")
+
+    if args.endpoint == "fake":
+        client = FakeOpenAI(latency_ms=args.fake_latency_ms, jitter_ms=args.fake_latency_ms / 3)
+    else:
+        client = openai.OpenAI(api_key=OPEN_API_KEY, base_url=args.base_url or None)
+    agent_module.client = client    # 하위 에이전트(agent_call)도 같은 클라이언트 사용
+
+    # 평가 중 악성 판정 URL이 블랙리스트에 추가되므로 원본 보관
+    blacklist_backup = open("blacklist.csv", "rb").read() if os.path.exists("blacklist.csv") else None
+
+    tracing.reset()
+    USAGE_LOG.clear()
+    t0 = time.perf_counter()
+    try:
+        results = asyncio.run(run_batch(rows, client, args.concurrency))
+    finally:
+        if not args.keep_blacklist:
+            if blacklist_backup is not None:
+                with open("blacklist.csv", "wb") as f:
+                    f.write(blacklist_backup)
+            elif os.path.exists("blacklist.csv"):
+                # 평가 전에는 없던 파일 → 평가 중 생성된 것이므로 삭제
+                os.remove("blacklist.csv")
+    summary = summarize(results, time.perf_counter() - t0)
+
+    print(f"질문 {summary['questions']}개 / 오류 {summary['errors']}개 / {summary['wall_sec']:.1f}초 "
+          f"({summary['throughput_qps']:.2f} 질문/초, 동시 {args.concurrency})")
+    print(f"지연 p50 {summary['latency_p50_sec']:.2f}초 / p95 {summary['latency_p95_sec']:.2f}초")
+    acc = summary["accuracy"]
+    print(f"판정 정확도 {acc * 100:.1f}% (판단 불가 {summary['undetermined']}개)" if acc is not None else "판정 정확도 : 판단 가능한 답변 없음")
+    if summary["tokens"]:
+        t = summary["tokens"]
+        print(f"토큰 : 입력 {t['input_tokens']:,} (캐시 {t['cached_tokens']:,}) / 출력 {t['output_tokens']:,} / 호출 {t['calls']}회")
+    print(f"\n{'단계':<24}{'횟수':>6}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for name, s in summary["stages"].items():
+        print(f"{name:<24}{s['total_count']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장 : {args.out}")
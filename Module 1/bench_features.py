@@ -0,0 +1,70 @@
+import argparse, random, string, time
+from multiprocessing import Pool, cpu_count
+from preprocess import extract_url_features
+from parallel_features import extract_features_matrix
+
+# 벤치마크용 가짜 URL 생성 (도메인/IP/경로/쿼리 길이가 섞이도록)
+def make_urls(n, seed=42):
+    rnd = random.Random(seed)
+    tlds = ["com", "net", "kr", "co.kr", "org", "xyz", "pro"]
+    urls = []
+    for _ in range(n):
+        if rnd.random() < 0.1:
+            host = ".".join(str(rnd.randint(1, 255)) for _ in range(4))
+        else:
+            host = "".join(rnd.choices(string.ascii_lowercase + string.digits, k=rnd.randint(4, 16))) + "." + rnd.choice(tlds)
+        path = "/".join("".join(rnd.choices(string.ascii_letters + string.digits, k=rnd.randint(2, 10))) for _ in range(rnd.randint(0, 5)))
+        query = "?id=" + str(rnd.randint(0, 10**6)) if rnd.random() < 0.3 else ""
+        urls.append(f"http{'s' if rnd.random() < 0.5 else ''}://{'user@' if rnd.random() < 0.02 else ''}{host}/{path}{query}")
+    return urls
+
+def bench_sequential(urls):
+    t0 = time.perf_counter()
+    for u in urls:
+        extract_url_features(u)
+    return time.perf_counter() - t0
+
+# 기존 ML_test_1 방식 (Pool.imap, chunksize=1)
+def bench_imap_chunk1(urls, workers):
+    t0 = time.perf_counter()
+    with Pool(workers) as pool:
+        for _ in pool.imap(extract_url_features, urls):
+            pass
+    return time.perf_counter() - t0
+
+def bench_chunked(urls, workers, chunk_size):
+    t0 = time.perf_counter()
+    extract_features_matrix(urls, extract_url_features, n_workers=workers, chunk_size=chunk_size)
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="URL 특징 추출 처리량 벤치마크 (코어 수별)")
+    ap.add_argument("--n", type=int, default=1_000_000, help="URL 개수")
+    ap.add_argument("--cores", default="", help="측정할 워커 수 목록 (예: 1,2,4,8 / 기본: 1,2,4,...,CPU 수)")
+    ap.add_argument("--chunk-size", type=int, default=0, help="청크 크기 (기본: 자동)")
+    ap.add_argument("--baseline-n", type=int, default=50_000, help="imap(chunksize=1) 비교용 URL 개수 (0=생략)")
+    args = ap.parse_args()
+
+    if args.cores:
+        cores = [int(x) for x in args.cores.split(",") if x.strip()]
+    else:
+        cores, c = [], 1
+        while c < cpu_count():
+            cores.append(c); c *= 2
+        cores.append(cpu_count())
+
+    print(f"URL {args.n:,}개 생성 중...")
+    urls = make_urls(args.n)
+
+    seq = bench_sequential(urls)
+    print(f"\n{'방식':<24}{'워커':>6}{'시간(초)':>12}{'URL/초':>14}{'배속':>8}")
+    print(f"{'순차(for문)':<24}{1:>6}{seq:>12.2f}{args.n / seq:>14,.0f}{1.0:>8.2f}")
+
+    if args.baseline_n:
+        sub = urls[:args.baseline_n]
+        t = bench_imap_chunk1(sub, cpu_count())
+        print(f"{'imap(chunksize=1)':<24}{cpu_count():>6}{t:>12.2f}{len(sub) / t:>14,.0f}{(len(sub) / t) / (args.n / seq):>8.2f}")
+
+    for w in cores:
+        t = bench_chunked(urls, w, args.chunk_size or None)
+        print(f"{'청크+공유메모리':<24}{w:>6}{t:>12.2f}{args.n / t:>14,.0f}{seq / t:>8.2f}")
@@ -0,0 +1,53 @@
+import json, os
+import numpy as np, pandas as pd
+
+# 운영 임계값 기본값 (모델 메타 파일이 없을 때)
+DEFAULT_THRESHOLD = 0.5
+
+# 모델 파일 옆에 저장되는 메타 파일 경로 (XGBoost_model.pkl → XGBoost_model.json)
+def meta_path_for(model_path):
+    return os.path.splitext(model_path)[0] + ".json"
+
+# 임계값별 성능 표 생성
+# flagged_rate : 악성으로 판정되는 비율 → 하위 에이전트의 악성 분석(LLM 호출) 비중
+def threshold_sweep(y_true, y_prob, thresholds=None):
+    y_true = np.asarray(y_true).astype(int)
+    y_prob = np.asarray(y_prob, dtype=float)
+    if thresholds is None:
+        thresholds = np.round(np.arange(0.05, 1.0, 0.05), 2)
+
+    rows = []
+    pos = max(int((y_true == 1).sum()), 1)
+    neg = max(int((y_true == 0).sum()), 1)
+    for thr in thresholds:
+        pred = y_prob >= thr
+        tp = int((pred & (y_true == 1)).sum())
+        fp = int((pred & (y_true == 0)).sum())
+        fn = int((~pred & (y_true == 1)).sum())
+        rows.append({
+            "threshold": float(thr),
+            "precision": tp / (tp + fp) if (tp + fp) else 1.0,
+            "recall": tp / pos,
+            "fpr": fp / neg,
+            "false_positives": fp,
+            "false_negatives": fn,
+            "flagged_rate": float(pred.mean()) if len(pred) else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+# 모델 메타 저장 (운영 임계값, 보정 방식, 임계값 표 경로 등)
+def save_model_meta(model_path, threshold, **extra):
+    meta = {"threshold": float(threshold), **extra}
+    with open(meta_path_for(model_path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+# 모델 메타 불러오기 (없으면 기본 임계값)
+def load_model_meta(model_path):
+    path = meta_path_for(model_path)
+    if not os.path.exists(path):
+        return {"threshold": DEFAULT_THRESHOLD}
+    with open(path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta.setdefault("threshold", DEFAULT_THRESHOLD)
+    return meta
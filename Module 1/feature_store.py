@@ -0,0 +1,141 @@
+import hashlib, inspect, json, os, re, tempfile
+import numpy as np, pandas as pd
+from tqdm import tqdm
+
+# 특징 캐시 저장 폴더 (특징 정의 버전마다 하위 폴더가 생김)
+CACHE_DIR = "feature_cache"
+
+# 특징 정의를 바꿨는데 함수 소스로는 드러나지 않는 경우(외부 데이터, 상수 변경 등) 직접 올려주는 버전
+FEATURE_SET_VERSION = 1
+
+# URL → 64비트 해시 (캐시 인덱스 키)
+def url_hash(url):
+    digest = hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+# 특징 추출 함수의 버전 문자열 생성
+# 함수 본문 + 함수가 참조하는 전역 함수(normalize_url 등)/정규식의 소스를 해시해서
+# 특징 정의가 바뀌면 자동으로 다른 캐시를 사용하도록 함
+def feature_version(extract_fn):
+    h = hashlib.sha256(str(FEATURE_SET_VERSION).encode())
+    h.update(_source_of(extract_fn))
+    for name in sorted(extract_fn.__code__.co_names):
+        obj = extract_fn.__globals__.get(name)
+        if inspect.isfunction(obj) and obj is not extract_fn:
+            h.update(_source_of(obj))
+        elif isinstance(obj, re.Pattern):
+            h.update(obj.pattern.encode())
+    return h.hexdigest()[:16]
+
+def _source_of(fn):
+    try:
+        return inspect.getsource(fn).encode()
+    except (OSError, TypeError):
+        return fn.__code__.co_code     # 소스를 못 찾으면(대화형 실행 등) 바이트코드로 대체
+
+def _cache_paths(version, cache_dir):
+    d = os.path.join(cache_dir, version)
+    return d, os.path.join(d, "keys.npy"), os.path.join(d, "features.npy"), os.path.join(d, "columns.json")
+
+# 캐시 불러오기 : (URL 해시 배열, 특징 행렬, 컬럼 목록), 없으면 None
+def load_cache(version, cache_dir=CACHE_DIR):
+    _, keys_path, feats_path, cols_path = _cache_paths(version, cache_dir)
+    if not (os.path.exists(keys_path) and os.path.exists(feats_path) and os.path.exists(cols_path)):
+        return None
+    with open(cols_path, "r", encoding="utf-8") as f:
+        columns = json.load(f)
+    keys, features = np.load(keys_path), np.load(feats_path)
+    # 컬럼이 비었거나(이전 버전이 저장한 전부 실패 캐시) 파일끼리 크기가 안 맞으면(동시 저장이 섞인 경우) 다시 만듦
+    if not columns or features.shape != (len(keys), len(columns)):
+        return None
+    return keys, features, columns
+
+# 캐시 저장 (임시 파일에 쓴 뒤 교체 → 중간에 끊겨도 기존 캐시가 깨지지 않음)
+# 임시 파일 이름은 실행마다 달라서 동시에 저장해도 서로의 임시 파일을 덮어쓰지 않음
+def save_cache(version, keys, features, columns, cache_dir=CACHE_DIR):
+    d, keys_path, feats_path, cols_path = _cache_paths(version, cache_dir)
+    os.makedirs(d, exist_ok=True)
+    tmp_paths = []
+    try:
+        for path, write in ((keys_path, lambda f: np.save(f, keys)),
+                            (feats_path, lambda f: np.save(f, features)),
+                            (cols_path, lambda f: f.write(json.dumps(columns, ensure_ascii=False).encode("utf-8")))):
+            fd, tmp = tempfile.mkstemp(dir=d, prefix=os.path.basename(path) + ".", suffix=".tmp")
+            tmp_paths.append(tmp)
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+        for tmp, path in zip(tmp_paths, (keys_path, feats_path, cols_path)):
+            os.replace(tmp, path)
+        tmp_paths = []
+    finally:
+        for tmp in tmp_paths:   # 실패 시 남은 임시 파일 정리
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+# 특징 dict 목록 → 행렬 (추출 실패로 빈 dict가 나온 행은 NaN)
+def _to_matrix(feature_dicts, columns):
+    out = np.full((len(feature_dicts), len(columns)), np.nan, dtype=np.float64)
+    for i, feats in enumerate(feature_dicts):
+        if feats:
+            out[i] = [feats.get(c, np.nan) for c in columns]
+    return out
+
+# 캐시에 없는 URL만 순차 추출 → (행렬, 컬럼 목록)
+def extract_sequential(urls, extract_fn):
+    dicts = [extract_fn(u) for u in tqdm(urls, desc="Extracting Features")]
+    columns = next((list(d.keys()) for d in dicts if d), [])
+    return _to_matrix(dicts, columns), columns
+
+def load_features(urls, extract_fn, cache_dir=CACHE_DIR, extract_many=None):
+    '''
+    URL 목록의 특징을 DataFrame으로 반환하는 함수입니다. (입력 순서 유지)
+    캐시에 있는 URL은 추출을 건너뛰고, 없는 URL만 추출해서 캐시에 추가합니다.
+    extract_fn의 소스가 바뀌면 버전이 달라져 새 캐시를 사용합니다.
+    extract_many(urls, extract_fn) -> (행렬, 컬럼 목록) 으로 추출 방식을 바꿀 수 있습니다.
+    (기본: 순차 추출, 병렬 추출은 parallel_features.extract_features_matrix)
+    '''
+    urls = [str(u) for u in urls]
+    version = feature_version(extract_fn)
+
+    cached = load_cache(version, cache_dir)
+    if cached is not None:
+        keys, features, columns = cached
+    else:
+        keys, features, columns = np.empty(0, dtype=np.uint64), None, None
+    index = dict(zip(keys.tolist(), range(len(keys))))
+
+    # 캐시에 없는 URL (중복 제거)
+    url_keys = [url_hash(u) for u in urls]
+    missing = {}
+    for u, k in zip(urls, url_keys):
+        if k not in index and k not in missing:
+            missing[k] = u
+
+    if missing:
+        new_urls = list(missing.values())
+        new_features, new_columns = (extract_many or extract_sequential)(new_urls, extract_fn)
+        if columns is None and not new_columns:
+            # 캐시가 없는데 신규 URL이 전부 추출 실패 → 컬럼을 알 수 없으므로 저장하지 않음
+            # (빈 컬럼 캐시를 남기면 이후 실행이 모두 컬럼 0개로 채워짐)
+            print(f"[특징 캐시] 신규 {len(missing)}건 전부 추출 실패 → 캐시 저장 안 함 (버전 {version})")
+            return pd.DataFrame(np.empty((len(urls), 0)))
+        if columns is None:
+            columns = new_columns
+        elif not new_columns:
+            # 신규 URL이 전부 추출 실패한 경우
+            new_features = np.full((len(new_urls), len(columns)), np.nan, dtype=np.float64)
+        elif new_columns != columns:
+            # 같은 버전이면 컬럼 순서도 같아야 하지만, 혹시 다르면 캐시 순서에 맞춰 재배치
+            new_features = new_features[:, [new_columns.index(c) for c in columns]]
+
+        features = new_features if features is None else np.vstack([features, new_features])
+        keys = np.concatenate([keys, np.fromiter(missing.keys(), dtype=np.uint64, count=len(missing))])
+        for k in missing:
+            index[k] = len(index)
+        save_cache(version, keys, features, columns, cache_dir)
+        print(f"[특징 캐시] 신규 추출 {len(missing)}건 / 캐시 사용 {len(urls) - sum(1 for k in url_keys if k in missing)}건 (버전 {version})")
+    else:
+        print(f"[특징 캐시] 전체 {len(urls)}건 캐시 사용 (버전 {version})")
+
+    rows = [index[k] for k in url_keys]
+    return pd.DataFrame(features[rows] if rows else np.empty((0, len(columns or []))), columns=columns)
@@ -1,8 +1,17 @@
 
-import joblib, os, pandas as pd, numpy as np
+import joblib, os, threading, pandas as pd, numpy as np
+from functools import lru_cache
 from preprocess import extract_url_features
+from calibration import load_model_meta
+from tracing import span, traced
+
+MODEL_PATH = "XGBoost_model.pkl"
+
+# 블랙리스트 읽기 → 추가 → 저장이 여러 스레드에서 겹치지 않도록 (batch_eval 동시 실행 등)
+_blacklist_lock = threading.Lock()
 
 # 블랙리스트 파일 존재 확인
+@traced("blacklist_load")
 def load_blacklist():
     if not os.path.exists("blacklist.csv"):
         df = pd.Series([], name="url")
@@ -14,47 +23,79 @@ def check_black_list(url):
     사용자로부터 URL을 받았을 때 블랙리스트를 검사하고 
     블랙리스트에 없으면 ML 모델을 통해 검사하고 결과를 주는 함수입니다.
     '''
-    black_list_df = load_blacklist() # 블랙리스트 불러오기
+    return check_url(url)[0]
+
+def check_url(url):
+    '''
+    check_black_list와 같지만 (결과, 피싱 확률)을 함께 반환하는 함수입니다.
+    블랙리스트에 존재하면 확률은 None입니다.
+    '''
+    # 블랙리스트에 존재하면 return
+    with _blacklist_lock:
+        black_list = _read_black_list()
+    if url in black_list:
+        return "해당 URL은 블랙리스트에 존재하는 악성 URL입니다.", None
+    # 블랙리스트에 존재하지 않으면 모델 부르기 (보정된 확률 → 운영 임계값으로 판정)
+    # 모델 로드/특징 추출/예측은 잠금 밖에서 (동시 요청이 ML 작업까지 줄 서지 않도록)
+    prob = model_proba(url)
+    check_t_f = int(prob >= load_model()[1])
+    # 악성 url이면 블랙리스트에 추가
+    if check_t_f:
+        add_to_blacklist(url)
+    return check_t_f, prob
 
+def _read_black_list():
+    black_list_df = load_blacklist() # 블랙리스트 불러오기
     # 블랙리스트가 비어있지 않다면
     if not black_list_df.empty:
-        black_list = black_list_df['url'].tolist()
+        return black_list_df['url'].tolist()
     # 비어있다면
-    else:
-        black_list = []
+    return []
 
-    # 블랙리스트에 존재하면 return
-    if url in black_list:
-        return "해당 URL은 블랙리스트에 존재하는 악성 URL입니다."
-    # 블랙리스트에 존재하지 않으면 모델 부르기
-    check_t_f = model_call(url)
-    # 악성 url이면
-    if check_t_f:
-        # 블랙리스트에 추가
+def add_to_blacklist(url):
+    '''
+    블랙리스트 읽기 → 추가 → 저장을 잠금 안에서 한 번에 처리합니다.
+    (판정하는 사이 다른 스레드가 추가한 URL을 덮어쓰지 않도록 저장 직전에 다시 읽음)
+    '''
+    with _blacklist_lock:
+        black_list = _read_black_list()
+        if url in black_list:
+            return
         black_list.append(url)
-        # df로 만들어서
-        df = pd.DataFrame(black_list, columns=["url"])
-        # csv로 저장
-        save_csv(df)
-        # 결과 반환하기
-        return check_t_f
-    # 정상이면
-    else:
-        return check_t_f
+        # df로 만들어서 csv로 저장
+        save_csv(pd.DataFrame(black_list, columns=["url"]))
 
 # 데이터프레임을 csv로 저장하는 함수
+@traced("blacklist_save")
 def save_csv(df):
     df.to_csv("blacklist.csv", index=False, header=False)
 
-# 모델을 호출하여 결과를 반환받는 함수
-def model_call(url):
+# 모델과 운영 임계값 불러오기 (프로세스당 한 번만 로드)
+@lru_cache(maxsize=1)
+@traced("model_load")             # 캐시 안쪽에 두어 실제 로드할 때만 기록
+def load_model():
     # pkl 파일 불러오기
-    model = joblib.load("XGBoost_model.pkl")
+    model = joblib.load(MODEL_PATH)
+    # 모델 옆에 저장된 메타 파일(XGBoost_model.json)의 임계값, 없으면 0.5
+    threshold = float(load_model_meta(MODEL_PATH)["threshold"])
+    return model, threshold
+
+# 모델을 호출하여 피싱 확률을 반환받는 함수 (XGBoost.py에서 보정된 확률)
+def model_proba(url):
+    model, _ = load_model()
     # url 전처리하기
-    features_dict = extract_url_features(url)
+    with span("feature_extraction"):
+        features_dict = extract_url_features(url)
     # 모델에 넣기 위해 2차원으로 바꾸기
     features_array = np.array(list(features_dict.values())).reshape(1, -1)
-    # 모델 결과 받기
-    prediction = model.predict(features_array)
+    # 악성(1) 클래스 확률
+    with span("model_predict"):
+        return float(model.predict_proba(features_array)[0, 1])
 
-    return prediction[0]
+# 모델을 호출하여 결과(0: 정상, 1: 악성)를 반환받는 함수
+# threshold를 주지 않으면 모델 메타에 저장된 운영 임계값 사용
+def model_call(url, threshold=None):
+    prob = model_proba(url)
+    if threshold is None:
+        threshold = load_model()[1]
+    return int(prob >= threshold)
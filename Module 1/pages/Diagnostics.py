@@ -0,0 +1,36 @@
+import streamlit as st, pandas as pd
+import tracing
+from agent import USAGE_LOG
+
+# Streamlit UI
+st.title('Diagnostics')
+st.text(f'PhishingGuard 요청 처리 단계별 소요 시간입니다. (단계별 최근 {tracing.WINDOW}건 기준) ⏱️')
+
+stats = tracing.snapshot()
+if not stats:
+    st.info('아직 기록된 요청이 없습니다. Home에서 질문을 먼저 해보세요.')
+else:
+    df = pd.DataFrame.from_dict(stats, orient='index')
+    df.index.name = '단계'
+    st.dataframe(df.style.format({c: '{:.1f}' for c in df.columns if c.endswith('_ms')}))
+    st.bar_chart(df[['p50_ms', 'p95_ms']])
+
+# 토큰 사용량 (프롬프트 캐시 적중 여부)
+usage = list(USAGE_LOG)
+if usage:
+    st.subheader('토큰 사용량')
+    usage_df = pd.DataFrame(usage)
+    total_in = int(usage_df['input_tokens'].sum())
+    total_cached = int(usage_df['cached_tokens'].sum())
+    st.metric('캐시된 입력 토큰 비율', f"{(total_cached / total_in * 100) if total_in else 0:.1f}%")
+    st.dataframe(usage_df.groupby('stage')[['input_tokens', 'cached_tokens', 'uncached_tokens', 'output_tokens']].sum())
+
+col1, col2 = st.columns(2)
+with col1:
+    st.download_button('JSON 내보내기', data=tracing.export_json(), file_name='phishingguard_trace.json',
+                       mime='application/json', use_container_width=True)
+with col2:
+    if st.button('기록 초기화', use_container_width=True):
+        tracing.reset()
+        USAGE_LOG.clear()
+        st.rerun()
@@ -0,0 +1,81 @@
+import math
+import numpy as np
+from multiprocessing import Pool, cpu_count, shared_memory
+from tqdm import tqdm
+
+# 워커 1개가 한 번에 처리할 최소 URL 수
+# 정규식 기반 특징 추출은 URL당 수 µs 수준이라 작업을 잘게 나누면 프로세스 간 통신(IPC) 비용이 더 큼
+MIN_CHUNK_SIZE = 2000
+
+# 워커 프로세스 전역 상태 (initializer에서 한 번만 설정)
+_shm = None         # 결과를 쓰는 공유 메모리
+_out = None         # 공유 메모리 위의 (N, 특징 수) 행렬
+_extract = None     # 특징 추출 함수
+_columns = None     # 특징 컬럼 순서
+
+def _init_worker(shm_name, shape, extract_fn, columns):
+    global _shm, _out, _extract, _columns
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _out = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _extract = extract_fn
+    _columns = columns
+
+# 청크 하나를 추출해서 공유 메모리의 해당 행에 바로 기록 (결과를 pickle로 돌려보내지 않음)
+def _fill_rows(out, start, urls, extract_fn, columns):
+    for i, url in enumerate(urls, start):
+        feats = extract_fn(url)
+        if feats:
+            out[i] = [feats.get(c, np.nan) for c in columns]
+    return len(urls)
+
+def _fill_chunk(task):
+    start, urls = task
+    return _fill_rows(_out, start, urls, _extract, _columns)
+
+# 특징 컬럼 순서 결정 (첫 번째로 추출에 성공한 URL 기준)
+def _detect_columns(urls, extract_fn):
+    for url in urls:
+        feats = extract_fn(url)
+        if feats:
+            return list(feats.keys())
+    return []
+
+def extract_features_matrix(urls, extract_fn, n_workers=None, chunk_size=None):
+    '''
+    URL 목록의 특징을 (N, 특징 수) float64 행렬로 추출하는 함수입니다.
+    - URL을 큰 청크로 나눠 워커에 보내고, 워커는 공유 메모리 행렬에 결과를 직접 기록합니다.
+    - 추출에 실패한 URL(빈 dict 반환)의 행은 NaN입니다.
+    - extract_fn은 워커에서 import 가능한 모듈 수준 함수여야 합니다. (Windows spawn 방식)
+    반환: (행렬, 컬럼 목록)
+    '''
+    urls = [str(u) for u in urls]
+    n = len(urls)
+    columns = _detect_columns(urls, extract_fn)
+    n_workers = n_workers or cpu_count()
+    if not chunk_size:
+        # 워커당 4청크 정도로 나누되 너무 잘게 쪼개지 않음
+        chunk_size = max(MIN_CHUNK_SIZE, math.ceil(n / (n_workers * 4)))
+
+    # 데이터가 적거나 워커가 1개면 프로세스 생성 비용이 더 큼 → 현재 프로세스에서 처리
+    if n_workers <= 1 or n <= chunk_size or not columns:
+        out = np.full((n, len(columns)), np.nan, dtype=np.float64)
+        if columns:
+            _fill_rows(out, 0, urls, extract_fn, columns)
+        return out, columns
+
+    shape = (n, len(columns))
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n * len(columns) * 8))
+    try:
+        out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        out.fill(np.nan)
+        tasks = [(start, urls[start:start + chunk_size]) for start in range(0, n, chunk_size)]
+        with Pool(n_workers, initializer=_init_worker, initargs=(shm.name, shape, extract_fn, columns)) as pool:
+            with tqdm(total=n, desc="Extracting Features") as bar:
+                for done in pool.imap_unordered(_fill_chunk, tasks):
+                    bar.update(done)
+        result = out.copy()     # 공유 메모리 해제 전에 복사
+        del out
+    finally:
+        shm.close()
+        shm.unlink()
+    return result, columns
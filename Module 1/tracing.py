@@ -0,0 +1,80 @@
+import json, threading, time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+# 단계별로 보관할 최근 기록 수 (오래된 기록은 자동으로 밀려남)
+WINDOW = 500
+
+_lock = threading.Lock()
+_durations = defaultdict(lambda: deque(maxlen=WINDOW))     # 단계명 → 최근 소요 시간(초)
+_totals = defaultdict(int)                                  # 단계명 → 누적 호출 수
+
+# 소요 시간 기록
+def record(name, seconds):
+    with _lock:
+        _durations[name].append(seconds)
+        _totals[name] += 1
+
+# with span("단계명"): ... 블록의 소요 시간 기록
+@contextmanager
+def span(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+# 함수 전체 소요 시간 기록 데코레이터 (이름을 안 주면 함수명 사용)
+def traced(name=None):
+    def deco(fn):
+        stage = name or fn.__name__
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def _percentile(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(p / 100 * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+def snapshot():
+    '''
+    단계별 통계를 반환하는 함수입니다. (시간 단위: ms, 최근 WINDOW개 기준)
+    반환: {단계명: {"count", "total_count", "mean_ms", "p50_ms", "p95_ms", "max_ms", "last_ms"}}
+    '''
+    with _lock:
+        items = {name: list(vals) for name, vals in _durations.items()}
+        totals = dict(_totals)
+
+    stats = {}
+    for name, vals in sorted(items.items()):
+        s = sorted(vals)
+        stats[name] = {
+            "count": len(vals),
+            "total_count": totals.get(name, len(vals)),
+            "mean_ms": sum(vals) / len(vals) * 1000 if vals else 0.0,
+            "p50_ms": _percentile(s, 50) * 1000,
+            "p95_ms": _percentile(s, 95) * 1000,
+            "max_ms": (s[-1] if s else 0.0) * 1000,
+            "last_ms": (vals[-1] if vals else 0.0) * 1000,
+        }
+    return stats
+
+# 통계를 JSON 문자열로 내보내기 (path를 주면 파일로도 저장)
+def export_json(path=None):
+    data = json.dumps({"window": WINDOW, "stages": snapshot()}, ensure_ascii=False, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+    return data
+
+# 기록 초기화
+def reset():
+    with _lock:
+        _durations.clear()
+        _totals.clear()
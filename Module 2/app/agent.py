@@ -1,43 +1,68 @@
 # agent.py
 """
-XLSX/PDF → intermediate(.intermediate.jsonl/.csv) → PII(.pii.jsonl/.csv)
+XLSX/PDF → intermediate(.intermediate.parquet) → PII(.pii.parquet) → (선택) 마스킹
 
 - 모듈로 import해서 UI/다른 코드에서 run_agent_on_paths(...) 호출 가능
 - CLI로도 실행 가능: python agent.py <files/dirs> [옵션]
+- 저장 포맷은 formats로 선택(parquet/jsonl/csv, 기본: parquet — pyarrow 미설치 시 jsonl)
+- in_memory=True: 추출 → 필터 → 마스킹을 메모리에서 이어 처리하고 레코드를 그대로 반환(UI용)
 
 의존 모듈
-- xlsx_to_intermediate.py : xlsx_to_records, dump_jsonl, dump_csv
-- pdf_to_intermediate.py  : pdf_text_records, pdf_table_records, dump_jsonl, dump_csv
+- xlsx_to_intermediate.py : xlsx_to_records
+- pdf_to_intermediate.py  : pdf_records
 - filter_pii_from_intermediate.py :
-    - filter_records(records, dedupe_mode=..., debug_drops=...)
+    - filter_records(records, dedupe_mode=..., debug_drops=..., profile_sample=..., dedupe_budget_mb=...)
     - aggregate_pdf_lines(records, y_tol=...)
-    - dump_jsonl, dump_csv
+- pdf_layout.py : layout_records (단/블록 인식 라인 재구성, layout=True)
+- detectors_pii.py : set_validation_mode (카드/주민번호 체크섬 검증 수준)
+- mask_pii.py : process (마스킹)
+- intermediate_io.py : write_records, tee_records (Parquet/JSONL/CSV 공용)
 """
 
 import argparse
+import multiprocessing
+import os
+import queue
 import sys
+import time
 import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 # --- 기존 모듈 import ---
-from xlsx_to_intermediate import (
-    xlsx_to_records,
-    dump_jsonl as dump_jsonl_xlsx,
-    dump_csv as dump_csv_xlsx,
-)
-from pdf_to_intermediate import (
-    pdf_text_records,
-    pdf_table_records,
-    dump_jsonl as dump_jsonl_pdf,
-    dump_csv as dump_csv_pdf,
-)
+from xlsx_to_intermediate import xlsx_to_records, KEYS as KEYS_INTER
+from pdf_to_intermediate import pdf_records
+from record_ids import DEFAULT_ID_SCHEME
+from scan_manifest import ScanManifest, detector_version, file_digest
 from filter_pii_from_intermediate import (
     filter_records as pii_filter_records,
     aggregate_pdf_lines,
-    dump_jsonl as dump_jsonl_pii,
-    dump_csv as dump_csv_pii,
+    KEYS_OUT as KEYS_PII,
+)
+import detectors_pii
+from detectors_pii import VALIDATION_MODES, set_validation_mode
+from pdf_layout import layout_records
+from mask_pii import (
+    process as mask_process,
+    parse_types as parse_mask_types,
+    output_fieldnames as mask_fieldnames,
 )
+from intermediate_io import (
+    DEFAULT_FORMATS,
+    output_paths,
+    parse_formats,
+    primary_path,
+    read_records,
+    tee_records,
+    write_records,
+)
+
+# mask_pii CLI와 같은 출력 파일 접미사
+MASK_SUFFIX = {"both": "masked", "masked_only": "masked_only", "replace": "masked_replace"}
+
+# 파일 타임아웃 확인 주기(초)
+TIMEOUT_POLL_SEC = 0.5
 
 # -----------------------
 # 내부 유틸
@@ -52,72 +77,278 @@ def _discover_inputs(target: Path, recurse: bool):
             if p.is_file() and p.suffix.lower() in {".xlsx", ".pdf"}:
                 yield p
 
-def _make_intermediate(
+def _iter_intermediate(
     input_path: Path,
-    out_prefix: str,
     *,
     pdf_mode: str = "both",
     aggregate_lines: bool = False,
     line_y_tol: float = 2.5,
-) -> Path:
-    """
-    입력(.xlsx/.pdf) → 중간 산출물 저장 후 JSONL 경로 반환
-    - out_prefix.intermediate.jsonl
-    - out_prefix.intermediate.csv
-    """
+    layout: bool = False,
+    id_scheme: str = DEFAULT_ID_SCHEME,
+    pdf_workers: int = 1,
+) -> Iterable[Dict]:
+    """입력(.xlsx/.pdf) → intermediate 레코드"""
     ext = input_path.suffix.lower()
-    inter_jsonl = Path(f"{out_prefix}.intermediate.jsonl")
-    inter_csv   = Path(f"{out_prefix}.intermediate.csv")
 
     if ext == ".xlsx":
-        recs = list(xlsx_to_records(str(input_path)))
-        dump_jsonl_xlsx(recs, str(inter_jsonl))
-        dump_csv_xlsx(recs, str(inter_csv))
-
-    elif ext == ".pdf":
-        recs: List[Dict] = []
-        if pdf_mode in ("text", "both"):
-            recs.extend(pdf_text_records(str(input_path)))
-        if pdf_mode in ("table", "both"):
-            recs.extend(pdf_table_records(str(input_path)))
-        if aggregate_lines:
-            # pdf_text 토큰으로 합성된 라인도 함께 저장(추가 신호)
+        # 셀 단위 스트리밍(리스트로 모으지 않음)
+        return xlsx_to_records(str(input_path), id_scheme)
+
+    if ext == ".pdf":
+        # 문서를 한 번만 열어 페이지마다 단어/표를 함께 추출
+        recs: List[Dict] = list(pdf_records(str(input_path), pdf_mode, id_scheme, workers=pdf_workers))
+        if layout:
+            # 단(가로 간격)/블록(세로 근접)을 인식해 재구성한 라인·블록을 함께 사용
+            recs = recs + layout_records(recs, y_tol=line_y_tol)
+        elif aggregate_lines:
+            # pdf_text 토큰으로 합성된 라인도 함께 사용(추가 신호)
             recs = recs + aggregate_pdf_lines(recs, y_tol=line_y_tol)
+        return recs
 
-        dump_jsonl_pdf(recs, str(inter_jsonl))
-        dump_csv_pdf(recs, str(inter_csv))
+    raise ValueError(f"지원하지 않는 확장자: {ext}")
 
-    else:
-        raise ValueError(f"지원하지 않는 확장자: {ext}")
+def _process_file(
+    in_path: Path,
+    out_prefix: str,
+    *,
+    pdf_mode: str,
+    aggregate_lines: bool,
+    line_y_tol: float,
+    layout: bool,
+    id_scheme: str,
+    pdf_workers: int,
+    dedupe: str,
+    debug_drops: bool,
+    profile_sample: int,
+    checksum: str,
+    dedupe_budget_mb: float,
+    formats: Sequence[str],
+    mask_types: Optional[Set[str]],
+    mask_output: str,
+    keep_records: bool,
+) -> Dict:
+    """
+    추출 → PII 필터 → (선택) 마스킹을 generator로 이어서 처리.
+    - 레코드는 파일을 거치지 않고 다음 단계로 바로 흘러감
+    - formats에 지정된 포맷만 단계별 산출물(.intermediate/.pii/.masked_*)로 기록
+    """
+    t0 = time.perf_counter()
+    set_validation_mode(checksum)  # 프로세스 풀 작업자에도 적용되도록 파일마다 설정
+    inter_paths = output_paths(f"{out_prefix}.intermediate", formats)
+    pii_paths   = output_paths(f"{out_prefix}.pii", formats)
+    counter = {"inter_rows": 0}
 
-    return inter_jsonl
+    def _count(recs: Iterable[Dict]) -> Iterable[Dict]:
+        for r in recs:
+            counter["inter_rows"] += 1
+            yield r
 
-def _iter_jsonl(path: str) -> Iterable[Dict]:
-    import json
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if s:
-                yield json.loads(s)
+    records = _iter_intermediate(
+        in_path,
+        pdf_mode=pdf_mode,
+        aggregate_lines=aggregate_lines,
+        line_y_tol=line_y_tol,
+        layout=layout,
+        id_scheme=id_scheme,
+        pdf_workers=pdf_workers,
+    )
+    records = _count(records)
+    if inter_paths:
+        records = tee_records(records, inter_paths, KEYS_INTER)
 
-def _run_filter(
-    intermediate_jsonl: Path,
-    out_prefix: str,
+    profile_stats: Dict = {}
+    pii_rows = list(pii_filter_records(records, dedupe_mode=dedupe, debug_drops=debug_drops,
+                                       profile_sample=profile_sample, profile_stats=profile_stats,
+                                       dedupe_budget_mb=dedupe_budget_mb))
+    write_records(pii_rows, pii_paths, KEYS_PII)
+
+    res = {
+        "in_path": str(in_path),
+        "out_prefix": out_prefix,
+        "inter_path": primary_path(inter_paths) if inter_paths else None,
+        "pii_path": primary_path(pii_paths) if pii_paths else None,
+        "inter_jsonl": inter_paths.get("jsonl"),
+        "pii_jsonl": pii_paths.get("jsonl"),
+        "pii_csv": pii_paths.get("csv"),
+        "pii_rows": len(pii_rows),
+        "inter_rows": counter["inter_rows"],  # 추출된 셀/단어/라인 수
+    }
+    if profile_sample:
+        res["profile"] = profile_stats  # 컬럼 프로파일링 처리 방식별 컬럼/셀 수
+
+    masked_rows = None
+    if mask_types:
+        masked_rows = mask_process(pii_rows, set(mask_types), mask_output)
+        masked_paths = output_paths(f"{out_prefix}.{MASK_SUFFIX[mask_output]}", formats)
+        write_records(masked_rows, masked_paths, mask_fieldnames(masked_rows, mask_output))
+        res["masked_path"] = primary_path(masked_paths) if masked_paths else None
+        res["masked_rows"] = len(masked_rows)
+
+    if keep_records:
+        res["pii_records"] = pii_rows
+        res["masked_records"] = masked_rows
+    res["elapsed_sec"] = time.perf_counter() - t0
+    return res
+
+def _error_result(in_path: Path, e: BaseException) -> Dict:
+    return {
+        "in_path": str(in_path),
+        "error": str(e) or type(e).__name__,
+        "trace": "".join(traceback.format_exception(type(e), e, e.__traceback__)),
+    }
+
+def _run_sequential(
+    tasks: List[Tuple[Path, str]],
+    file_kwargs: Dict,
     *,
-    dedupe: str = "by_location",
-    debug_drops: bool = False,
-):
+    stop_on_error: bool,
+    progress: Optional[Callable[[int, int, Dict], None]],
+) -> List[Dict]:
+    results: List[Dict] = []
+    for i, (in_path, out_prefix) in enumerate(tasks, start=1):
+        try:
+            results.append(_process_file(in_path, out_prefix, **file_kwargs))
+        except Exception as e:
+            if stop_on_error:
+                raise
+            results.append(_error_result(in_path, e))
+        if progress:
+            progress(i, len(tasks), results[-1])
+    return results
+
+def _unchanged(path: Path, st: os.stat_result) -> bool:
+    """처리 후에도 크기/mtime이 처리 전 stat과 같은지(처리 중 바뀐 파일은 매니페스트에 기록하지 않음)"""
+    try:
+        cur = path.stat()
+    except OSError:
+        return False
+    return (cur.st_size, cur.st_mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+def _load_records(prev: Dict) -> bool:
+    """매니페스트 재사용 결과에 in_memory용 레코드를 이전 산출물에서 채움(산출물이 없으면 False)"""
+    if not prev.get("pii_path"):
+        return False
+    if prev.get("masked_rows") is not None and not prev.get("masked_path"):
+        return False
+    prev["pii_records"] = list(read_records(prev["pii_path"]))
+    prev["masked_records"] = list(read_records(prev["masked_path"])) if prev.get("masked_path") else None
+    return True
+
+# 풀 작업자: 작업을 실제로 시작한 시각을 보고할 큐(작업자 초기화 시 설정)
+_START_QUEUE = None
+
+def _init_pool_worker(q):
+    global _START_QUEUE
+    _START_QUEUE = q
+
+def _pool_task(i: int, in_path: Path, out_prefix: str, **file_kwargs) -> Dict:
+    """작업자에서 시작 시각(time.time)을 보고한 뒤 _process_file 실행"""
+    _START_QUEUE.put((i, time.time()))
+    return _process_file(in_path, out_prefix, **file_kwargs)
+
+def _kill_pool(ex: ProcessPoolExecutor):
+    """멈춘 작업자는 정상 종료를 기다릴 수 없으므로 강제 종료"""
+    for proc in list((getattr(ex, "_processes", None) or {}).values()):
+        proc.terminate()
+    ex.shutdown(wait=False, cancel_futures=True)
+
+def _run_in_pool(
+    tasks: List[Tuple[Path, str]],
+    file_kwargs: Dict,
+    *,
+    jobs: int,
+    file_timeout: Optional[float],
+    stop_on_error: bool,
+    progress: Optional[Callable[[int, int, Dict], None]],
+) -> List[Dict]:
     """
-    intermediate JSONL을 읽어 PII 필터 → .pii.jsonl/.pii.csv 저장
+    파일 단위 작업을 프로세스 풀에서 실행하고 입력 순서대로 결과 반환.
+    - file_timeout: 작업자가 실제로 시작한 시각(작업자가 큐로 보고)부터 초과하면 timeout 에러로 기록
+      → 풀을 즉시 종료하고 새 풀에 남은 작업을 다시 제출(멈춘 작업자가 다른 작업을 막지 않음,
+        함께 실행 중이던 작업은 처음부터 다시 실행)
     """
-    rows = list(pii_filter_records(_iter_jsonl(str(intermediate_jsonl)),
-                                   dedupe_mode=dedupe,
-                                   debug_drops=debug_drops))
-    out_jsonl = Path(f"{out_prefix}.pii.jsonl")
-    out_csv   = Path(f"{out_prefix}.pii.csv")
-    dump_jsonl_pii(rows, str(out_jsonl))
-    dump_csv_pii(rows, str(out_csv))
-    return out_jsonl, out_csv, len(rows)
+    results: List[Optional[Dict]] = [None] * len(tasks)
+    n_done = 0
+
+    def _finish(i: int, r: Dict):
+        nonlocal n_done
+        results[i] = r
+        n_done += 1
+        if progress:
+            progress(n_done, len(tasks), r)
+
+    def _collect(f, i: int):
+        try:
+            r = f.result()
+        except Exception as e:
+            if stop_on_error:
+                raise
+            r = _error_result(tasks[i][0], e)
+        _finish(i, r)
+
+    todo = list(range(len(tasks)))
+    while todo:
+        q = multiprocessing.Queue()  # 풀마다 새 큐(강제 종료된 작업자가 쓰던 큐는 버림)
+        ex = ProcessPoolExecutor(max_workers=jobs, initializer=_init_pool_worker, initargs=(q,))
+        futs = {ex.submit(_pool_task, i, *tasks[i], **file_kwargs): i for i in todo}
+        pending = set(futs)
+        started: Dict[int, float] = {}
+        timed_out: List[int] = []
+        try:
+            while pending and not timed_out:
+                done, pending = wait(pending, timeout=TIMEOUT_POLL_SEC if file_timeout else None,
+                                     return_when=FIRST_COMPLETED)
+                for f in done:
+                    _collect(f, futs[f])
+                if not file_timeout:
+                    continue
+                try:
+                    while True:
+                        i, t = q.get_nowait()
+                        started[i] = t
+                except queue.Empty:
+                    pass
+                now = time.time()
+                timed_out = [futs[f] for f in pending
+                             if futs[f] in started and now - started[futs[f]] > file_timeout]
+            # 타임아웃 처리 전에 이미 끝난 작업은 결과를 거둠
+            for f in list(pending):
+                if f.done():
+                    pending.discard(f)
+                    _collect(f, futs[f])
+        finally:
+            if pending:
+                _kill_pool(ex)
+            else:
+                ex.shutdown()
+            q.close()
+        for i in sorted(timed_out):
+            err = TimeoutError(f"파일 처리 시간 초과({file_timeout:g}초)")
+            if stop_on_error:
+                raise err
+            _finish(i, _error_result(tasks[i][0], err))
+        todo = sorted(futs[f] for f in pending if futs[f] not in timed_out)
+    return results
+
+def summarize_results(results: List[Dict], wall_sec: float) -> Dict:
+    """처리량 요약: files/sec, cells/sec(이번에 처리한 파일의 추출 레코드 기준), 건너뛴/처리한 바이트"""
+    ok = [r for r in results if "error" not in r]
+    processed = [r for r in results if not r.get("skipped")]
+    skipped = [r for r in results if r.get("skipped")]
+    inter_rows = sum(r.get("inter_rows", 0) for r in processed if "error" not in r)
+    return {
+        "files": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "skipped": len(skipped),
+        "skipped_bytes": sum(r.get("size_bytes", 0) for r in skipped),
+        "processed_bytes": sum(r.get("size_bytes", 0) for r in processed),
+        "wall_sec": wall_sec,
+        "inter_rows": inter_rows,
+        "pii_rows": sum(r.get("pii_rows", 0) for r in ok),
+        "files_per_sec": len(processed) / wall_sec if wall_sec else 0.0,
+        "cells_per_sec": inter_rows / wall_sec if wall_sec else 0.0,
+    }
 
 # -----------------------
 # 공개 API (UI/스크립트 공용)
@@ -130,14 +361,41 @@ def run_agent_on_paths(
     pdf_mode: str = "both",          # text/table/both
     aggregate_lines: bool = True,    # pdf_text → 라인 집계 추가
     line_y_tol: float = 2.5,
+    layout: bool = False,            # True: 라인 집계 대신 단/블록 인식 재구성(pdf_line/pdf_block)
     dedupe: str = "by_location",     # by_location/by_id/by_text/none
     debug_drops: bool = False,
+    profile_sample: int = 0,         # >0: 컬럼 표본으로 PII 없는 컬럼 건너뜀(재현율 손실 가능)
+    checksum: Optional[str] = None,  # 카드/주민번호 체크섬 검증 off/card/rrn/strict (None: 현재 설정)
+    dedupe_budget_mb: float = 0,     # >0: dedupe 키 집합 메모리 예산(MB), 초과분은 임시 폴더로(결과 동일)
     stop_on_error: bool = False,
+    id_scheme: str = DEFAULT_ID_SCHEME,  # fast/legacy(기존 SHA-256 ID)
+    pdf_workers: int = 1,                # PDF 페이지 병렬 추출 프로세스 수
+    formats: Optional[Sequence[str]] = None,  # 저장 포맷(parquet/jsonl/csv)
+    in_memory: bool = False,             # True: 결과 레코드를 반환, 파일은 formats 지정 시에만 기록
+    mask_types: Optional[Set[str]] = None,  # 지정 시 필터 결과를 바로 마스킹
+    mask_output: str = "replace",        # both/masked_only/replace (mask_pii.process)
+    jobs: int = 1,                       # 파일 단위 병렬 프로세스 수
+    file_timeout: Optional[float] = None,  # 파일당 제한 시간(초), 지정 시 프로세스 풀에서 실행
+    progress: Optional[Callable[[int, int, Dict], None]] = None,  # (완료 수, 전체, 결과) 콜백
+    manifest: Optional[str] = None,      # 증분 재스캔 매니페스트(SQLite) 경로
 ) -> List[Dict]:
     """
-    파일/디렉터리 목록을 받아 intermediate → PII까지 일괄 처리.
-    반환: [{ in_path, out_prefix, inter_jsonl, pii_jsonl, pii_csv, pii_rows } ...]
+    파일/디렉터리 목록을 받아 intermediate → PII(→ 마스킹)까지 일괄 처리.
+    반환: [{ in_path, out_prefix, inter_path, pii_path, inter_jsonl, pii_jsonl, pii_csv, pii_rows } ...]
+      - inter_path/pii_path : 다음 단계가 읽는 대표 파일(parquet > jsonl > csv), 기록 안 했으면 None
+      - inter_jsonl/pii_jsonl/pii_csv : 해당 포맷을 내보낸 경우만 경로, 아니면 None
+      - mask_types 지정 시 masked_path, masked_rows 추가
+      - in_memory=True면 pii_records, masked_records(레코드 리스트) 추가
+      - 성공 결과에는 inter_rows(추출 레코드 수), elapsed_sec 포함
+    formats 기본값: 디스크 모드는 DEFAULT_FORMATS, in_memory 모드는 기록 안 함
+    jobs > 1 또는 file_timeout 지정 시 파일마다 별도 프로세스에서 처리(결과 순서는 입력 순서 유지,
+    PDF 페이지 병렬은 중첩되지 않도록 1로 고정). 에러 처리는 순차 모드와 동일(stop_on_error).
+    manifest 지정 시 경로/크기/mtime/내용 해시/검출기 버전이 같은 파일은 건너뛰고 이전 결과를 재사용
+    (결과에 skipped=True, size_bytes 포함). 성공한 파일만 매니페스트에 기록.
     """
+    if formats is None:
+        formats = () if in_memory else DEFAULT_FORMATS
+
     # 입력 확정
     final_inputs: List[Path] = []
     for p in inputs:
@@ -147,75 +405,126 @@ def run_agent_on_paths(
         for found in _discover_inputs(p, recurse):
             final_inputs.append(found)
 
-    results: List[Dict] = []
     if not final_inputs:
-        return results
+        return []
 
+    tasks: List[Tuple[Path, str]] = []
     for in_path in final_inputs:
-        try:
-            base = in_path.stem
-            odir = out_dir.resolve() if out_dir else in_path.parent
+        odir = out_dir.resolve() if out_dir else in_path.parent
+        if formats:
             odir.mkdir(parents=True, exist_ok=True)
-            out_prefix = str(odir / base)
-
-            # 1) intermediate 생성
-            inter_jsonl = _make_intermediate(
-                in_path,
-                out_prefix,
-                pdf_mode=pdf_mode,
-                aggregate_lines=aggregate_lines,
-                line_y_tol=line_y_tol,
-            )
-
-            # 2) PII 필터
-            pii_jsonl, pii_csv, n = _run_filter(
-                inter_jsonl,
-                out_prefix,
-                dedupe=dedupe,
-                debug_drops=debug_drops,
-            )
-
-            results.append({
-                "in_path": str(in_path),
-                "out_prefix": out_prefix,
-                "inter_jsonl": str(inter_jsonl),
-                "pii_jsonl": str(pii_jsonl),
-                "pii_csv": str(pii_csv),
-                "pii_rows": int(n),
-            })
+        tasks.append((in_path, str(odir / in_path.stem)))
 
-        except Exception as e:
-            if stop_on_error:
-                raise
-            results.append({
-                "in_path": str(in_path),
-                "error": str(e),
-                "trace": traceback.format_exc(),
-            })
-            continue
+    file_kwargs = dict(
+        pdf_mode=pdf_mode,
+        aggregate_lines=aggregate_lines,
+        line_y_tol=line_y_tol,
+        layout=layout,
+        id_scheme=id_scheme,
+        pdf_workers=pdf_workers,
+        dedupe=dedupe,
+        debug_drops=debug_drops,
+        profile_sample=profile_sample,
+        checksum=checksum or detectors_pii.VALIDATION_MODE,
+        dedupe_budget_mb=dedupe_budget_mb,
+        formats=formats,
+        mask_types=mask_types,
+        mask_output=mask_output,
+        keep_records=in_memory,
+    )
+
+    # 매니페스트: 변경 없는 파일은 이전 결과 재사용
+    man = ScanManifest(manifest) if manifest else None
+    version = detector_version({k: v for k, v in file_kwargs.items()
+                                if k not in ("pdf_workers", "debug_drops", "dedupe_budget_mb", "keep_records")}) if man else ""
+    results: List[Optional[Dict]] = [None] * len(tasks)
+    stats: List[os.stat_result] = [in_path.stat() for in_path, _ in tasks]
+    n_done = 0
+    try:
+        todo: List[int] = []
+        for i, (in_path, out_prefix) in enumerate(tasks):
+            prev = man.lookup(in_path, version) if man else None
+            if prev is not None and prev.get("out_prefix") == out_prefix:
+                prev.update(skipped=True, elapsed_sec=0.0, size_bytes=stats[i].st_size)
+                if not in_memory or _load_records(prev):
+                    results[i] = prev
+                    n_done += 1
+                    if progress:
+                        progress(n_done, len(tasks), prev)
+                    continue
+            todo.append(i)
+        # 내용 해시도 stat과 함께 처리 전에 계산(처리 중 바뀐 파일이 다음 실행에서 변경 없음으로 보이지 않게)
+        digests = {i: file_digest(tasks[i][0]) for i in todo} if man else {}
+
+        index_by_path = {str(tasks[i][0]): i for i in todo}
+
+        def _on_done(k: int, _total: int, r: Dict):
+            i = index_by_path[r["in_path"]]
+            r["size_bytes"] = stats[i].st_size
+            r["skipped"] = False
+            if man and "error" not in r and _unchanged(tasks[i][0], stats[i]):
+                man.record(tasks[i][0], version, r, stats[i], digests[i])
+            if progress:
+                progress(n_done + k, len(tasks), r)
+
+        sub = [tasks[i] for i in todo]
+        if jobs > 1 or file_timeout:
+            file_kwargs["pdf_workers"] = 1
+            out = _run_in_pool(sub, file_kwargs, jobs=max(1, jobs), file_timeout=file_timeout,
+                               stop_on_error=stop_on_error, progress=_on_done)
+        else:
+            out = _run_sequential(sub, file_kwargs, stop_on_error=stop_on_error, progress=_on_done)
+        for i, r in zip(todo, out):
+            results[i] = r
+    finally:
+        if man:
+            man.close()
 
     return results
 
 # -----------------------
 # CLI
 # -----------------------
+def _print_progress(done: int, total: int, r: Dict):
+    status = "ERR" if "error" in r else ("skip" if r.get("skipped") else f"{r.get('elapsed_sec', 0):.1f}s")
+    print(f"[{done}/{total}] {r['in_path']} ({status})", file=sys.stderr)
+
 def main():
-    ap = argparse.ArgumentParser(description="Agent: XLSX/PDF → intermediate → PII(8종) 필터")
+    ap = argparse.ArgumentParser(description="Agent: XLSX/PDF → intermediate → PII(8종) 필터 → (선택) 마스킹")
     ap.add_argument("inputs", nargs="+", help="파일(.xlsx/.pdf) 또는 디렉터리(복수 가능)")
     ap.add_argument("--recurse", action="store_true", help="디렉터리 입력 시 하위 폴더까지 탐색")
     ap.add_argument("--out-dir", default="", help="출력 디렉터리(기본: 입력 파일 위치)")
     ap.add_argument("--pdf-mode", choices=["text","table","both"], default="both", help="PDF 처리 모드")
     ap.add_argument("--aggregate-lines", action="store_true", help="PDF 텍스트 라인 집계 활성화")
     ap.add_argument("--line-y-tol", type=float, default=2.5, help="라인 집계 y tolerance")
+    ap.add_argument("--layout", action="store_true",
+                    help="PDF 단어를 단(가로 간격)/블록(세로 근접) 인식으로 재구성(--aggregate-lines 대신 사용)")
     ap.add_argument("--dedupe", choices=["by_location","by_id","by_text","none"], default="by_location",
                     help="PII 중복 제거 기준")
     ap.add_argument("--debug-drops", action="store_true", help="드랍 후보를 디버그 캐시에 남김")
+    ap.add_argument("--profile-sample", type=int, default=0,
+                    help="컬럼별 표본 N개로 PII 없는 컬럼은 건너뛰고 단일 타입 컬럼은 검출기 하나로 처리(0=끔)")
+    ap.add_argument("--checksum", choices=VALIDATION_MODES, default=detectors_pii.VALIDATION_MODE,
+                    help="카드/주민번호 체크섬 검증: off | card(Luhn, 기본) | rrn(+생년월일) | strict(+검증번호)")
+    ap.add_argument("--dedupe-budget-mb", type=float, default=0,
+                    help="dedupe 키 집합 메모리 예산(MB) — 넘으면 임시 폴더로 내보냄(0=제한 없음)")
     ap.add_argument("--stop-on-error", action="store_true", help="에러 시 즉시 중단")
+    ap.add_argument("--legacy-ids", action="store_true", help="기존 SHA-256 기반 레코드 ID 유지(이전 산출물과 ID 호환)")
+    ap.add_argument("--workers", type=int, default=1, help="PDF 페이지 병렬 추출 프로세스 수(1=순차)")
+    ap.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                    help="저장 포맷(쉼표 구분): parquet,jsonl,csv — JSONL/CSV는 필요할 때만 내보내기")
+    ap.add_argument("--mask", default="", help="필터 결과를 바로 마스킹할 타입: all | comma list (기본: 마스킹 안 함)")
+    ap.add_argument("--jobs", type=int, default=1, help="파일 단위 병렬 프로세스 수(1=순차)")
+    ap.add_argument("--file-timeout", type=float, default=0, help="파일당 제한 시간(초, 0=제한 없음)")
+    ap.add_argument("--manifest", default="", help="증분 재스캔 매니페스트(SQLite) 경로 — 변경 없는 파일은 건너뜀")
+    ap.add_argument("--mask-output", choices=["both","masked_only","replace"], default="replace",
+                    help="마스킹 출력 형식(mask_pii.py --output과 동일)")
     args = ap.parse_args()
 
     inputs = [Path(x) for x in args.inputs]
     out_dir = Path(args.out_dir) if args.out_dir else None
 
+    t0 = time.perf_counter()
     results = run_agent_on_paths(
         inputs,
         out_dir=out_dir,
@@ -223,10 +532,24 @@ def main():
         pdf_mode=args.pdf_mode,
         aggregate_lines=args.aggregate_lines,
         line_y_tol=args.line_y_tol,
+        layout=args.layout,
         dedupe=args.dedupe,
         debug_drops=args.debug_drops,
+        profile_sample=args.profile_sample,
+        checksum=args.checksum,
+        dedupe_budget_mb=args.dedupe_budget_mb,
         stop_on_error=args.stop_on_error,
+        id_scheme="legacy" if args.legacy_ids else DEFAULT_ID_SCHEME,
+        pdf_workers=args.workers,
+        formats=parse_formats(args.formats),
+        mask_types=parse_mask_types(args.mask) if args.mask else None,
+        mask_output=args.mask_output,
+        jobs=args.jobs,
+        file_timeout=args.file_timeout or None,
+        progress=_print_progress,
+        manifest=args.manifest or None,
     )
+    wall = time.perf_counter() - t0
 
     if not results:
         print("[ERR] 처리할 입력이 없습니다.", file=sys.stderr)
@@ -238,8 +561,23 @@ def main():
             print(r["trace"], file=sys.stderr)
         else:
             print(f"\n[AGENT] Processing: {r['in_path']}")
-            print(f"[OK] Intermediate: {r['inter_jsonl']}")
-            print(f"[OK] PII: {r['pii_jsonl']} / {r['pii_csv']} (rows={r['pii_rows']})")
+            print(f"[OK] Intermediate: {r['inter_path']}")
+            print(f"[OK] PII: {r['pii_path']} (rows={r['pii_rows']})")
+            if "masked_path" in r:
+                print(f"[OK] Masked: {r['masked_path']} (rows={r['masked_rows']})")
+
+    s = summarize_results(results, wall)
+    print(f"\n[SUMMARY] files={s['files']} (ok={s['ok']}, errors={s['errors']}) / {s['wall_sec']:.1f}s"
+          f" / {s['files_per_sec']:.2f} files/s / {s['cells_per_sec']:,.0f} cells/s (cells={s['inter_rows']:,}, pii={s['pii_rows']:,})")
+    if args.manifest:
+        print(f"[MANIFEST] skipped {s['skipped']} files ({s['skipped_bytes'] / 2**20:,.1f} MB)"
+              f" / processed {s['files'] - s['skipped']} files ({s['processed_bytes'] / 2**20:,.1f} MB)")
+    if args.profile_sample:
+        prof: Dict[str, int] = {}
+        for r in results:
+            for k, v in (r.get("profile") or {}).items():
+                prof[k] = prof.get(k, 0) + v
+        print("[PROFILE] " + " ".join(f"{k}={v:,}" for k, v in sorted(prof.items())))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,164 @@
+# dedupe_index.py
+# 역할:
+#  - filter_records의 dedupe 집합(64비트 키 해시)을 메모리 예산 안에서 보관
+#  - 기본(filter_records의 dedupe_budget_mb=0)은 파이썬 set — 수백만 건 이상에서 메모리를 제한할 때 사용
+#
+# 방식:
+#  - 키 = dedupe_hash(64비트 정수) → NumPy uint64 오픈 어드레싱 테이블(선형 탐사, 0은 빈 칸 표시)
+#    항목당 8바이트 × (1 / 적재율) — 파이썬 set의 int 항목(약 60~90바이트)보다 훨씬 작음
+#  - 테이블이 예산에 도달하면 정렬해 디스크 런(run) 파일로 내보내고(spill) 테이블을 비움
+#    런은 np.memmap으로 열어 searchsorted로 조회(페이지 캐시에 맡김, 힙 메모리 사용 없음)
+#  - 크기 계층 병합: 새 런을 붙인 뒤 바로 앞 런이 새 런 크기 이하인 동안 둘을 합침(이진 카운터와 같은 모양)
+#    → 런 수는 log2(spill 수) + 1 이하, 각 키가 다시 쓰이는 횟수도 log2 수준(전체를 매번 다시 쓰지 않음)
+#    병합은 청크 단위(병합 중 메모리도 청크 크기로 제한)
+#
+# 사용:
+#   seen = DedupeIndex(budget_mb=256)
+#   if seen.add(key): ...새 키...   (key in seen도 가능)
+
+import os, shutil, tempfile, weakref
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 테이블 적재율 상한(넘으면 2배로 키우거나, 예산 초과면 디스크로 내보냄)
+MAX_LOAD = 0.5
+# 처음 테이블 칸 수(2의 거듭제곱)
+INITIAL_SLOTS = 1 << 16
+# 병합 청크 크기(키 수)
+MERGE_CHUNK = 1 << 20
+
+_EMPTY = np.uint64(0)
+_ZERO_KEY = 1  # 키 0은 빈 칸 표시와 겹치므로 1로 대체(64비트 해시라 충돌 확률 변화 무시 가능)
+
+class DedupeIndex:
+    """64비트 정수 키 집합: NumPy 오픈 어드레싱 테이블 + 예산 초과 시 정렬된 디스크 런"""
+
+    def __init__(self, budget_mb: float = 256, spill_dir: Optional[str] = None):
+        # 예산 하한은 INITIAL_SLOTS 칸(0.5MB) — 그보다 작으면 spill이 너무 잦아짐
+        budget_slots = max(INITIAL_SLOTS, int(budget_mb * 2**20) // 8)
+        self.max_slots = 1 << (budget_slots.bit_length() - 1)  # 예산 안의 최대 2의 거듭제곱
+        self.spill_dir = spill_dir
+        self._dir: Optional[str] = None
+        self._runs: List[np.ndarray] = []
+        self._paths: List[str] = []
+        self._spills = 0
+        self._alloc(min(INITIAL_SLOTS, self.max_slots))
+
+    # ---------- 테이블 ----------
+    def _alloc(self, slots: int):
+        self.table = np.zeros(slots, dtype=np.uint64)
+        self.mask = slots - 1
+        self.count = 0
+        self.limit = int(slots * MAX_LOAD)
+
+    def _slot(self, key: int) -> int:
+        """key가 있는 칸 또는 들어갈 빈 칸 위치(비교는 파이썬 int로 — NumPy 스칼라 생성 비용 회피)"""
+        item, mask = self.table.item, self.mask
+        i = key & mask  # 키가 이미 균일한 해시값이므로 하위 비트를 그대로 사용
+        while True:
+            v = item(i)
+            if v == key or v == 0:
+                return i
+            i = (i + 1) & mask
+
+    def _grow(self):
+        keys = self.table[self.table != _EMPTY]
+        self._alloc(len(self.table) * 2)
+        for key in keys.tolist():
+            self.table[self._slot(key)] = key
+        self.count = len(keys)
+
+    # ---------- set 인터페이스 ----------
+    def __contains__(self, key: int) -> bool:
+        key = key or _ZERO_KEY
+        if self.table.item(self._slot(key)):
+            return True
+        return any(_run_contains(run, key) for run in self._runs)
+
+    def add(self, key: int) -> bool:
+        """새 키면 추가하고 True, 이미 있으면 False"""
+        key = key or _ZERO_KEY
+        i = self._slot(key)
+        if self.table.item(i):
+            return False
+        if any(_run_contains(run, key) for run in self._runs):
+            return False
+        self.table[i] = key
+        self.count += 1
+        if self.count >= self.limit:
+            if len(self.table) < self.max_slots:
+                self._grow()
+            else:
+                self._spill()
+        return True
+
+    def __len__(self) -> int:
+        return self.count + sum(len(run) for run in self._runs)
+
+    # ---------- 디스크 런 ----------
+    def _new_path(self) -> str:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="pii_dedupe_", dir=self.spill_dir)
+            # 인덱스가 사라지면(필터 generator 종료 등) 런 파일 정리
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._dir, True)
+        self._spills += 1
+        return os.path.join(self._dir, f"run_{self._spills}.u64")
+
+    def _spill(self):
+        keys = np.sort(self.table[self.table != _EMPTY])
+        path = self._new_path()
+        keys.tofile(path)
+        self._runs.append(np.memmap(path, dtype=np.uint64, mode="r"))
+        self._paths.append(path)
+        self.table.fill(0)
+        self.count = 0
+        # 크기 계층 병합: 앞 런이 새(합쳐진) 런보다 크면 멈춤 → 큰 런은 비슷한 크기가 될 때만 다시 쓰임
+        while len(self._runs) >= 2 and len(self._runs[-2]) <= len(self._runs[-1]):
+            self._merge_last_two()
+
+    def _merge_last_two(self):
+        """마지막 두 런을 청크 단위 병합으로 하나로(키는 런 사이에 중복 없음)"""
+        a, b = self._runs[-2], self._runs[-1]
+        path = self._new_path()
+        with open(path, "wb") as f:
+            _merge_sorted(a, b, f)
+        old = self._paths[-2:]
+        # 원래 런의 memmap 해제 후 파일 삭제(Windows에서는 매핑 중 삭제 불가)
+        del a, b, self._runs[-2:], self._paths[-2:]
+        for p in old:
+            os.remove(p)
+        self._runs.append(np.memmap(path, dtype=np.uint64, mode="r"))
+        self._paths.append(path)
+
+    def stats(self) -> Dict:
+        """keys, table_mb(메모리 테이블), runs/run_keys(디스크), spills"""
+        return {"keys": len(self), "table_mb": self.table.nbytes / 2**20, "runs": len(self._runs),
+                "run_keys": sum(len(r) for r in self._runs), "spills": self._spills}
+
+    def close(self):
+        self._runs = []
+        self._paths = []
+        if self._dir is not None:
+            self._finalizer()
+
+def _run_contains(run: np.ndarray, key: int) -> bool:
+    k = np.uint64(key)
+    i = int(np.searchsorted(run, k))
+    return i < len(run) and run[i] == k
+
+def _merge_sorted(a: np.ndarray, b: np.ndarray, f):
+    """정렬된 두 배열을 병합해 파일에 기록(한 번에 최대 2 × MERGE_CHUNK개만 메모리에 올림)"""
+    i = j = 0
+    na, nb = len(a), len(b)
+    while i < na or j < nb:
+        if i >= na:
+            np.asarray(b[j:]).tofile(f); return
+        if j >= nb:
+            np.asarray(a[i:]).tofile(f); return
+        # 두 배열에서 각각 청크 끝값 중 작은 값까지 잘라 병합 → 각 조각은 MERGE_CHUNK 이하
+        cut = min(a[min(i + MERGE_CHUNK, na) - 1], b[min(j + MERGE_CHUNK, nb) - 1])
+        i2 = int(np.searchsorted(a, cut, side="right"))
+        j2 = int(np.searchsorted(b, cut, side="right"))
+        np.sort(np.concatenate((a[i:i2], b[j:j2]))).tofile(f)
+        i, j = i2, j2
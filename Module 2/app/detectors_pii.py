@@ -2,6 +2,7 @@
 # 역할:
 #  - 8종 PII(이름, 여권번호, 운전면허번호, 주민등록번호, 주소, 이메일, 연락처, 카드정보) 판별
 #  - 필터 모듈에서 import하여 `classify_text(text, context)`로 사용
+#  - 한 줄에 여러 PII가 있는 텍스트(pdf_line)는 `find_spans(text)`로 (타입, 시작, 끝) 목록 검출
 # 설계 원칙:
 #  - 문자열 정규화 후 판정(제로폭 문자/다양한 대시/공백 정리)
 #  - 이름(name)은 오탐 방지를 위해 "헤더 단서가 있을 때만" 판정 (표/엑셀용)
@@ -12,24 +13,22 @@
 #
 # 반환값: {"name","passport","driver_license","rrn","address","email","phone","card"} 또는 None
 
-import re
-from typing import Optional, Dict
+import datetime, os, re
+from functools import lru_cache
+from typing import Optional, Dict, List, NamedTuple, Tuple
 
 # ========= 텍스트 정규화 =========
-_ZW_CHARS = dict.fromkeys(map(ord, ["\u200b", "\u200c", "\u200d", "\ufeff", "\u2060"]), None)
+# zero-width 제거 + 다양한 하이픈/대시를 ASCII '-'로 통일 (translate 한 번)
+_NORM_TABLE = {
+    **dict.fromkeys(map(ord, ["\u200b", "\u200c", "\u200d", "\ufeff", "\u2060"]), None),
+    **dict.fromkeys(map(ord, ["\u2010", "\u2011", "\u2012", "\u2013", "\u2014"]), "-"),
+}
 
 def normalize_text(s: str) -> str:
     if not isinstance(s, str):
         return s
-    s = s.translate(_ZW_CHARS)  # zero-width 제거
-    # 다양한 하이픈/대시를 ASCII '-'로 통일
-    s = (s.replace("\u2010", "-")
-           .replace("\u2011", "-")
-           .replace("\u2012", "-")
-           .replace("\u2013", "-")
-           .replace("\u2014", "-"))
     # 공백 정리
-    return " ".join(s.split())
+    return " ".join(s.translate(_NORM_TABLE).split())
 
 # ========= 패턴 =========
 EMAIL = re.compile(r'(?i)\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b')
@@ -42,7 +41,7 @@ E164_PHONE   = re.compile(r'(?<!\d)\+?\d{8,15}(?!\d)')
 # 주민등록번호
 RRN = re.compile(r'(?<!\d)\d{6}-?\d{7}(?!\d)')
 
-# 카드번호(포맷 기반) - 실무에서는 Luhn 검증을 추가 권장
+# 카드번호(포맷 기반) - Luhn 검증은 아래 체크섬 검증 단계에서(VALIDATION_MODE)
 CARD_16   = re.compile(r'(?<!\d)(\d{4})[-\s]?(\d{4})[-\s]?(\d{4})[-\s]?(\d{4})(?!\d)')
 CARD_4_6_5= re.compile(r'(?<!\d)(\d{4})[-\s]?(\d{6})[-\s]?(\d{5})(?!\d)')
 
@@ -59,6 +58,8 @@ ADDR_CORE = re.compile(r'(?=.*(시|군|구))(?=.*(동|읍|면|리|로|길|번길
 
 # 이름(보수적): 2~4자 한글
 HANGUL_NAME = re.compile(r'^[가-힣]{2,4}$')
+# 인라인 성명(본문 라인): "성명: 홍길동" / "이름 홍길동" — 그룹 2가 성명
+NAME_INLINE = re.compile(r'(성명|이름)\s*[: ]?\s*([가-힣]{2,4})')
 
 # ========= 라벨(헤더) 힌트 =========
 NAME_LABELS     = ('이름', '성명', '성 명', 'name', 'full name')
@@ -77,9 +78,118 @@ def _has_label(context: Dict, labels) -> bool:
     h_low = h.lower()
     return any(lbl.lower() in h_low for lbl in labels)
 
-def classify_text(text: str, context: Dict) -> Optional[str]:
+class LabelFlags(NamedTuple):
+    """헤더 하나에 대한 라벨 계열별 포함 여부(헤더 단위로 한 번만 계산)"""
+    name: bool
+    email: bool
+    phone: bool
+    address: bool
+    passport: bool
+    dl: bool
+    card: bool
+
+@lru_cache(maxsize=4096)
+def label_flags(header: str) -> LabelFlags:
+    """_has_label을 라벨 계열마다 부르던 것과 동일. 같은 헤더(=같은 컬럼)의 셀은 캐시 재사용"""
+    ctx = {"header": header}
+    return LabelFlags(
+        name=_has_label(ctx, NAME_LABELS),
+        email=_has_label(ctx, EMAIL_LABELS),
+        phone=_has_label(ctx, PHONE_LABELS),
+        address=_has_label(ctx, ADDR_LABELS),
+        passport=_has_label(ctx, PASSPORT_LABELS),
+        dl=_has_label(ctx, DLABELS),
+        card=_has_label(ctx, CARD_LABELS),
+    )
+
+# ========= 체크섬 검증(2단계) =========
+# 패턴에 맞은 카드/주민번호를 정수 연산으로 한 번 더 검증해 무관한 숫자 ID 오탐을 줄임
+#   off    : 패턴만(기존 동작)
+#   card   : 카드 패턴은 Luhn 통과 필요(기본)
+#   rrn    : card + 주민번호 생년월일/성별자리 유효성
+#   strict : rrn + 주민번호 검증번호(2020-10 이전 발급분만 해당 — 이후 발급 번호는 검증번호가 없어 누락됨)
+# 헤더 라벨 기반 규칙(카드 라벨 + 12~19자리)은 검증하지 않음
+# 모드 변경: set_validation_mode() 또는 환경변수 PII_CHECKSUM
+VALIDATION_MODES = ("off", "card", "rrn", "strict")
+
+_LUHN_DOUBLE = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+_RRN_WEIGHTS = (2, 3, 4, 5, 6, 7, 8, 9, 2, 3, 4, 5)
+# 성별 자리 → 출생 세기(1,2,5,6: 1900년대 / 3,4,7,8: 2000년대 / 9,0: 1800년대)
+_RRN_CENTURY = {"1": 1900, "2": 1900, "5": 1900, "6": 1900,
+                "3": 2000, "4": 2000, "7": 2000, "8": 2000, "9": 1800, "0": 1800}
+_NOT_DIGIT = re.compile(r'\D')
+
+def luhn_ok(digits: str) -> bool:
+    """Luhn(mod 10) 검사. digits: 숫자만 있는 문자열"""
+    if not digits:
+        return False
+    total = sum(int(c) for c in digits[-1::-2]) + sum(_LUHN_DOUBLE[int(c)] for c in digits[-2::-2])
+    return total % 10 == 0
+
+def rrn_ok(digits: str, check_digit: bool = True) -> bool:
+    """주민번호 13자리: 생년월일/성별자리 유효성 (+ check_digit=True면 검증번호)"""
+    if len(digits) != 13:
+        return False
+    century = _RRN_CENTURY.get(digits[6])
+    if century is None:
+        return False
+    try:
+        datetime.date(century + int(digits[0:2]), int(digits[2:4]), int(digits[4:6]))
+    except ValueError:
+        return False
+    if check_digit:
+        total = sum(int(c) * w for c, w in zip(digits, _RRN_WEIGHTS))
+        return (11 - total % 11) % 10 == int(digits[12])
+    return True
+
+def _any_match(pat: re.Pattern, s: str, ok) -> bool:
+    """pat이 매치되는 모든 위치(겹침 포함) 중 하나라도 ok(숫자열)를 통과하는지"""
+    pos = 0
+    while True:
+        m = pat.search(s, pos)
+        if m is None:
+            return False
+        if ok(_NOT_DIGIT.sub('', m.group(0))):
+            return True
+        pos = m.start() + 1
+
+def _rrn_check_digit(d: str) -> bool:
+    return rrn_ok(d, check_digit=True)
+
+def _rrn_date(d: str) -> bool:
+    return rrn_ok(d, check_digit=False)
+
+VALIDATION_MODE = "off"
+_CARD_CHECK = None   # 숫자열 검증 함수(None이면 검증 안 함)
+_RRN_CHECK = None    # 모듈 끝에서 PII_CHECKSUM(기본 card)으로 설정
+
+def set_validation_mode(mode: str):
+    """체크섬 검증 수준 변경(off/card/rrn/strict). 판정 결과가 바뀌므로 메모를 비움"""
+    global VALIDATION_MODE, _CARD_CHECK, _RRN_CHECK
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"지원하지 않는 검증 모드: {mode} (가능: {', '.join(VALIDATION_MODES)})")
+    if mode == VALIDATION_MODE:
+        return
+    VALIDATION_MODE = mode
+    _CARD_CHECK = None if mode == "off" else luhn_ok
+    _RRN_CHECK = {"rrn": _rrn_date, "strict": _rrn_check_digit}.get(mode)
+    memo_clear()
+
+def card_hit(s: str) -> bool:
+    """카드 패턴 매치(검증 모드면 Luhn 통과한 매치가 있어야 함)"""
+    if _CARD_CHECK is None:
+        return bool(CARD_16.search(s) or CARD_4_6_5.search(s))
+    return _any_match(CARD_16, s, _CARD_CHECK) or _any_match(CARD_4_6_5, s, _CARD_CHECK)
+
+def rrn_hit(s: str) -> bool:
+    """주민번호 패턴 매치(검증 모드면 검증 통과한 매치가 있어야 함)"""
+    if _RRN_CHECK is None:
+        return RRN.search(s) is not None
+    return _any_match(RRN, s, _RRN_CHECK)
+
+def _classify_sequential(text: str, context: Dict) -> Optional[str]:
     """
-    요청 8종만 라벨링. 매칭 없으면 None.
+    기존 순차 판정(패턴마다 re.search). classify_text의 기준 구현 — 결과 비교/폴백용.
     context: {"header": str, "container": str, "source_type": "xlsx"|"pdf_table"|"pdf_text"|...}
     """
     s = normalize_text(text)
@@ -97,11 +207,11 @@ def classify_text(text: str, context: Dict) -> Optional[str]:
         return "phone"
 
     # ---- 주민등록번호 ----
-    if RRN.search(s):
+    if rrn_hit(s):
         return "rrn"
 
     # ---- 카드 ----
-    if CARD_16.search(s) or CARD_4_6_5.search(s):
+    if card_hit(s):
         return "card"
     if _has_label(context, CARD_LABELS):
         digits = re.sub(r'\D', '', s)
@@ -141,6 +251,224 @@ def classify_text(text: str, context: Dict) -> Optional[str]:
 
     return None
 
+# ========= 결합 스캐너 =========
+# 숫자가 필요한 위치 기반 패턴을 우선순위 순서의 교대식 하나로 합쳐 search 한 번에 검사한다.
+#   (?=[\d+A-Z])(?=(?:(?P<p0>KR_PHONE)|(?P<p1>INTL_PHONE)|(?P<p2>RRN)|...))
+# - search는 "어떤 패턴이든 매치되는 가장 왼쪽 위치"에서 앞쪽(우선순위 높은) 대안을 돌려준다.
+# - 매치를 찾으면 그보다 우선순위가 높은 패턴만 남긴 스캐너로 다음 위치부터 다시 찾는다.
+#   → 마지막으로 남는 것이 "어디선가 매치되는 패턴 중 최우선 패턴" = 기존 순차 판정 결과
+# - 라벨이 있어야 적용되는 규칙(E.164, 카드 자릿수, 여권 라벨형, 12자리 면허)은 스캔 후
+#   더 높은 우선순위가 없을 때만 라벨을 확인하고 개별 검사한다.
+_P_EMAIL, _P_EMAIL_LBL, _P_PHONE, _P_PHONE_LBL, _P_RRN, _P_CARD, _P_CARD_LBL, \
+    _P_PASSPORT, _P_PASSPORT_LBL, _P_DL, _P_DL_LBL = range(11)
+_NO_MATCH = 99
+_PRIORITY_TYPES = ("email", "email", "phone", "phone", "rrn", "card", "card",
+                   "passport", "passport", "driver_license", "driver_license")
+
+_SCAN_PATTERNS = ((_P_PHONE, KR_PHONE), (_P_PHONE, INTL_PHONE), (_P_RRN, RRN), (_P_CARD, CARD_16),
+                  (_P_CARD, CARD_4_6_5), (_P_PASSPORT, PASSPORT), (_P_DL, KR_DL_HYPHEN))
+
+# 위 패턴이 시작할 수 있는 문자(숫자/+/여권 영문) — 한글·공백 등 위치는 바로 건너뜀
+_START_GUARD = r'(?=[\d+A-Z])'
+
+_PASSPORT_LBL_RE = re.compile(r'[A-Z].*\d')
+_DIGIT = re.compile(r'\d')
+_NON_DIGIT = re.compile(r'\D')
+
+def _scoped(pat: re.Pattern) -> str:
+    """패턴 앞의 전역 인라인 플래그((?i) 등)를 해당 패턴에만 적용되도록 변환"""
+    m = re.match(r'\(\?([aiLmsux]+)\)', pat.pattern)
+    return f"(?{m.group(1)}:{pat.pattern[m.end():]})" if m else f"(?:{pat.pattern})"
+
+_SCANNERS: Dict[int, Optional[tuple]] = {}
+
+def _scanner(limit: int) -> Optional[tuple]:
+    """
+    우선순위가 limit보다 높은(숫자가 작은) 패턴만 합친 스캐너(limit별 캐시)
+    반환: (컴파일된 패턴, {그룹명: 우선순위}) 또는 남은 패턴이 없으면 None
+    """
+    if limit in _SCANNERS:
+        return _SCANNERS[limit]
+    alts = [(prio, pat) for prio, pat in _SCAN_PATTERNS if prio < limit]
+    hit = None
+    if alts:
+        names = [f"p{i}" for i in range(len(alts))]
+        body = "|".join(f"(?P<{name}>{_scoped(pat)})" for name, (_, pat) in zip(names, alts))
+        hit = (re.compile(f"{_START_GUARD}(?=(?:{body}))"),
+               {name: prio for name, (prio, _) in zip(names, alts)})
+    _SCANNERS[limit] = hit
+    return hit
+
+def _next_pattern(s: str, after: int) -> int:
+    """검증에서 탈락한 우선순위(after)보다 낮은 위치 기반 패턴 중 첫 매치(카드는 검증 포함)"""
+    for prio, pat in _SCAN_PATTERNS:
+        if prio <= after:
+            continue
+        if prio == _P_CARD:
+            if card_hit(s):
+                return prio
+        elif pat.search(s):
+            return prio
+    return _NO_MATCH
+
+def classify_text(text: str, context: Dict) -> Optional[str]:
+    """
+    요청 8종만 라벨링. 매칭 없으면 None.
+    context: {"header": str, "container": str, "source_type": "xlsx"|"pdf_table"|"pdf_text"|...}
+    결합 스캐너로 한 번만 훑어 판정(결과는 _classify_sequential과 동일)
+    헤더 라벨 판정은 label_flags()로 헤더마다 한 번만 계산
+    """
+    return _classify_normalized(normalize_text(text), label_flags(context.get('header') or ''))
+
+def _classify_normalized(s: str, lf: LabelFlags) -> Optional[str]:
+    """classify_text 본체: 정규화된 텍스트 + 헤더 라벨 플래그만으로 판정"""
+    if not s:
+        return None
+
+    # 이메일은 최우선이고 '@'가 있어야만 매치 → 단독 검사로 바로 판정
+    has_at = '@' in s
+    if has_at and EMAIL.search(s):
+        return "email"
+
+    # 나머지 위치 기반 패턴은 모두 숫자가 필요 → 숫자가 있을 때만 결합 스캔
+    has_digit = _DIGIT.search(s) is not None
+    best = _NO_MATCH
+    if has_digit:
+        pos = 0
+        while True:
+            sc = _scanner(best)
+            if sc is None:  # 남은 상위 패턴 없음
+                break
+            rx, prios = sc
+            m = rx.search(s, pos)
+            if m is None:
+                break
+            best = prios[m.lastgroup]
+            pos = m.start() + 1
+
+        # 체크섬 검증(2단계): 최우선 후보가 카드/주민번호일 때만 검사, 실패하면 다음 순위 패턴으로
+        if best == _P_RRN and _RRN_CHECK is not None and not _any_match(RRN, s, _RRN_CHECK):
+            best = _next_pattern(s, _P_RRN)
+        if best == _P_CARD and _CARD_CHECK is not None and not card_hit(s):
+            best = _next_pattern(s, _P_CARD)
+
+    # 라벨 조건부 규칙(기존 순서 위치에 끼움, 더 높은 우선순위가 이미 있으면 건너뜀)
+    if best > _P_EMAIL_LBL and has_at and lf.email:
+        best = _P_EMAIL_LBL
+    if has_digit:
+        if best > _P_PHONE_LBL and lf.phone and E164_PHONE.search(s):
+            best = _P_PHONE_LBL
+        if best > _P_CARD_LBL and lf.card:
+            if 12 <= len(_NON_DIGIT.sub('', s)) <= 19:  # 느슨한 길이 조건
+                best = _P_CARD_LBL
+        if best > _P_PASSPORT_LBL and lf.passport and _PASSPORT_LBL_RE.search(s):
+            best = _P_PASSPORT_LBL
+        if best > _P_DL_LBL and lf.dl and KR_DL_12_DIGITS.search(s):
+            best = _P_DL_LBL
+    if best != _NO_MATCH:
+        return _PRIORITY_TYPES[best]
+
+    # ---- 주소 ----
+    if lf.address:
+        return "address"
+    if ADDR_HINT.search(s) and ADDR_CORE.search(s):
+        return "address"
+
+    # ---- 이름(표/엑셀에서 헤더가 성명/이름 계열일 때만) ----
+    if lf.name:
+        if not any(h in s for h in NON_NAME_HINTS):
+            if HANGUL_NAME.match(s):
+                return "name"
+
+    return None
+
+# ========= 스팬 검출(한 텍스트 안의 여러 PII) =========
+# classify_text는 텍스트 전체에 타입 하나만 주므로, 라인 단위 텍스트에서 모든 개체의 위치를 찾을 때 사용
+# - 위치 기반 패턴 + 인라인 성명을 우선순위 순서의 교대식 하나로 합쳐 왼쪽부터 한 번 훑음
+#   (같은 위치에서는 classify_text 우선순위가 높은 패턴, 매치끼리는 겹치지 않음)
+# - 카드/주민번호는 체크섬 검증(VALIDATION_MODE) 통과분만, 실패하면 같은 위치의 다음 순위 패턴 시도
+# - 주소는 경계를 정할 수 없어 제외, 헤더 라벨 조건부 규칙도 적용하지 않음(셀 전체 판정용)
+_SPAN_PATTERNS = (("email", EMAIL), ("phone", KR_PHONE), ("phone", INTL_PHONE), ("rrn", RRN),
+                  ("card", CARD_16), ("card", CARD_4_6_5), ("passport", PASSPORT),
+                  ("driver_license", KR_DL_HYPHEN), ("name", NAME_INLINE))
+_SPAN_RE = re.compile("|".join(f"(?P<s{i}>{_scoped(pat)})" for i, (_, pat) in enumerate(_SPAN_PATTERNS)))
+
+def _span_ok(pii_type: str, frag: str) -> bool:
+    if pii_type == "card":
+        return _CARD_CHECK is None or _CARD_CHECK(_NOT_DIGIT.sub('', frag))
+    if pii_type == "rrn":
+        return _RRN_CHECK is None or _RRN_CHECK(_NOT_DIGIT.sub('', frag))
+    return True
+
+def find_spans(text: str) -> List[Tuple[str, int, int]]:
+    """
+    텍스트 안의 PII 개체 → [(pii_type, start, end), ...] (시작 위치 순, 겹침 없음)
+    오프셋은 넘긴 문자열 기준 → 필터 산출 text(정규화 결과)를 그대로 넘기면 됨
+    인라인 성명은 라벨("성명"/"이름")을 뺀 성명 부분만 스팬으로 잡음
+    """
+    spans: List[Tuple[str, int, int]] = []
+    if not text:
+        return spans
+    pos = 0
+    while True:
+        m = _SPAN_RE.search(text, pos)
+        if m is None:
+            return spans
+        i = int(m.lastgroup[1:])
+        start, end = m.span()
+        if not _span_ok(_SPAN_PATTERNS[i][0], m.group()):
+            for j in range(i + 1, len(_SPAN_PATTERNS)):
+                m2 = _SPAN_PATTERNS[j][1].match(text, start)
+                if m2 and _span_ok(_SPAN_PATTERNS[j][0], m2.group()):
+                    i, end = j, m2.end()
+                    break
+            else:
+                pos = start + 1
+                continue
+        pii_type = _SPAN_PATTERNS[i][0]
+        if pii_type == "name":
+            start, end = NAME_INLINE.match(text, start).span(2)
+        spans.append((pii_type, start, end))
+        pos = end
+
+# ========= 반복 값 메모이제이션 =========
+# 스프레드시트는 같은 값(부서명/지역명/같은 주소)이 반복됨 → (원문, 헤더)별 정규화+판정 결과 재사용
+# 판정은 텍스트와 헤더 라벨 플래그에만 의존하므로 결과는 캐시 없이 판정한 것과 동일
+# (키는 헤더 문자열 — 문자열 해시는 캐시되므로 라벨 플래그 튜플보다 키 계산이 가벼움)
+MEMO_SIZE = int(os.getenv("PII_MEMO_SIZE", "65536"))
+
+def _normalize_classify(text: str, header: str) -> Tuple[str, Optional[str]]:
+    s = normalize_text(text)
+    return s, _classify_normalized(s, label_flags(header))
+
+_memo = lru_cache(maxsize=MEMO_SIZE)(_normalize_classify)
+
+def set_memo_size(maxsize: int):
+    """메모 크기 변경(0이면 캐시 없이 매번 판정). 기존 캐시/카운터는 초기화됨"""
+    global _memo
+    _memo = lru_cache(maxsize=maxsize)(_normalize_classify)
+
+def normalize_and_classify(text: str, context: Dict, memo: bool = True) -> Tuple[str, Optional[str]]:
+    """
+    (normalize_text(text), classify_text(text, context)) 반환
+    memo=False: 메모를 거치지 않음(값이 거의 반복되지 않는 컬럼용, 적중 통계에도 안 잡힘)
+    """
+    if memo:
+        return _memo(text, context.get('header') or '')
+    return _normalize_classify(text, context.get('header') or '')
+
+def memo_stats() -> Dict:
+    """메모 적중 통계: hits, misses, size, maxsize, hit_rate"""
+    info = _memo.cache_info()
+    total = info.hits + info.misses
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize,
+            "hit_rate": info.hits / total if total else 0.0}
+
+def memo_clear():
+    _memo.cache_clear()
+
+set_validation_mode(os.getenv("PII_CHECKSUM", "card"))
+
 # ========== 간단 자가 테스트 ==========
 if __name__ == "__main__":
     samples = [
@@ -1,30 +1,40 @@
 # filter_pii_from_intermediate.py
 # 역할:
-#  - intermediate(JSONL/CSV)에서 8종 PII만 선별
-#  - 옵션: pdf_text → 라인 집계(--aggregate-lines) 후 추가 검출
+#  - intermediate(Parquet/JSONL/CSV)에서 8종 PII만 선별
+#  - 옵션: pdf_text → 라인 집계(--aggregate-lines) 또는 레이아웃 기반 라인/블록 재구성(--layout) 후 추가 검출
 #  - dedupe 기본: '위치(row/col) 우선' (동일 텍스트여도 다른 위치면 보존)
 #  - --debug-drops 로 드랍 사유를 .pii_dropped.jsonl에 기록
+#  - pdf_line/pdf_block은 find_spans로 라인 안의 모든 PII 위치(spans)를 함께 기록 → 마스킹 단계에서 위치별 치환
 #
 # 사용 예:
 #   python filter_pii_from_intermediate.py test.intermediate.csv --aggregate-lines --line-y-tol 2.5
+#   python filter_pii_from_intermediate.py test.intermediate.parquet --layout
 #   python filter_pii_from_intermediate.py test.intermediate.csv --dedupe none --debug-drops
 #   python filter_pii_from_intermediate.py test.intermediate.jsonl --dedupe by_location
+#   python filter_pii_from_intermediate.py test.intermediate.parquet --formats parquet,csv
+#   python filter_pii_from_intermediate.py test.xlsx.intermediate.parquet --profile-sample 64
+#   python filter_pii_from_intermediate.py test.intermediate.parquet --checksum strict
+#   python filter_pii_from_intermediate.py huge.intermediate.jsonl --dedupe-budget-mb 256 --spill-dir /scratch
 
-import argparse, csv, json, re
+import argparse, csv, hashlib, json
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 from collections import defaultdict
 
-from detectors_pii import classify_text  # 사용자 제공 분류기
+import numpy as np
+
+from detectors_pii import (  # 사용자 제공 분류기(classify_text + 메모)
+    VALIDATION_MODE, VALIDATION_MODES, find_spans, memo_stats, normalize_and_classify, normalize_text,
+    set_validation_mode,
+)
+from dedupe_index import DedupeIndex
+from intermediate_io import DEFAULT_FORMATS, output_paths, parse_formats, read_records, write_records
 
 # 선별 유지 대상(8종)
 KEEP = {"name","passport","driver_license","rrn","address","email","phone","card"}
 
-# 출력 키(고정 헤더)
-KEYS_OUT = ["id","pii_type","source_path","source_type","container","row","col","header","bbox","text"]
-
-# 인라인 성명 패턴: "성명: 홍길동" / "이름 홍길동"
-NAME_INLINE_RE = re.compile(r'(성명|이름)\s*[: ]?\s*([가-힣]{2,4})')
+# 출력 키(고정 헤더) — spans: pdf_line/pdf_block의 [(pii_type, start, end), ...] (text 기준 오프셋, 그 외 레코드는 빈 값)
+KEYS_OUT = ["id","pii_type","source_path","source_type","container","row","col","header","bbox","text","spans"]
 
 # 헤더 기반 보강용(대/소문자/공백 무시)
 NAME_HEADERS    = {"성명","이름","한글이름","영문이름","대표자","담당자","name","full name"}
@@ -32,29 +42,106 @@ EMAIL_HEADERS   = {"이메일","email","email 주소"}
 PHONE_HEADERS   = {"연락처","전화","전화번호","mobile","phone"}
 ADDRESS_HEADERS = {"주소","집주소","address"}
 
-# 제로폭 문자/하이픈 표준화
-_ZW_CHARS = dict.fromkeys(map(ord, ["\u200b","\u200c","\u200d","\ufeff","\u2060"]), None)
-def normalize_text(s: str) -> str:
-    if not isinstance(s, str):
-        return s
-    s = s.translate(_ZW_CHARS)
-    s = (s.replace("\u2010","-").replace("\u2011","-")
-           .replace("\u2012","-").replace("\u2013","-").replace("\u2014","-"))
-    return " ".join(s.split())
+# 정규화된 헤더 → 보강 타입(분류 실패 시 적용)
+_HEADER_FALLBACK = {
+    h.strip().lower(): t
+    for t, hs in (("name", NAME_HEADERS), ("email", EMAIL_HEADERS), ("phone", PHONE_HEADERS), ("address", ADDRESS_HEADERS))
+    for h in hs
+}
+
+# 반복 값 메모: 컬럼 첫 MEMO_PROBE개 값 중 고유값 비율이 MEMO_MAX_DISTINCT 이상이면(이메일/연락처처럼
+# 값이 거의 안 겹치는 컬럼) 그 컬럼은 메모를 거치지 않음 — 적중 없이 캐시 삽입/축출 비용만 드는 것 방지
+MEMO_PROBE = 1000
+MEMO_MAX_DISTINCT = 0.8
+
+def header_fallback(header: str) -> str:
+    """헤더 기반 보강 타입(없으면 "")"""
+    return _HEADER_FALLBACK.get((header or "").strip().lower(), "")
+
+class _ColumnState:
+    """컬럼((header, source_type))별 캐시: 헤더 기반 보강 타입 + 메모 사용 여부"""
+    __slots__ = ("fallback", "use_memo", "probe", "n")
+
+    def __init__(self, header: str):
+        self.fallback = header_fallback(header)
+        self.use_memo = True
+        self.probe = set()  # 판정 끝나면 None
+        self.n = 0
+
+    def observe(self, text):
+        self.n += 1
+        self.probe.add(text)
+        if self.n >= MEMO_PROBE:
+            self.use_memo = len(self.probe) / self.n < MEMO_MAX_DISTINCT
+            self.probe = None
 
 # ---------------- pdf_text → pdf_line 집계 ----------------
+def _line_record(container: str, y_ref: float, toks: List[Dict]) -> Optional[Dict]:
+    line_text = " ".join(normalize_text(x.get("text","")) for x in toks).strip()
+    if not line_text:
+        return None
+    return {
+        "id": f'line::{container}::{int(round(y_ref))}',
+        "source_path": toks[0].get("source_path",""),
+        "source_type": "pdf_line",
+        "container": container,
+        "row": None, "col": None,
+        "header": "",
+        "bbox": None,
+        "text": line_text,
+    }
+
+def pdf_text_by_container(records: List[Dict]) -> Dict[str, List[Dict]]:
+    by_container = defaultdict(list)
+    for r in records:
+        if r.get("source_type") == "pdf_text" and isinstance(r.get("bbox"), list):
+            by_container[r.get("container","")].append(r)
+    return by_container
+
+def y_bands(ys: np.ndarray, xs: np.ndarray, y_tol: float) -> Iterable[tuple]:
+    """
+    y(top) 좌표가 가까운 토큰 묶음 → (y_ref, x 순 인덱스 배열) 순회(y_ref 오름차순)
+    라인 기준 y(y_ref)는 라인 첫 토큰의 y → (y, x) 정렬 후에는 새 토큰이 들어갈 수 있는 라인이
+    마지막 라인뿐이므로, 정렬된 y 배열에서 y_ref + y_tol 경계를 이분 탐색해 라인을 통째로 잘라냄
+    (토큰 수 n, 라인 수 L일 때 O(n log n + L log n))
+    """
+    n = len(ys)
+    order = np.lexsort((xs, ys))  # y, x 순(안정 정렬)
+    ys_sorted = ys[order]
+    i = 0
+    while i < n:
+        y_ref = ys_sorted[i]
+        j = int(np.searchsorted(ys_sorted, y_ref + y_tol, side="right"))
+        # 경계 보정: 기존 판정식(y - y_ref <= y_tol)과 부동소수 반올림 차이 맞춤
+        while j < n and ys_sorted[j] - y_ref <= y_tol:
+            j += 1
+        while j > i + 1 and ys_sorted[j - 1] - y_ref > y_tol:
+            j -= 1
+        idx = order[i:j]
+        yield float(y_ref), idx[np.argsort(xs[idx], kind="stable")]  # 라인 안 x 순
+        i = j
+
 def aggregate_pdf_lines(records: List[Dict], y_tol: float = 2.0) -> List[Dict]:
     """
     같은 페이지(container) 내에서 y(top) 좌표가 가까운 토큰을 묶어 한 줄로 결합.
     bbox는 합치지 않고 None으로 둠.
+    결과는 aggregate_pdf_lines_legacy와 동일(라인 묶기는 y_bands의 이분 탐색)
     """
-    by_container = defaultdict(list)
-    for r in records:
-        if r.get("source_type") == "pdf_text" and isinstance(r.get("bbox"), list):
-            by_container[r.get("container","")].append(r)
+    synthetic = []
+    for container, toks in pdf_text_by_container(records).items():
+        n = len(toks)
+        ys = np.fromiter((float(t["bbox"][1]) for t in toks), dtype=np.float64, count=n)
+        xs = np.fromiter((float(t["bbox"][0]) for t in toks), dtype=np.float64, count=n)
+        for y_ref, idx in y_bands(ys, xs, y_tol):
+            rec = _line_record(container, y_ref, [toks[k] for k in idx.tolist()])
+            if rec is not None:
+                synthetic.append(rec)
+    return synthetic
 
+def aggregate_pdf_lines_legacy(records: List[Dict], y_tol: float = 2.0) -> List[Dict]:
+    """기존 구현(토큰마다 모든 라인을 선형 탐색, O(토큰 × 라인)). 벤치마크/비교용."""
     synthetic = []
-    for container, toks in by_container.items():
+    for container, toks in pdf_text_by_container(records).items():
         # y, x 순 정렬
         toks.sort(key=lambda x: (float(x["bbox"][1]), float(x["bbox"][0])))
         buckets = []
@@ -69,19 +156,9 @@ def aggregate_pdf_lines(records: List[Dict], y_tol: float = 2.0) -> List[Dict]:
 
         for b in buckets:
             b["toks"].sort(key=lambda x: float(x["bbox"][0]))
-            line_text = " ".join(normalize_text(x.get("text","")) for x in b["toks"]).strip()
-            if not line_text:
-                continue
-            synthetic.append({
-                "id": f'line::{container}::{int(round(b["y_ref"]))}',
-                "source_path": b["toks"][0].get("source_path",""),
-                "source_type": "pdf_line",
-                "container": container,
-                "row": None, "col": None,
-                "header": "",
-                "bbox": None,
-                "text": line_text,
-            })
+            rec = _line_record(container, b["y_ref"], b["toks"])
+            if rec is not None:
+                synthetic.append(rec)
     return synthetic
 
 # ---------------- I/O 유틸 ----------------
@@ -103,8 +180,9 @@ def dump_csv(records: Iterable[Dict], out_path: str):
         w.writeheader()
         for r in records:
             row = dict(r)
-            if isinstance(row.get("bbox"), (list, dict)):
-                row["bbox"] = json.dumps(row["bbox"], ensure_ascii=False)
+            for k in ("bbox", "spans"):
+                if isinstance(row.get(k), (list, tuple, dict)):
+                    row[k] = json.dumps(row[k], ensure_ascii=False)
             w.writerow({k: row.get(k, "") for k in KEYS_OUT})
 
 # ---------------- dedupe 키 ----------------
@@ -139,88 +217,145 @@ def _dedupe_key(rec: Dict, mode: str = "by_location") -> tuple:
             rec.get("text",""),
             bbox_sig)
 
+def dedupe_hash(key: tuple) -> int:
+    """
+    dedupe 키 튜플 → 64비트 정수(blake2b) — seen 집합에 문자열 튜플 대신 int만 보관
+    충돌 확률은 약 n²/2^65(1억 건에서 3e-4 수준)
+    """
+    h = hashlib.blake2b("\x1f".join(map(str, key)).encode("utf-8"), digest_size=8)
+    return int.from_bytes(h.digest(), "little")
+
+# 여러 개체를 담는 합성 텍스트(스팬 검출 대상): aggregate_pdf_lines / pdf_layout.layout_records 출력
+SPAN_SOURCES = ("pdf_line", "pdf_block")
+
 # ---------------- 핵심 필터 ----------------
-def filter_records(records: Iterable[Dict], *, dedupe_mode: str="by_location", debug_drops: bool=False) -> Iterable[Dict]:
+def filter_records(records: Iterable[Dict], *, dedupe_mode: str="by_location", debug_drops: bool=False,
+                   profile_sample: int=0, profile_stats: Optional[Dict]=None,
+                   dedupe_budget_mb: float=0, spill_dir: Optional[str]=None,
+                   dedupe_stats: Optional[Dict]=None) -> Iterable[Dict]:
     """
-    1) 텍스트 정규화 후 classify_text
+    1) 텍스트 정규화 후 classify_text (같은 원문+헤더 라벨은 메모 재사용)
     2) KEEP(8종)만 선별 (헤더 기반 보강 포함)
-    3) dedupe_mode 기준으로 중복 제거
-    4) pdf_line에서 인라인 성명 추가 탐지
+    3) dedupe_mode 기준으로 중복 제거(키는 64비트 해시로 보관, none이면 보관 안 함)
+    4) pdf_line/pdf_block은 find_spans로 텍스트 안의 PII 위치(spans)를 기록하고,
+       스팬 중 인라인 성명을 별도 레코드로 바로 이어서 출력(라인 레코드 다음)
     5) debug_drops=True면 드랍 사유 기록
+    records는 한 번만 순회(스트리밍) → generator도 그대로 받으며, dedupe 집합 외에는 레코드를 쌓지 않음
+    profile_sample > 0: xlsx/pdf_table 컬럼마다 표본으로 skip/single/full 결정(tabular_pii, 재현율 손실 가능)
+      → 컬럼을 모아야 하므로 레코드를 먼저 전부 메모리에 올림
+      profile_stats(dict)를 넘기면 처리 방식별 컬럼/셀 수를 채워 줌
+    dedupe_budget_mb > 0: dedupe 집합을 파이썬 set 대신 DedupeIndex(NumPy 테이블, 예산 초과 시 spill_dir에
+      정렬 런으로 내보냄)로 보관 — 결과 동일, 키당 조회는 느리지만 메모리가 예산으로 제한됨
+      dedupe_stats(dict)를 넘기면 순회가 끝난 뒤 DedupeIndex.stats()를 채워 줌
     """
-    seen = set()
-    dropped = []  # 디버그용
-    name_headers_norm = {h.strip().lower() for h in NAME_HEADERS}
-    email_headers_norm = {h.strip().lower() for h in EMAIL_HEADERS}
-    phone_headers_norm = {h.strip().lower() for h in PHONE_HEADERS}
-    address_headers_norm = {h.strip().lower() for h in ADDRESS_HEADERS}
+    if dedupe_budget_mb > 0 and dedupe_mode != "none":
+        index = DedupeIndex(dedupe_budget_mb, spill_dir)
+        is_new = index.add
+    else:
+        index = None
+        seen = set()  # dedupe_hash 값(int)
 
-    # 1차: 개별 레코드 분류
-    for r in records:
-        ctx = {
-            "header": r.get("header",""),
-            "container": r.get("container",""),
-            "source_type": r.get("source_type",""),
-        }
-        text_norm = normalize_text(r.get("text",""))
-        header_norm = (r.get("header","") or "").strip().lower()
-
-        # 분류 + 표준화
-        t = classify_text(text_norm, ctx)
-        t = (t or "").strip().lower()
-
-        # ✅ 헤더 기반 보강(분류가 실패했을 때만)
-        if t not in KEEP:
-            # name 보강
-            if header_norm in name_headers_norm:
-                core = text_norm.replace(" ", "").replace("·", "")
-                # 길이 sanity check (한글/영문 혼합 고려해 완화)
-                if 1 <= len(core) <= 50:
-                    t = "name"
-            # email/phone/address도 최소한의 보강 (선택)
-            elif header_norm in email_headers_norm:
-                t = "email"
-            elif header_norm in phone_headers_norm:
-                t = "phone"
-            elif header_norm in address_headers_norm:
-                t = "address"
-
-        if t in KEEP:
-            out = dict(r)
-            out["text"] = text_norm
-            out["pii_type"] = t
-            sig = _dedupe_key(out, dedupe_mode)
+        def is_new(sig: int) -> bool:
             if sig in seen:
-                if debug_drops:
-                    d = dict(out); d["_drop_reason"] = f"dedupe:{dedupe_mode}"
-                    dropped.append(d)
-                continue
+                return False
             seen.add(sig)
-            yield out
-        else:
-            if debug_drops:
+            return True
+    dropped = []  # 디버그용
+
+    def admit(out: Dict) -> bool:
+        """중복이 아니면 True(키 등록), 중복이면 False(디버그 시 드랍 기록)"""
+        if dedupe_mode == "none":
+            return True
+        if is_new(dedupe_hash(_dedupe_key(out, dedupe_mode))):
+            return True
+        if debug_drops:
+            d = dict(out); d["_drop_reason"] = f"dedupe:{dedupe_mode}"
+            dropped.append(d)
+        return False
+
+    try:
+        # 컬럼 캐시: (header, source_type) → _ColumnState
+        # 같은 컬럼의 셀마다 header 정규화/집합 조회를 반복하지 않음
+        columns: Dict[tuple, _ColumnState] = {}
+        pre = None  # 프로파일링: 레코드별 사전 판정 결과
+        if profile_sample:
+            from tabular_pii import NOT_TABULAR, classify_tabular  # pandas 필요
+            records = list(records)
+            # 헤더 기반 보강 컬럼은 프로파일링 제외(skip된 셀이 보강 타입으로 잘못 라벨링되지 않도록)
+            pre = classify_tabular(records, profile_sample=profile_sample, no_profile=header_fallback,
+                                   stats=profile_stats)
+
+        for i, r in enumerate(records):
+            header = r.get("header","")
+            source_type = r.get("source_type","")
+            ctx = {
+                "header": header,
+                "container": r.get("container",""),
+                "source_type": source_type,
+            }
+            col = columns.get((header, source_type))
+            if col is None:
+                col = columns[(header, source_type)] = _ColumnState(header)
+
+            tab = pre[i] if pre is not None else None
+            if tab is None or tab is NOT_TABULAR:
+                # 정규화 + 분류 (반복 값은 (원문, 헤더) 메모에서 재사용)
+                raw = r.get("text","")
+                if col.probe is not None:
+                    col.observe(raw)
+                text_norm, t = normalize_and_classify(raw, ctx, memo=col.use_memo)
+            else:
+                # 컬럼 단위로 이미 판정/정규화됨
+                t = tab[0]
+                text_norm = tab[1] if tab[1] is not None else normalize_text(r.get("text",""))
+            fallback = col.fallback
+
+            # 라인 텍스트: 한 번 훑어 모든 개체 위치 검출(인라인 성명 포함)
+            spans = None
+            if source_type in SPAN_SOURCES:
+                spans = find_spans(text_norm)
+
+            # 표준화
+            t = (t or "").strip().lower()
+
+            # ✅ 헤더 기반 보강(분류가 실패했을 때만)
+            if t not in KEEP and fallback:
+                if fallback == "name":
+                    core = text_norm.replace(" ", "").replace("·", "")
+                    # 길이 sanity check (한글/영문 혼합 고려해 완화)
+                    if 1 <= len(core) <= 50:
+                        t = "name"
+                else:
+                    # email/phone/address도 최소한의 보강 (선택)
+                    t = fallback
+
+            if t in KEEP:
+                out = dict(r)
+                out["text"] = text_norm
+                out["pii_type"] = t
+                if spans is not None:
+                    out["spans"] = spans
+                if admit(out):
+                    yield out
+            elif debug_drops:
                 d = dict(r); d["_drop_reason"] = "classify:None"; d["_norm_text"] = text_norm
                 dropped.append(d)
 
-    # 2차: 라인 기반 인라인 "성명/이름" 패턴 추가
-    for r in records:
-        if r.get("source_type") == "pdf_line":
-            line = normalize_text(r.get("text",""))
-            m = NAME_INLINE_RE.search(line)
-            if m:
-                name = m.group(2)
-                if 2 <= len(name) <= 4:
-                    out = dict(r)
-                    out["text"] = name
-                    out["pii_type"] = "name"
-                    sig = _dedupe_key(out, dedupe_mode)
-                    if sig in seen:
-                        if debug_drops:
-                            d = dict(out); d["_drop_reason"] = f"dedupe:{dedupe_mode}"
-                            dropped.append(d)
-                        continue
-                    seen.add(sig)
-                    yield out
+            # 라인 스팬에서 찾은 인라인 "성명/이름"(라인당 여러 명 가능)
+            if spans:
+                for pii_type, a, b in spans:
+                    if pii_type == "name":
+                        out = dict(r)
+                        out["text"] = text_norm[a:b]
+                        out["pii_type"] = "name"
+                        if admit(out):
+                            yield out
+    finally:
+        # 소비 측이 중간에 멈추거나(generator close) 예외가 나도 디스크 런 정리
+        if index is not None:
+            if dedupe_stats is not None:
+                dedupe_stats.update(index.stats())
+            index.close()
 
     # 디버그 캐시 저장 (메인에서 파일로 덤프)
     if debug_drops and dropped:
@@ -228,15 +363,26 @@ def filter_records(records: Iterable[Dict], *, dedupe_mode: str="by_location", d
 
 # ---------------- 메인 ----------------
 if __name__ == "__main__":
-    ap = argparse.ArgumentParser(description="Intermediate(JSONL/CSV) → 8종 PII 필터")
-    ap.add_argument("intermediate", help=".intermediate.jsonl 또는 .intermediate.csv")
+    ap = argparse.ArgumentParser(description="Intermediate(Parquet/JSONL/CSV) → 8종 PII 필터")
+    ap.add_argument("intermediate", help=".intermediate.parquet / .intermediate.jsonl / .intermediate.csv")
     ap.add_argument("--out-prefix", default="")
     ap.add_argument("--aggregate-lines", action="store_true", help="pdf_text 토큰을 라인 단위로 집계 후 추가 판정")
     ap.add_argument("--line-y-tol", type=float, default=2.0, help="라인 집계 y tolerance")
+    ap.add_argument("--layout", action="store_true",
+                    help="pdf_text 토큰을 가로 간격(단 분리)/세로 근접(블록)으로 재구성해 pdf_line/pdf_block으로 추가 판정")
     ap.add_argument("--dedupe", choices=["by_location","by_id","by_text","none"], default="by_location",
                     help="중복 제거 기준 (기본: 위치 기준, none=중복 제거 안 함)")
     ap.add_argument("--debug-drops", action="store_true", help="드랍된 후보를 *.pii_dropped.jsonl 로 기록")
+    ap.add_argument("--formats", default=",".join(DEFAULT_FORMATS), help="출력 포맷(쉼표 구분): parquet,jsonl,csv")
+    ap.add_argument("--profile-sample", type=int, default=0,
+                    help="컬럼별 표본 N개로 PII 없는 컬럼은 건너뛰고 단일 타입 컬럼은 검출기 하나로 처리(0=끔)")
+    ap.add_argument("--checksum", choices=VALIDATION_MODES, default=VALIDATION_MODE,
+                    help="카드/주민번호 체크섬 검증: off | card(Luhn, 기본) | rrn(+생년월일) | strict(+검증번호)")
+    ap.add_argument("--dedupe-budget-mb", type=float, default=0,
+                    help="dedupe 키 집합 메모리 예산(MB) — 넘으면 디스크로 내보냄(0=파이썬 set, 제한 없음)")
+    ap.add_argument("--spill-dir", default=None, help="--dedupe-budget-mb 초과분을 기록할 디렉터리(기본: 시스템 임시 폴더)")
     args = ap.parse_args()
+    set_validation_mode(args.checksum)
 
     p = Path(args.intermediate)
     if not p.exists():
@@ -245,46 +391,41 @@ if __name__ == "__main__":
     prefix = args.out_prefix or p.with_suffix("").as_posix().replace(".intermediate","")
     suffix = p.suffix.lower()
 
-    # 1) 입력 로딩
-    if suffix == ".jsonl":
-        records = list(iter_jsonl(str(p)))
-    elif suffix == ".csv":
-        import pandas as pd
-        df = pd.read_csv(str(p), dtype=str, keep_default_na=False)
-        def parse_bbox(s: str):
-            s = (s or "").strip()
-            if s.startswith("[") and s.endswith("]"):
-                try:
-                    return json.loads(s)
-                except Exception:
-                    return ""
-            return ""
-        records = []
-        for _, x in df.iterrows():
-            rec = {k: x.get(k, "") for k in df.columns}
-            if "bbox" in rec:
-                rec["bbox"] = parse_bbox(rec["bbox"])
-            records.append(rec)
-    else:
-        raise SystemExit("지원 입력: .jsonl 또는 .csv")
+    # 1) 입력 로딩(.parquet/.jsonl/.csv)
+    if suffix not in (".parquet", ".jsonl", ".csv"):
+        raise SystemExit("지원 입력: .parquet / .jsonl / .csv")
+    records = list(read_records(str(p)))
 
-    # 2) 라인 집계(옵션)
-    if args.aggregate_lines:
+    # 2) 라인 집계(옵션) — --layout이 있으면 레이아웃 재구성을 대신 사용
+    if args.layout:
+        from pdf_layout import layout_records
+        records = records + layout_records(records, y_tol=args.line_y_tol)
+    elif args.aggregate_lines:
         extra = aggregate_pdf_lines(records, y_tol=args.line_y_tol)
         records = records + extra
 
     # 3) 필터링 + dedupe + 드랍 로깅
-    rows = list(filter_records(records, dedupe_mode=args.dedupe, debug_drops=args.debug_drops))
+    profile_stats: Dict = {}
+    dedupe_stats: Dict = {}
+    rows = list(filter_records(records, dedupe_mode=args.dedupe, debug_drops=args.debug_drops,
+                               profile_sample=args.profile_sample,
+                               profile_stats=profile_stats, dedupe_budget_mb=args.dedupe_budget_mb,
+                               spill_dir=args.spill_dir, dedupe_stats=dedupe_stats))
 
     # 4) 저장
-    out_jsonl = f"{prefix}.pii.jsonl"
-    out_csv   = f"{prefix}.pii.csv"
-    dump_jsonl(rows, out_jsonl)
-    dump_csv(rows, out_csv)
+    paths = output_paths(f"{prefix}.pii", parse_formats(args.formats))
+    write_records(rows, paths, KEYS_OUT)
 
     print(f"[OK] PII rows: {len(rows)}")
-    print(f" - {out_jsonl}")
-    print(f" - {out_csv}")
+    if args.profile_sample:
+        print("[PROFILE] " + " ".join(f"{k}={v}" for k, v in sorted(profile_stats.items())))
+    if dedupe_stats:
+        print(f"[DEDUPE] keys={dedupe_stats['keys']:,} table={dedupe_stats['table_mb']:.1f}MB "
+              f"runs={dedupe_stats['runs']} run_keys={dedupe_stats['run_keys']:,} spills={dedupe_stats['spills']}")
+    for path in paths.values():
+        print(f" - {path}")
+    memo = memo_stats()
+    print(f"[MEMO] hits={memo['hits']:,} misses={memo['misses']:,} hit_rate={memo['hit_rate']:.1%}")
 
     # 5) 드랍 로그 저장
     if args.debug_drops and globals().get("_PII_DROPPED_CACHE"):
@@ -0,0 +1,221 @@
+# intermediate_io.py
+# 역할:
+#  - 파이프라인 단계(intermediate / pii / masked) 레코드 저장·로딩 공용
+#  - 기본 포맷: Parquet (타입 있는 컬럼, 단계 간 재파싱 없음)
+#       row/col → int32, bbox → fixed_size_list<float32>[4], 나머지 키 → string(spans 등 리스트는 JSON)
+#  - JSONL/CSV는 선택 내보내기(--formats parquet,jsonl,csv)
+#  - pyarrow 미설치 환경에서는 JSONL을 기본 포맷으로 사용(requirements.txt에는 포함)
+#
+# 참고:
+#  - bbox는 float32로 저장되므로 Parquet에서 다시 읽으면 소수점 7자리 이하가 달라질 수 있음
+#  - 읽기는 메모리 매핑 + 배치 단위 dict 변환(read_parquet) — 다음 단계가 레코드(dict) 단위로 처리하므로
+#    Table을 그대로 넘기는 경로는 두지 않음
+
+import csv, json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow는 선택 의존성
+    pa = pq = None
+
+HAS_ARROW = pa is not None
+FORMATS = ("parquet", "jsonl", "csv")
+DEFAULT_FORMATS = ("parquet",) if HAS_ARROW else ("jsonl",)
+
+INT_KEYS = {"row", "col"}
+BATCH_SIZE = 50_000
+
+def _require_arrow():
+    if not HAS_ARROW:
+        raise RuntimeError("Parquet 입출력에는 pyarrow가 필요합니다. (pip install pyarrow 또는 --formats jsonl,csv)")
+
+def parse_formats(s: str) -> List[str]:
+    """'parquet,csv' → ['parquet','csv'] (순서 유지, 중복 제거)"""
+    out: List[str] = []
+    for x in (s or "").split(","):
+        x = x.strip().lower()
+        if not x:
+            continue
+        if x not in FORMATS:
+            raise ValueError(f"지원하지 않는 포맷: {x} (가능: {', '.join(FORMATS)})")
+        if x not in out:
+            out.append(x)
+    return out or list(DEFAULT_FORMATS)
+
+def output_paths(base: str, formats: Sequence[str]) -> Dict[str, str]:
+    """base='out/test.intermediate' → {'parquet': 'out/test.intermediate.parquet', ...}"""
+    return {fmt: f"{base}.{fmt}" for fmt in formats}
+
+def primary_path(paths: Dict[str, str]) -> str:
+    """다음 단계가 읽을 파일(parquet > jsonl > csv)"""
+    for fmt in FORMATS:
+        if fmt in paths:
+            return paths[fmt]
+    raise ValueError("출력 포맷이 지정되지 않았습니다.")
+
+# ---------------- 스키마/변환 ----------------
+def arrow_schema(keys: Sequence[str]):
+    _require_arrow()
+    fields = []
+    for k in keys:
+        if k in INT_KEYS:
+            fields.append(pa.field(k, pa.int32()))
+        elif k == "bbox":
+            fields.append(pa.field(k, pa.list_(pa.float32(), 4)))
+        else:
+            fields.append(pa.field(k, pa.string()))
+    return pa.schema(fields)
+
+def _to_int(v) -> Optional[int]:
+    if v is None or v == "" or v == "None":
+        return None
+    return int(v)
+
+def _to_bbox(v) -> Optional[List[float]]:
+    if isinstance(v, str):
+        v = _parse_bbox(v)
+    if not v:
+        return None
+    return [float(x) for x in v]
+
+def _to_str(v) -> Optional[str]:
+    if v is None or isinstance(v, str):
+        return v
+    if isinstance(v, (list, dict, tuple)):
+        return json.dumps(v, ensure_ascii=False)
+    return str(v)
+
+def _record_batch(rows: List[Dict], schema):
+    cols = []
+    for field in schema:
+        k = field.name
+        if k in INT_KEYS:
+            vals = [_to_int(r.get(k)) for r in rows]
+        elif k == "bbox":
+            vals = [_to_bbox(r.get(k)) for r in rows]
+        else:
+            vals = [_to_str(r.get(k)) for r in rows]
+        cols.append(pa.array(vals, type=field.type))
+    return pa.RecordBatch.from_arrays(cols, schema=schema)
+
+def _parse_bbox(s: str):
+    s = (s or "").strip()
+    if s.startswith("[") and s.endswith("]"):
+        try:
+            return json.loads(s)
+        except Exception:
+            return ""
+    return ""
+
+# ---------------- 쓰기 ----------------
+class _JsonlSink:
+    def __init__(self, path: str, keys: Sequence[str]):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, r: Dict):
+        self.f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.f.close()
+
+class _CsvSink:
+    def __init__(self, path: str, keys: Sequence[str]):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.keys = list(keys)
+        self.w = csv.DictWriter(self.f, fieldnames=self.keys)
+        self.w.writeheader()
+
+    def write(self, r: Dict):
+        row = dict(r)
+        for k in ("bbox", "spans"):
+            if isinstance(row.get(k), (list, tuple, dict)):
+                row[k] = json.dumps(row[k], ensure_ascii=False)
+        self.w.writerow({k: row.get(k, "") for k in self.keys})
+
+    def close(self):
+        self.f.close()
+
+class _ParquetSink:
+    def __init__(self, path: str, keys: Sequence[str]):
+        self.schema = arrow_schema(keys)
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self.buf: List[Dict] = []
+
+    def write(self, r: Dict):
+        self.buf.append(r)
+        if len(self.buf) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self.buf:
+            self.writer.write_batch(_record_batch(self.buf, self.schema))
+            self.buf = []
+
+    def close(self):
+        try:
+            self._flush()
+        finally:
+            self.writer.close()
+
+_SINKS = {"parquet": _ParquetSink, "jsonl": _JsonlSink, "csv": _CsvSink}
+
+def tee_records(records: Iterable[Dict], paths: Dict[str, str], keys: Sequence[str]) -> Iterable[Dict]:
+    """
+    레코드를 그대로 흘려보내면서 지정된 포맷 파일에도 기록(generator 체인 중간에 끼워 쓰는 용도)
+      - paths: {'parquet': ..., 'jsonl': ..., 'csv': ...} 중 필요한 것만
+      - keys : CSV 헤더/Parquet 컬럼(JSONL은 레코드 전체를 그대로 기록)
+    """
+    sinks = []
+    try:
+        for fmt, path in paths.items():
+            sinks.append(_SINKS[fmt](path, keys))
+        for r in records:
+            for s in sinks:
+                s.write(r)
+            yield r
+    finally:
+        for s in sinks:
+            s.close()
+
+def write_records(records: Iterable[Dict], paths: Dict[str, str], keys: Sequence[str]) -> int:
+    """레코드를 한 번만 순회하며 지정된 포맷 파일을 동시에 기록. 반환: 레코드 수"""
+    n = 0
+    for _ in tee_records(records, paths, keys):
+        n += 1
+    return n
+
+# ---------------- 읽기 ----------------
+def read_parquet(path: str, columns: Optional[List[str]] = None) -> Iterable[Dict]:
+    _require_arrow()
+    pf = pq.ParquetFile(path, memory_map=True)
+    for batch in pf.iter_batches(batch_size=BATCH_SIZE, columns=columns):
+        yield from batch.to_pylist()
+
+def iter_jsonl(path: str) -> Iterable[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if s:
+                yield json.loads(s)
+
+def iter_csv(path: str) -> Iterable[Dict]:
+    """CSV는 모든 값이 문자열(빈 칸은 ""), bbox만 JSON 리스트로 복원"""
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        for rec in csv.DictReader(f):
+            if "bbox" in rec:
+                rec["bbox"] = _parse_bbox(rec["bbox"])
+            yield rec
+
+def read_records(path: str) -> Iterable[Dict]:
+    """확장자(.parquet/.jsonl/.csv)에 따라 레코드 스트리밍"""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".parquet":
+        return read_parquet(path)
+    if suffix == ".jsonl":
+        return iter_jsonl(path)
+    if suffix == ".csv":
+        return iter_csv(path)
+    raise ValueError(f"지원 입력: .parquet / .jsonl / .csv ({path})")
@@ -1,10 +1,12 @@
 # mask_pii.py
 # 역할:
-#  - filter 단계 산출(.pii.jsonl/.pii.csv)을 입력으로 받아 선택된 PII 타입만 마스킹
+#  - filter 단계 산출(.pii.parquet/.pii.jsonl/.pii.csv)을 입력으로 받아 선택된 PII 타입만 마스킹
 #  - 출력 모드:
 #       both        : 원문 text + masked_text 모두 출력(기본)
 #       masked_only : 원문 text 제거, masked_text만 출력
 #       replace     : text 컬럼을 마스킹 값으로 교체(masked_text 없음)
+#  - spans(pdf_line: 라인 안 PII 위치 목록)가 있는 행은 라인 전체가 아니라 스팬마다 해당 타입 규칙으로 치환
+#    spans는 원문 text 기준 오프셋이므로 원문을 남기는 both 출력에만 유지
 # 안전장치:
 #  - 행수 보전: 입력 행수 == 출력 행수 (불일치 시 RuntimeError)
 #  - ID 무결성 검사: 입력/출력의 ID(또는 대체키) 비교, mismatch 시 디버그 파일 생성
@@ -13,13 +15,16 @@
 #   python mask_pii.py test_data_100.pii.jsonl --types all --output replace
 #   python mask_pii.py test_data_100.pii.csv   --types name,email --output masked_only
 #   python mask_pii.py test_data_100.pii.csv   --types all --out-prefix C:\out\test_data_100
+#   python mask_pii.py test_data_100.pii.parquet --types all --formats parquet,csv
 
 import argparse, csv, json, re
 from pathlib import Path
 from typing import Dict, Iterable, List, Set
 
+from intermediate_io import DEFAULT_FORMATS, output_paths, parse_formats, read_records, write_records
+
 # --- 입력 스키마(필터 산출물) ---
-KEYS_IN = ["id","pii_type","source_path","source_type","container","row","col","header","bbox","text"]
+KEYS_IN = ["id","pii_type","source_path","source_type","container","row","col","header","bbox","text","spans"]
 
 # ---------- 공통 I/O ----------
 def iter_jsonl(path: str) -> Iterable[Dict]:
@@ -34,26 +39,28 @@ def dump_jsonl(records: List[Dict], out_path: str):
         for r in records:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
 
-def dump_csv(records: List[Dict], out_path: str, output_mode: str):
-    # 필드 결정
+def output_fieldnames(records: List[Dict], output_mode: str) -> List[str]:
     if not records:
         if output_mode == "replace":
-            fieldnames = KEYS_IN
-        elif output_mode == "masked_only":
-            fieldnames = [k for k in KEYS_IN if k != "text"] + ["masked_text"]
-        else:
-            fieldnames = KEYS_IN + ["masked_text"]
-    else:
-        fieldnames = list(records[0].keys())
+            return [k for k in KEYS_IN if k != "spans"]
+        if output_mode == "masked_only":
+            return [k for k in KEYS_IN if k not in ("text", "spans")] + ["masked_text"]
+        return KEYS_IN + ["masked_text"]
+    return list(records[0].keys())
+
+def dump_csv(records: List[Dict], out_path: str, output_mode: str):
+    # 필드 결정
+    fieldnames = output_fieldnames(records, output_mode)
 
     with open(out_path, "w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=fieldnames)
         w.writeheader()
         for r in records:
             row = dict(r)
-            # bbox가 list/dict면 문자열 직렬화
-            if isinstance(row.get("bbox"), (list, dict)):
-                row["bbox"] = json.dumps(row["bbox"], ensure_ascii=False)
+            # bbox/spans가 list/dict면 문자열 직렬화
+            for k in ("bbox", "spans"):
+                if isinstance(row.get(k), (list, tuple, dict)):
+                    row[k] = json.dumps(row[k], ensure_ascii=False)
             w.writerow({k: row.get(k, "") for k in fieldnames})
 
 # ---------- 마스킹 도우미 ----------
@@ -266,6 +273,30 @@ def apply_mask(pii_type: str, text: str) -> str:
     fn = MASKERS.get((pii_type or "").lower())
     return fn(text) if fn else text
 
+def parse_spans(v) -> List:
+    """spans 값 → [(pii_type, start, end), ...] (Parquet/CSV에서는 JSON 문자열로 들어옴)"""
+    if isinstance(v, str):
+        v = v.strip()
+        if not v.startswith("["):
+            return []
+        try:
+            v = json.loads(v)
+        except Exception:
+            return []
+    return [tuple(x) for x in v] if v else []
+
+def mask_spans(text: str, spans: Iterable, enabled: Set[str]) -> str:
+    """스팬마다 해당 타입 규칙으로 치환(나머지 텍스트는 그대로). spans: 시작 위치 순, 겹침 없음"""
+    out, pos = [], 0
+    for pii_type, start, end in spans:
+        if pii_type not in enabled or start < pos:
+            continue
+        out.append(text[pos:start])
+        out.append(apply_mask(pii_type, text[start:end]))
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
+
 def parse_types(s: str) -> Set[str]:
     s = (s or "").strip().lower()
     if s in ("all", "*"):
@@ -283,18 +314,25 @@ def process(records: List[Dict], enabled: Set[str], output_mode: str) -> List[Di
     for r in records:
         t = (r.get("pii_type") or "").lower()
         txt = r.get("text","")
-        masked = apply_mask(t, txt) if t in enabled else txt
+        spans = parse_spans(r.get("spans"))
+        if spans:
+            masked = mask_spans(txt, spans, enabled)  # 라인: 개체 위치별 치환
+            if t in enabled and all(x[0] != t for x in spans):
+                masked = apply_mask(t, masked)  # 스팬이 없는 판정 타입(주소 등)은 라인 전체 규칙
+        else:
+            masked = apply_mask(t, txt) if t in enabled else txt
 
         if output_mode == "both":
             o = dict(r)
             o["masked_text"] = masked
         elif output_mode == "masked_only":
-            o = {k: r.get(k, "") for k in KEYS_IN if k != "text"}  # 원문 제거
+            o = {k: r.get(k, "") for k in KEYS_IN if k not in ("text", "spans")}  # 원문 제거
             o["masked_text"] = masked
         elif output_mode == "replace":
             o = dict(r)
             o["text"] = masked
             o.pop("masked_text", None)
+            o.pop("spans", None)  # 원문 기준 오프셋 → 교체된 text와 맞지 않음
         else:
             raise ValueError("invalid output_mode")
         out.append(o)
@@ -316,13 +354,14 @@ def build_id_list(lst: List[Dict]) -> List[str]:
 
 # ---------- CLI ----------
 if __name__ == "__main__":
-    ap = argparse.ArgumentParser(description="Mask selected PII types in .pii.jsonl/.pii.csv (row-preserving)")
-    ap.add_argument("pii_file", help=".pii.jsonl or .pii.csv (filter 결과)")
+    ap = argparse.ArgumentParser(description="Mask selected PII types in .pii.parquet/.pii.jsonl/.pii.csv (row-preserving)")
+    ap.add_argument("pii_file", help=".pii.parquet, .pii.jsonl or .pii.csv (filter 결과)")
     ap.add_argument("--types", default="all",
                     help="마스킹 대상: all | comma list (예: name,email,phone)")
     ap.add_argument("--output", choices=["both","masked_only","replace"], default="both",
                     help="출력 형식: both(기본) | masked_only(원문 제거) | replace(text를 마스킹값으로 교체)")
     ap.add_argument("--out-prefix", default="", help="출력 prefix (기본: 입력 파일명 기준)")
+    ap.add_argument("--formats", default=",".join(DEFAULT_FORMATS), help="출력 포맷(쉼표 구분): parquet,jsonl,csv")
     args = ap.parse_args()
 
     p = Path(args.pii_file)
@@ -333,27 +372,10 @@ if __name__ == "__main__":
     if not enabled:
         raise SystemExit("유효한 --types 가 없습니다. (가능: name,passport,driver_license,rrn,address,email,phone,card | all)")
 
-    # 입력 로딩
-    suffix = p.suffix.lower()
-    if suffix == ".jsonl":
-        records = list(iter_jsonl(str(p)))
-    elif suffix == ".csv":
-        import pandas as pd
-        df = pd.read_csv(str(p), dtype=str, keep_default_na=False)
-        records = []
-        for _, x in df.iterrows():
-            rec = {k: x.get(k, "") for k in df.columns}
-            # bbox 문자열이면 JSON 파싱 시도
-            if "bbox" in rec:
-                s = (rec["bbox"] or "").strip()
-                if s.startswith("[") and s.endswith("]"):
-                    try:
-                        rec["bbox"] = json.loads(s)
-                    except Exception:
-                        pass
-            records.append(rec)
-    else:
-        raise SystemExit("지원 입력: .jsonl 또는 .csv")
+    # 입력 로딩(.parquet/.jsonl/.csv)
+    if p.suffix.lower() not in (".parquet", ".jsonl", ".csv"):
+        raise SystemExit("지원 입력: .parquet / .jsonl / .csv")
+    records = list(read_records(str(p)))
 
     # 처리
     out_records = process(records, enabled, args.output)
@@ -380,14 +402,12 @@ if __name__ == "__main__":
 
     # 출력 파일명
     suffix_tag = {"both":"masked", "masked_only":"masked_only", "replace":"masked_replace"}[args.output]
-    out_jsonl = f"{dbg_base}.{suffix_tag}.jsonl"
-    out_csv   = f"{dbg_base}.{suffix_tag}.csv"
+    paths = output_paths(f"{dbg_base}.{suffix_tag}", parse_formats(args.formats))
 
     # 저장(덮어쓰기)
-    dump_jsonl(out_records, out_jsonl)
-    dump_csv(out_records, out_csv, args.output)
+    write_records(out_records, paths, output_fieldnames(out_records, args.output))
 
     # 요약
     print(f"[OK] masked rows: {len(out_records)}  (input rows: {len(records)})")
-    print(f" - {out_jsonl}")
-    print(f" - {out_csv}")
+    for path in paths.values():
+        print(f" - {path}")
@@ -0,0 +1,107 @@
+# pdf_layout.py
+# 역할:
+#  - pdf_text 단어(bbox)를 레이아웃 기준으로 라인/블록으로 재구성 → pdf_line / pdf_block 레코드
+#  - aggregate_pdf_lines(y 좌표만 사용)의 대안: 2단 편집은 단마다 다른 라인으로, 여러 줄 주소/서식 블록은
+#    한 레코드로 묶어 판정 대상 문자열 수를 줄이고 의미 단위로 만듦
+#
+# 방식:
+#  1) 라인: y_bands(y 근접 묶음)를 x 순으로 훑어 단어 간 가로 간격이 col_gap × 글자 높이를 넘으면 분할
+#     (단 사이 여백/표 칸 사이 여백 기준, 일반 단어 간격은 글자 높이의 0.2~0.4배 정도)
+#  2) 블록: 라인을 top 순으로 훑으며 "활성 블록"(마지막 라인 bottom이 block_gap × 글자 높이 안쪽)
+#     중 x 구간이 겹치는 첫 블록에 붙임. top 순이므로 멀어진 블록은 다시 활성화되지 않아 바로 제외
+#     → 활성 블록은 보통 단 수 정도라 라인 수에 대해 거의 선형(구간 트리 없이 스윕으로 처리)
+#  3) 출력: 라인이 2개 이상인 블록은 pdf_block 하나, 단독 라인은 pdf_line — 단어는 정확히 한 레코드에만 포함
+#     bbox는 구성 단어 bbox의 합집합 [x0, top, x1, bottom]
+#
+# 사용:
+#   layout_records(records)  또는  filter_pii_from_intermediate.py ... --layout / agent.py ... --layout
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from detectors_pii import normalize_text
+from filter_pii_from_intermediate import pdf_text_by_container, y_bands
+
+# 라인 분할: 단어 사이 가로 간격 > COL_GAP × 글자 높이
+COL_GAP = 2.0
+# 블록 연결: 위 라인 bottom ~ 아래 라인 top 간격 <= BLOCK_GAP × 글자 높이
+BLOCK_GAP = 0.8
+
+def _bbox_array(toks: List[Dict]) -> np.ndarray:
+    """토큰 bbox → (n, 4) float64 배열 [x0, top, x1, bottom]"""
+    return np.array([[float(v) for v in t["bbox"][:4]] for t in toks], dtype=np.float64).reshape(-1, 4)
+
+def _split_line(idx: np.ndarray, boxes: np.ndarray, col_gap: float) -> List[np.ndarray]:
+    """x 순 단어 인덱스 → 가로 간격이 큰 곳에서 나눈 라인 조각들"""
+    if len(idx) < 2:
+        return [idx]
+    b = boxes[idx]
+    height = float(np.median(b[:, 3] - b[:, 1]))
+    # 앞 단어들의 오른쪽 끝 최댓값 기준(겹치는 단어가 있어도 간격을 과대 계산하지 않음)
+    gaps = b[1:, 0] - np.maximum.accumulate(b[:-1, 2])
+    cuts = np.flatnonzero(gaps > col_gap * max(height, 1.0)) + 1
+    return np.split(idx, cuts) if len(cuts) else [idx]
+
+def _record(kind: str, container: str, toks: List[Dict], box: np.ndarray) -> Optional[Dict]:
+    text = " ".join(normalize_text(t.get("text", "")) for t in toks).strip()
+    if not text:
+        return None
+    x0, top, x1, bottom = (float(v) for v in box)
+    return {
+        "id": f"{kind}::{container}::{int(round(top))}::{int(round(x0))}",
+        "source_path": toks[0].get("source_path", ""),
+        "source_type": f"pdf_{kind}",
+        "container": container,
+        "row": None, "col": None,
+        "header": "",
+        "bbox": [x0, top, x1, bottom],
+        "text": text,
+    }
+
+def layout_records(records: List[Dict], *, y_tol: float = 2.0, col_gap: float = COL_GAP,
+                   block_gap: float = BLOCK_GAP) -> List[Dict]:
+    """
+    pdf_text 레코드 → pdf_line(단독 라인) / pdf_block(여러 줄 블록) 레코드
+    y_tol: 같은 라인으로 볼 top 차이(pt), col_gap/block_gap: 글자 높이 대비 배수
+    """
+    out: List[Dict] = []
+    for container, toks in pdf_text_by_container(records).items():
+        boxes = _bbox_array(toks)
+
+        # 1) 라인: (단어 인덱스, bbox, 글자 높이)
+        lines = []
+        for _, band in y_bands(boxes[:, 1], boxes[:, 0], y_tol):
+            for idx in _split_line(band, boxes, col_gap):
+                b = boxes[idx]
+                box = np.array([b[:, 0].min(), b[:, 1].min(), b[:, 2].max(), b[:, 3].max()])
+                lines.append((idx, box, float(np.median(b[:, 3] - b[:, 1]))))
+        lines.sort(key=lambda ln: (ln[1][1], ln[1][0]))
+
+        # 2) 블록: 활성 블록 스윕 — 블록 = [라인 목록, 합친 bbox, 글자 높이]
+        blocks = []
+        active = []
+        for ln in lines:
+            _, box, height = ln
+            top = box[1]
+            active = [bk for bk in active if top - bk[1][3] <= block_gap * max(bk[2], height, 1.0)]
+            for bk in active:
+                bb = bk[1]
+                if box[0] < bb[2] and bb[0] < box[2]:  # x 구간 겹침
+                    bk[0].append(ln)
+                    bk[1] = np.array([min(bb[0], box[0]), min(bb[1], box[1]),
+                                      max(bb[2], box[2]), max(bb[3], box[3])])
+                    break
+            else:
+                bk = [[ln], box, height]
+                blocks.append(bk)
+                active.append(bk)
+
+        # 3) 레코드(블록 생성 순 = 위에서 아래, 같은 높이는 왼쪽 단부터)
+        for members, box, _ in blocks:
+            kind = "block" if len(members) > 1 else "line"
+            words = [toks[k] for idx, _, _ in members for k in idx.tolist()]
+            rec = _record(kind, container, words, box)
+            if rec is not None:
+                out.append(rec)
+    return out
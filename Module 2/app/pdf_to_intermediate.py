@@ -1,64 +1,130 @@
 # pdf_to_intermediate.py
-import argparse, csv, json, hashlib
+import argparse, csv, json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional, Tuple
 import pdfplumber
 import pandas as pd
+from record_ids import DEFAULT_ID_SCHEME, id_factory
+from intermediate_io import DEFAULT_FORMATS, output_paths, parse_formats, write_records
 
 KEYS = ["id","source_path","source_type","container","row","col","header","bbox","text"]
 
-def _mk_id(*parts) -> str:
-    return hashlib.sha256("||".join(map(str, parts)).encode()).hexdigest()[:16]
+# 병렬 모드에서 한 작업자에게 넘기는 최소 페이지 수(너무 잘게 나누면 파일 열기 비용이 더 큼)
+MIN_PAGES_PER_SHARD = 4
 
-def pdf_text_records(pdf_path: str) -> Iterable[Dict]:
-    pdf_path = str(Path(pdf_path).resolve())
-    with pdfplumber.open(pdf_path) as pdf:
-        for pno, page in enumerate(pdf.pages, start=1):
-            words = page.extract_words(x_tolerance=1.0, y_tolerance=1.0, keep_blank_chars=False)
-            for w in words:
-                text = (w.get("text") or "").strip()
-                if not text:
+def _page_text_records(page, pno: int, pdf_path: str, id_scheme: str) -> Iterable[Dict]:
+    words = page.extract_words(x_tolerance=1.0, y_tolerance=1.0, keep_blank_chars=False)
+    mk = id_factory(id_scheme, pdf_path, "pdf_text", pno)
+    for wi, w in enumerate(words):
+        text = (w.get("text") or "").strip()
+        if not text:
+            continue
+        x0, x1, top, bottom = float(w["x0"]), float(w["x1"]), float(w["top"]), float(w["bottom"])
+        yield {
+            "id": mk(str(wi), x0, top, text),  # fast: 페이지 지문 + 단어 순번
+            "source_path": pdf_path,
+            "source_type": "pdf_text",
+            "container": f"page={pno}",
+            "row": None, "col": None,
+            "header": "",
+            "bbox": [x0, top, x1, bottom],  # PDF 좌표
+            "text": text,
+        }
+
+def _page_table_records(page, pno: int, pdf_path: str, id_scheme: str) -> Iterable[Dict]:
+    tables = page.extract_tables()
+    for ti, table in enumerate(tables, start=1):
+        df = pd.DataFrame(table).fillna("")
+        if df.empty:
+            continue
+        headers = list(df.iloc[0])
+        data = df.iloc[1:].reset_index(drop=True)
+        mk = id_factory(id_scheme, pdf_path, "pdf_table", pno, ti)
+        for r_idx in range(data.shape[0]):
+            for c_idx in range(data.shape[1]):
+                val = str(data.iat[r_idx, c_idx]).strip()
+                if not val:
                     continue
-                x0, x1, top, bottom = float(w["x0"]), float(w["x1"]), float(w["top"]), float(w["bottom"])
+                header = str(headers[c_idx]) if c_idx < len(headers) else ""
                 yield {
-                    "id": _mk_id(pdf_path,"pdf_text",pno,x0,top,text),
+                    "id": mk(f"{r_idx+1}.{c_idx+1}", r_idx+1, c_idx+1, val[:50]),
                     "source_path": pdf_path,
-                    "source_type": "pdf_text",
-                    "container": f"page={pno}",
-                    "row": None, "col": None,
-                    "header": "",
-                    "bbox": [x0, top, x1, bottom],  # PDF 좌표
-                    "text": text,
+                    "source_type": "pdf_table",
+                    "container": f"page={pno},table_{ti}",
+                    "row": r_idx + 1,
+                    "col": c_idx + 1,
+                    "header": header,
+                    "bbox": None,  # pdfplumber 기본 테이블 API는 좌표 미포함
+                    "text": val,
                 }
 
-def pdf_table_records(pdf_path: str) -> Iterable[Dict]:
+def _release_page(page):
+    """페이지 파싱 캐시(chars/objects/layout) 해제. 구버전 pdfplumber는 close()가 없어 flush_cache 사용"""
+    close = getattr(page, "close", None)
+    (close or page.flush_cache)()
+
+def _page_range_records(pdf_path: str, mode: str, id_scheme: str,
+                        pages: Optional[List[int]], table_recs: List[Dict]) -> Iterable[Dict]:
+    """pages(1-based, None=전체)만 열어 pdf_text 레코드는 yield, pdf_table 레코드는 table_recs에 누적"""
+    want_text, want_table = mode in ("text", "both"), mode in ("table", "both")
+    with pdfplumber.open(pdf_path, pages=pages) as pdf:
+        for page in pdf.pages:
+            pno = page.page_number  # pages 지정 시에도 원본 기준 페이지 번호
+            try:
+                if want_text:
+                    yield from _page_text_records(page, pno, pdf_path, id_scheme)
+                if want_table:
+                    table_recs.extend(_page_table_records(page, pno, pdf_path, id_scheme))
+            finally:
+                _release_page(page)
+
+def _extract_shard(args) -> Tuple[List[Dict], List[Dict]]:
+    """작업자 프로세스: 페이지 구간을 독립적으로 열어 (text 레코드, table 레코드) 반환"""
+    pdf_path, mode, id_scheme, first, last = args
+    table_recs: List[Dict] = []
+    text_recs = list(_page_range_records(pdf_path, mode, id_scheme, list(range(first, last + 1)), table_recs))
+    return text_recs, table_recs
+
+def _page_shards(n_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """[(first, last), ...] 연속 페이지 구간. 작업자당 몇 개씩 돌아가도록 나눠 페이지별 편차를 흡수"""
+    n_shards = max(1, min(workers * 4, n_pages // MIN_PAGES_PER_SHARD))
+    size = -(-n_pages // n_shards)
+    return [(a, min(a + size - 1, n_pages)) for a in range(1, n_pages + 1, size)]
+
+def pdf_records(pdf_path: str, mode: str = "both", id_scheme: str = DEFAULT_ID_SCHEME,
+                workers: int = 1) -> Iterable[Dict]:
+    """
+    PDF를 한 번만 열고 페이지마다 단어/표를 같은 page 객체에서 추출(파싱 1회).
+    - 페이지 처리 후 즉시 캐시를 해제하므로 긴 문서에서도 메모리가 페이지 1장 수준
+    - 출력 순서는 기존과 동일: 전체 pdf_text 레코드 → 전체 pdf_table 레코드
+      (표 레코드만 끝까지 모아 두었다가 마지막에 내보냄)
+    - mode: text / table / both
+    - workers > 1: 페이지 구간을 프로세스마다 나눠 각자 파일을 열어 추출하고,
+      결과는 페이지 순서대로 병합(workers=1과 출력 동일)
+    """
     pdf_path = str(Path(pdf_path).resolve())
-    with pdfplumber.open(pdf_path) as pdf:
-        for pno, page in enumerate(pdf.pages, start=1):
-            tables = page.extract_tables()
-            for ti, table in enumerate(tables, start=1):
-                df = pd.DataFrame(table).fillna("")
-                if df.empty:
-                    continue
-                headers = list(df.iloc[0])
-                data = df.iloc[1:].reset_index(drop=True)
-                for r_idx in range(data.shape[0]):
-                    for c_idx in range(data.shape[1]):
-                        val = str(data.iat[r_idx, c_idx]).strip()
-                        if not val:
-                            continue
-                        header = str(headers[c_idx]) if c_idx < len(headers) else ""
-                        yield {
-                            "id": _mk_id(pdf_path,"pdf_table",pno,ti,r_idx+1,c_idx+1,val[:50]),
-                            "source_path": pdf_path,
-                            "source_type": "pdf_table",
-                            "container": f"page={pno},table_{ti}",
-                            "row": r_idx + 1,
-                            "col": c_idx + 1,
-                            "header": header,
-                            "bbox": None,  # pdfplumber 기본 테이블 API는 좌표 미포함
-                            "text": val,
-                        }
+    table_recs: List[Dict] = []
+    if workers > 1:
+        with pdfplumber.open(pdf_path) as pdf:
+            n_pages = len(pdf.pages)
+        shards = _page_shards(n_pages, workers)
+        if len(shards) > 1:
+            jobs = [(pdf_path, mode, id_scheme, first, last) for first, last in shards]
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as ex:
+                for text_part, table_part in ex.map(_extract_shard, jobs):  # map은 제출 순서대로 반환
+                    yield from text_part
+                    table_recs.extend(table_part)
+            yield from table_recs
+            return
+    yield from _page_range_records(pdf_path, mode, id_scheme, None, table_recs)
+    yield from table_recs
+
+def pdf_text_records(pdf_path: str, id_scheme: str = DEFAULT_ID_SCHEME) -> Iterable[Dict]:
+    return pdf_records(pdf_path, "text", id_scheme)
+
+def pdf_table_records(pdf_path: str, id_scheme: str = DEFAULT_ID_SCHEME) -> Iterable[Dict]:
+    return pdf_records(pdf_path, "table", id_scheme)
 
 def dump_jsonl(records: Iterable[Dict], out_path: str):
     with open(out_path, "w", encoding="utf-8") as f:
@@ -75,10 +141,13 @@ def dump_csv(records: Iterable[Dict], out_path: str):
             w.writerow({k: row.get(k, "") for k in KEYS})
 
 if __name__ == "__main__":
-    ap = argparse.ArgumentParser(description="PDF → intermediate(JSONL/CSV) using pdfplumber")
+    ap = argparse.ArgumentParser(description="PDF → intermediate(Parquet/JSONL/CSV) using pdfplumber")
     ap.add_argument("pdf", type=str)
     ap.add_argument("--out-prefix", default="")
     ap.add_argument("--mode", choices=["text","table","both"], default="both")
+    ap.add_argument("--legacy-ids", action="store_true", help="기존 SHA-256 기반 ID 유지(이전 산출물과 ID 호환)")
+    ap.add_argument("--workers", type=int, default=1, help="페이지 병렬 추출 프로세스 수(1=순차)")
+    ap.add_argument("--formats", default=",".join(DEFAULT_FORMATS), help="출력 포맷(쉼표 구분): parquet,jsonl,csv")
     args = ap.parse_args()
 
     p = Path(args.pdf)
@@ -87,12 +156,9 @@ if __name__ == "__main__":
 
     prefix = args.out_prefix or p.with_suffix("").as_posix()
 
-    recs: List[Dict] = []
-    if args.mode in ("text","both"):
-        recs.extend(list(pdf_text_records(str(p))))
-    if args.mode in ("table","both"):
-        recs.extend(list(pdf_table_records(str(p))))
-
-    dump_jsonl(recs, f"{prefix}.pdf.intermediate.jsonl")
-    dump_csv(recs, f"{prefix}.pdf.intermediate.csv")
-    print(f"[OK] PDF({args.mode}) → {len(recs)} rows")
+    id_scheme = "legacy" if args.legacy_ids else DEFAULT_ID_SCHEME
+    paths = output_paths(f"{prefix}.pdf.intermediate", parse_formats(args.formats))
+    n = write_records(pdf_records(str(p), args.mode, id_scheme, workers=args.workers), paths, KEYS)
+    print(f"[OK] PDF({args.mode}) → {n} rows")
+    for path in paths.values():
+        print(f" - {path}")
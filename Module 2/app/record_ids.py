@@ -0,0 +1,34 @@
+# record_ids.py
+# 역할:
+#  - intermediate 레코드 ID 생성 (xlsx_to_intermediate / pdf_to_intermediate 공용)
+# 스킴:
+#  - fast(기본) : 컨테이너(파일+유형+시트/페이지/표) 지문을 한 번만 해시하고, 셀/단어는 좌표를 붙임
+#                 예) "3f9a0c1d2b7e6a55:12.4"  → 셀마다 해시 없음, 같은 컨테이너 안에서는 충돌 불가
+#  - legacy     : 기존 방식 SHA-256("||".join(경로, 유형, 좌표..., 텍스트[:50]))[:16]
+#                 이전 산출물과 ID를 맞춰야 할 때 사용 (--legacy-ids 또는 환경변수 PII_ID_SCHEME=legacy)
+
+import hashlib, os
+from typing import Callable
+
+ID_SCHEMES = ("fast", "legacy")
+DEFAULT_ID_SCHEME = os.getenv("PII_ID_SCHEME", "fast")
+
+def legacy_id(*parts) -> str:
+    return hashlib.sha256("||".join(map(str, parts)).encode()).hexdigest()[:16]
+
+def container_fingerprint(*parts) -> str:
+    """컨테이너 식별 문자열 → 64비트 지문(hex 16자)"""
+    return hashlib.blake2b("||".join(map(str, parts)).encode("utf-8", "surrogatepass"), digest_size=8).hexdigest()
+
+def id_factory(scheme: str, *container_parts) -> Callable[..., str]:
+    """
+    컨테이너 단위 ID 생성기 반환: mk(pos, *legacy_tail) -> id
+      - pos         : 컨테이너 내 위치 문자열(fast용, 예: f"{row}.{col}")
+      - legacy_tail : legacy ID에 이어 붙일 값(좌표, 텍스트 앞부분 등)
+    """
+    if scheme == "legacy":
+        return lambda pos, *legacy_tail: legacy_id(*container_parts, *legacy_tail)
+    if scheme != "fast":
+        raise ValueError(f"지원하지 않는 ID 스킴: {scheme}")
+    prefix = container_fingerprint(*container_parts) + ":"
+    return lambda pos, *legacy_tail: prefix + pos
@@ -0,0 +1,129 @@
+# scan_manifest.py
+# 역할:
+#  - 증분 재스캔용 매니페스트(SQLite)
+#  - 키: 경로 + 크기 + mtime_ns + 내용 해시 + 검출기 버전
+#       검출기 버전 = 추출/검출/필터/마스킹 모듈 소스 해시 + 결과에 영향을 주는 옵션
+#  - 변경 없는 파일은 이전 결과(.pii 등 산출물 경로/건수)를 그대로 재사용
+#
+# 판정 순서:
+#  1) 경로/검출기 버전 일치 + 크기/mtime 일치                → 변경 없음(해시 계산 안 함)
+#  2) 크기만 일치(mtime만 바뀐 경우: 복사/touch)            → 내용 해시 비교 후 같으면 변경 없음
+#  3) 그 외 또는 이전 산출물 파일이 없어진 경우              → 다시 처리
+
+import hashlib, json, os, sqlite3, time
+from pathlib import Path
+from typing import Dict, Optional
+
+# 검출 결과에 영향을 주는 모듈(소스가 바뀌면 전체 재처리)
+DETECTOR_MODULES = (
+    "xlsx_to_intermediate.py",
+    "pdf_to_intermediate.py",
+    "pdf_layout.py",
+    "record_ids.py",
+    "detectors_pii.py",
+    "tabular_pii.py",
+    "filter_pii_from_intermediate.py",
+    "mask_pii.py",
+    "intermediate_io.py",  # 산출물 스키마(직렬화 방식) — 바뀌면 이전 산출물을 재사용하지 않음
+)
+
+# 결과 dict에서 산출물 경로를 담는 키
+OUTPUT_KEYS = ("inter_path", "pii_path", "masked_path", "inter_jsonl", "pii_jsonl", "pii_csv")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path             TEXT PRIMARY KEY,
+    size             INTEGER NOT NULL,
+    mtime_ns         INTEGER NOT NULL,
+    content_hash     TEXT    NOT NULL,
+    detector_version TEXT    NOT NULL,
+    result           TEXT    NOT NULL,
+    updated_at       REAL    NOT NULL
+)
+"""
+
+def detector_version(options: Dict) -> str:
+    """검출기 모듈 소스 + 옵션(JSON) 해시"""
+    h = hashlib.blake2b(digest_size=8)
+    here = Path(__file__).resolve().parent
+    for name in DETECTOR_MODULES:
+        p = here / name
+        h.update(name.encode())
+        h.update(p.read_bytes() if p.exists() else b"")
+    h.update(json.dumps(options, ensure_ascii=False, sort_keys=True, default=_json_default).encode())
+    return h.hexdigest()
+
+def _json_default(o):
+    if isinstance(o, (set, frozenset)):
+        return sorted(o)  # 순서 고정(집합은 실행마다 순서가 달라질 수 있음)
+    return str(o)
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class ScanManifest:
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, path: Path, version: str) -> Optional[Dict]:
+        """변경 없는 파일이면 이전 결과 dict, 아니면 None"""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, content_hash, detector_version, result FROM files WHERE path = ?",
+            (str(path),),
+        ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, content_hash, prev_version, result_json = row
+        if prev_version != version:
+            return None
+
+        st = path.stat()
+        if st.st_size != size:
+            return None
+        if st.st_mtime_ns != mtime_ns:
+            if file_digest(path) != content_hash:
+                return None
+            # 내용은 같음 → mtime만 갱신해 다음에는 해시 없이 통과
+            self.conn.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, str(path)))
+            self.conn.commit()
+
+        result = json.loads(result_json)
+        for k in OUTPUT_KEYS:
+            if result.get(k) and not os.path.exists(result[k]):
+                return None
+        return result
+
+    def record(self, path: Path, version: str, result: Dict, st: Optional[os.stat_result] = None,
+               digest: Optional[str] = None):
+        """
+        처리 성공 결과 저장(레코드 리스트 등 큰 값은 제외)
+        - st/digest: 처리 시작 전 stat/file_digest. 처리 중 파일이 바뀌었으면 다음 lookup에서
+          크기/mtime과 해시가 모두 불일치해 재처리됨(둘 다 생략하면 지금 상태로 계산)
+        """
+        st = st or path.stat()
+        digest = digest or file_digest(path)
+        keep = {k: v for k, v in result.items() if k not in ("pii_records", "masked_records")}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash, detector_version, result, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(path), st.st_size, st.st_mtime_ns, digest, version,
+             json.dumps(keep, ensure_ascii=False), time.time()),
+        )
+        self.conn.commit()
@@ -0,0 +1,346 @@
+# tabular_pii.py
+# 역할:
+#  - filter_records(profile_sample=N)의 컬럼 프로파일링: 표 형태 소스(xlsx / pdf_table) 컬럼을 표본으로
+#    skip/single/full 처리 방식을 정하고, 판정이 필요한 값은 컬럼 단위 pandas 문자열 연산으로 처리
+#  - 판정 결과(pii_type)는 셀마다 detectors_pii.classify_text를 부른 것과 동일(skip 컬럼 제외)
+#  - 프로파일링 없는 컬럼 단위 판정 모드는 두지 않음: object dtype str.contains가 값마다 파이썬 re를
+#    돌려 셀 단위 결합 스캐너 + 메모보다 빠르지 않음(38만 셀 기준 동률~느림)
+#
+# 방식:
+#  - 컬럼 = (header, source_type). 같은 컬럼의 셀은 헤더 라벨 조건이 같으므로 라벨 판정은 컬럼당 1회
+#  - 컬럼 값을 factorize해 고유값만 정규화/판정(부서/코드/상태값처럼 반복이 많은 컬럼에서 효과 큼)
+#  - detectors_pii의 패턴을 기존 우선순위 순서대로 str.contains / str.match로 적용
+#    앞 단계에서 타입이 정해진 셀은 다음 단계 대상에서 빠짐(남은 셀만 검사)
+#  - pyarrow.compute의 정규식은 RE2 기반이라 lookbehind((?<!\d))를 지원하지 않음 → pandas(re) 사용
+#  - 카드/주민번호 체크섬 검증(detectors_pii.VALIDATION_MODE)은 첫 매치의 숫자열을 길이별
+#    uint8 행렬로 만들어 numpy 정수 연산으로 한꺼번에 검사, 실패한 값만 셀 단위 검사(다른 매치 위치 확인)
+#
+# 컬럼 프로파일링(선택, profile_sample=N):
+#  - 컬럼마다 N개 셀을 고르게 뽑아 classify_text로 판정한 뒤 컬럼 처리 방식을 정함
+#      skip   : 표본이 전부 미검출 → 컬럼 전체를 판정하지 않음(금액/날짜/코드 컬럼)
+#      single : 표본의 PROFILE_SINGLE_MIN 이상이 한 타입 → 그 타입 검출기 하나로 먼저 처리,
+#               맞지 않는 값만 전체 판정
+#      full   : 그 외(여러 타입 혼재/표본 부족) → 전체 판정
+#  - 표본에 없던 PII는 skip 컬럼에서 놓칠 수 있음 → 기본 비활성, bench_pipeline.py profile로 재현율 확인
+#  - 헤더 기반 보강이 있는 컬럼(이메일/연락처/성명 등, no_profile)은 프로파일링하지 않고 전체 판정
+#    (skip이면 모든 셀이 미검출 → 보강 타입으로 덮여 실제 주민/카드번호 등이 헤더 타입으로 바뀜)
+#  - 이득은 기본(셀 단위) 경로 대비 측정: 합성 38만 셀(40컬럼, 38% skip)에서 1.1~1.4배 수준
+#    (PII 없는 컬럼 비중이 클수록 커지고, 전부 full이면 오히려 느림)
+#
+# 사용:
+#   filter_records(records, profile_sample=64)  또는  ... --profile-sample 64
+
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+import re, warnings
+
+import numpy as np
+import pandas as pd
+
+import detectors_pii
+from detectors_pii import (
+    classify_text, EMAIL, KR_PHONE, INTL_PHONE, E164_PHONE, RRN, CARD_16, CARD_4_6_5, PASSPORT,
+    KR_DL_HYPHEN, KR_DL_12_DIGITS, ADDR_HINT, ADDR_CORE, HANGUL_NAME, NON_NAME_HINTS,
+    _PASSPORT_LBL_RE, _NORM_TABLE, _SCAN_PATTERNS, _scoped, card_hit, label_flags, luhn_ok,
+    rrn_hit, rrn_ok,
+)
+
+# 컬럼 단위 판정 대상 source_type
+TABULAR_SOURCES = ("xlsx", "pdf_table")
+
+# classify_tabular 결과에서 "컬럼 판정 대상이 아님"(셀 단위로 판정해야 함) 표시
+NOT_TABULAR = object()
+
+# 프로파일링: single 판정 최소 비율(표본 중 비어 있지 않은 셀 기준)
+PROFILE_SINGLE_MIN = 0.9
+# 컬럼 셀 수가 표본의 이 배수 이하이면 프로파일링 없이 전체 판정(이득 없음)
+PROFILE_MIN_FACTOR = 2
+
+_NON_NAME_RE = "|".join(map(re.escape, NON_NAME_HINTS))
+# 위치 기반(라벨 무관) 패턴 중 하나라도 매치되는지 — 매치 없는 값은 개별 패턴 검사를 건너뜀
+_ANY_POSITIONAL = "|".join(_scoped(pat) for _, pat in _SCAN_PATTERNS)
+
+# 정규화가 필요한 값(제로폭/유니코드 대시/앞뒤 공백/연속 공백/스페이스 외 공백)
+_NEEDS_NORM = "[\u200b\u200c\u200d\ufeff\u2060\u2010-\u2014]|^\\s|\\s$|\\s\\s|[^\\S ]"
+
+def normalize_series(texts: pd.Series) -> pd.Series:
+    """
+    detectors_pii.normalize_text의 벡터화 버전(제로폭 제거/대시 통일 → 공백 정리), 입력은 object dtype 문자열
+    대부분의 셀은 이미 정규화된 상태 → 필요한 값만 골라 변환
+    """
+    need = texts.str.contains(_NEEDS_NORM, regex=True, na=False)
+    if not need.any():
+        return texts
+    s = texts[need].str.translate(_NORM_TABLE)
+    # " ".join(s.split())와 동일(\s와 str.split()의 공백 정의가 같음)
+    s = s.str.replace(r"\s+", " ", regex=True).str.strip()
+    out = texts.copy()
+    out[need] = s
+    return out
+
+# 체크섬 검증용: 첫 매치 전체를 캡처(카드는 두 패턴 중 왼쪽 매치)
+_RRN_FIRST = f"({_scoped(RRN)})"
+_CARD_FIRST = f"({_scoped(CARD_16)}|{_scoped(CARD_4_6_5)})"
+
+_LUHN_DOUBLE = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.int64)
+_RRN_WEIGHTS = np.array([2, 3, 4, 5, 6, 7, 8, 9, 2, 3, 4, 5], dtype=np.int64)
+_RRN_CENTURY = np.array([1800, 1900, 1900, 2000, 2000, 1900, 1900, 2000, 2000, 1800], dtype=np.int64)
+_MONTH_DAYS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+def _check_by_length(digits: Sequence[str], matrix_check, scalar_check) -> np.ndarray:
+    """
+    숫자열 리스트 → 검증 결과 bool 배열
+    ASCII 숫자열은 길이별로 묶어 (n, 길이) 행렬로 matrix_check, 그 외(전각 숫자 등)는 scalar_check
+    """
+    out = np.zeros(len(digits), dtype=bool)
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i, d in enumerate(digits):
+        if d.isascii():
+            groups[len(d)].append(i)
+        else:
+            out[i] = scalar_check(d)
+    for n, idx in groups.items():
+        if n == 0:
+            continue
+        buf = "".join(digits[i] for i in idx).encode("ascii")
+        m = np.frombuffer(buf, dtype=np.uint8).reshape(len(idx), n).astype(np.int64) - 48
+        out[idx] = matrix_check(m)
+    return out
+
+def _luhn_matrix(m: np.ndarray) -> np.ndarray:
+    n = m.shape[1]
+    total = m[:, n - 1::-2].sum(axis=1)
+    if n > 1:
+        total += _LUHN_DOUBLE[m[:, n - 2::-2]].sum(axis=1)
+    return total % 10 == 0
+
+def luhn_ok_array(digits: Sequence[str]) -> np.ndarray:
+    """detectors_pii.luhn_ok의 벡터화 버전"""
+    return _check_by_length(digits, _luhn_matrix, luhn_ok)
+
+def _rrn_matrix(m: np.ndarray, check_digit: bool) -> np.ndarray:
+    if m.shape[1] != 13:
+        return np.zeros(len(m), dtype=bool)
+    year = _RRN_CENTURY[m[:, 6]] + m[:, 0] * 10 + m[:, 1]
+    month = m[:, 2] * 10 + m[:, 3]
+    day = m[:, 4] * 10 + m[:, 5]
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    ok_month = (month >= 1) & (month <= 12)
+    days = _MONTH_DAYS[np.where(ok_month, month, 0)] + ((month == 2) & leap)
+    ok = ok_month & (day >= 1) & (day <= days)
+    if check_digit:
+        ok &= (11 - (m[:, :12] @ _RRN_WEIGHTS) % 11) % 10 == m[:, 12]
+    return ok
+
+def rrn_ok_array(digits: Sequence[str], check_digit: bool = True) -> np.ndarray:
+    """detectors_pii.rrn_ok의 벡터화 버전"""
+    return _check_by_length(digits, lambda m: _rrn_matrix(m, check_digit),
+                            lambda d: rrn_ok(d, check_digit))
+
+def _validated(d: pd.Series, hit: pd.Series, first_pat: str, check, exact) -> pd.Series:
+    """
+    패턴 매치(hit) 중 체크섬 통과분만 남김
+    첫 매치 숫자열을 벡터 검증 → 실패한 값만 exact(셀 단위, 겹치는 다른 매치까지 확인)
+    """
+    if not hit.any():
+        return hit
+    vals = d[hit]
+    first = vals.str.extract(first_pat, expand=True)[0].str.replace(r"\D", "", regex=True)
+    ok = check(first.tolist())
+    if not ok.all():
+        bad = np.flatnonzero(~ok)
+        ok[bad] = [exact(v) for v in vals.iloc[bad]]
+    out = hit.copy()
+    out[vals.index] = ok
+    return out
+
+def _rrn_mask(d: pd.Series) -> pd.Series:
+    hit = _contains(d, RRN)
+    mode = detectors_pii.VALIDATION_MODE
+    if mode not in ("rrn", "strict"):
+        return hit
+    strict = mode == "strict"
+    return _validated(d, hit, _RRN_FIRST, lambda xs: rrn_ok_array(xs, strict), rrn_hit)
+
+def _card_mask(d: pd.Series) -> pd.Series:
+    hit = _contains(d, CARD_16) | _contains(d, CARD_4_6_5)
+    if detectors_pii.VALIDATION_MODE == "off":
+        return hit
+    return _validated(d, hit, _CARD_FIRST, luhn_ok_array, card_hit)
+
+def _contains(s: pd.Series, pat) -> pd.Series:
+    with warnings.catch_warnings():
+        # 캡처 그룹이 있는 패턴(CARD_16 등)에 대한 "match groups" 경고 무시 — 포함 여부만 사용
+        warnings.simplefilter("ignore", UserWarning)
+        return s.str.contains(pat.pattern if hasattr(pat, "pattern") else pat, regex=True, na=False)
+
+class ColumnProfile(NamedTuple):
+    action: str                # skip | single | full
+    pii_type: Optional[str]    # single일 때 타입
+    confidence: float          # 표본(비어 있지 않은 셀) 중 최빈 판정 비율(skip이면 미검출 비율)
+    sampled: int               # 판정한 표본 수
+
+def profile_column(values: Sequence, header: str, sample: int, source_type: str = "xlsx") -> ColumnProfile:
+    """컬럼에서 sample개 셀을 고르게 뽑아 판정 → 컬럼 처리 방식 결정"""
+    n = len(values)
+    if sample <= 0 or n <= sample * PROFILE_MIN_FACTOR:
+        return ColumnProfile("full", None, 0.0, 0)
+    ctx = {"header": header, "container": "", "source_type": source_type}
+    counts: Dict[Optional[str], int] = defaultdict(int)
+    for k in range(sample):
+        v = values[k * n // sample]
+        if v is None or v == "":
+            continue
+        counts[classify_text(v if isinstance(v, str) else str(v), ctx)] += 1
+    total = sum(counts.values())
+    if total == 0:
+        return ColumnProfile("full", None, 0.0, 0)
+    top, hits = max(counts.items(), key=lambda kv: kv[1])
+    conf = hits / total
+    if top is None and conf == 1.0:
+        return ColumnProfile("skip", None, conf, total)
+    if top is not None and conf >= PROFILE_SINGLE_MIN:
+        return ColumnProfile("single", top, conf, total)
+    return ColumnProfile("full", top, conf, total)
+
+def _classify_values(values: List, header: str, profile: Optional[ColumnProfile] = None):
+    """
+    같은 컬럼에서는 판정이 텍스트에만 의존하므로 고유값(factorize)만 정규화/판정해 셀로 펼침
+    profile: skip이면 판정 생략, single이면 해당 타입 검출기를 먼저 적용
+    반환: (pii_type 배열, 정규화 텍스트 배열)
+    """
+    # object dtype 고정: Arrow 기반 문자열 dtype이면 str.contains가 RE2로 가서 lookbehind 패턴이 실패함
+    raw = pd.Series(["" if v is None else str(v) for v in values], dtype=object)
+    codes, uniques = pd.factorize(raw)
+    norm = normalize_series(pd.Series(uniques, dtype=object))
+    lf = label_flags(header or "")
+    action = profile.action if profile else "full"
+    if action == "skip":
+        types = np.full(len(norm), None, dtype=object)
+    elif action == "single":
+        hit = (norm != "") & _single_type_mask(norm, profile.pii_type, lf)
+        types = np.full(len(norm), None, dtype=object)
+        types[hit.to_numpy()] = profile.pii_type
+        miss = norm[~hit]
+        if not miss.empty:
+            types[miss.index.to_numpy()] = _classify_unique(miss.reset_index(drop=True), lf)
+    else:
+        types = _classify_unique(norm, lf)
+    return types[codes], norm.to_numpy()[codes]
+
+def _single_type_mask(s: pd.Series, pii_type: str, lf) -> pd.Series:
+    """한 타입의 검출 규칙(패턴 + 라벨 조건)에만 맞는지 — 다른 타입과의 우선순위 경합은 보지 않음"""
+    false = pd.Series(False, index=s.index)
+    if pii_type == "email":
+        at = s.str.contains("@", regex=False)
+        return at if lf.email else at & _contains(s, EMAIL)
+    if pii_type == "phone":
+        m = _contains(s, KR_PHONE) | _contains(s, INTL_PHONE)
+        return m | _contains(s, E164_PHONE) if lf.phone else m
+    if pii_type == "rrn":
+        return _rrn_mask(s)
+    if pii_type == "card":
+        m = _card_mask(s)
+        return m | s.str.count(r"\d").between(12, 19) if lf.card else m
+    if pii_type == "passport":
+        m = _contains(s, PASSPORT)
+        return m | _contains(s, _PASSPORT_LBL_RE) if lf.passport else m
+    if pii_type == "driver_license":
+        m = _contains(s, KR_DL_HYPHEN)
+        return m | _contains(s, KR_DL_12_DIGITS) if lf.dl else m
+    if pii_type == "address":
+        return ~false if lf.address else _contains(s, ADDR_HINT) & _contains(s, ADDR_CORE)
+    if pii_type == "name":
+        if not lf.name:
+            return false
+        return ~s.str.contains(_NON_NAME_RE, regex=True) & s.str.match(HANGUL_NAME.pattern, na=False)
+    return false
+
+def _classify_unique(s: pd.Series, lf) -> np.ndarray:
+    """정규화된 고유 텍스트 → pii_type 배열 (classify_text와 같은 우선순위로 패턴을 컬럼 전체에 적용)"""
+    out = np.full(len(s), None, dtype=object)
+
+    # 남은(미판정) 값만 대상으로 우선순위 순서대로 적용
+    rest = s[s != ""]
+
+    def assign(hit: pd.Series, pii_type: str):
+        nonlocal rest
+        idx = hit.index[hit.to_numpy()]
+        out[idx.to_numpy()] = pii_type
+        if len(idx):
+            rest = rest.drop(idx)
+
+    # ---- 이메일 ----
+    if not rest.empty:
+        assign(rest.str.contains("@", regex=False) & _contains(rest, EMAIL), "email")
+    if lf.email and not rest.empty:
+        assign(rest.str.contains("@", regex=False), "email")
+
+    # ---- 숫자가 필요한 패턴(전화/주민/카드/여권/운전면허) ----
+    # (타입, 검사, 라벨 조건부 여부) — 라벨 조건부 검사는 헤더 라벨이 있을 때만
+    steps = [
+        ("phone", lambda d: _contains(d, KR_PHONE) | _contains(d, INTL_PHONE), False),
+        ("phone", (lambda d: _contains(d, E164_PHONE)) if lf.phone else None, True),
+        ("rrn", _rrn_mask, False),
+        ("card", _card_mask, False),
+        ("card", (lambda d: d.str.count(r"\d").between(12, 19)) if lf.card else None, True),  # 느슨한 길이 조건
+        ("passport", lambda d: _contains(d, PASSPORT), False),
+        ("passport", (lambda d: _contains(d, _PASSPORT_LBL_RE)) if lf.passport else None, True),
+        ("driver_license", lambda d: _contains(d, KR_DL_HYPHEN), False),
+        ("driver_license", (lambda d: _contains(d, KR_DL_12_DIGITS)) if lf.dl else None, True),
+    ]
+    digit = rest[rest.str.contains(r"\d", regex=True)] if not rest.empty else rest
+    cand = digit[_contains(digit, _ANY_POSITIONAL)] if not digit.empty else digit
+    for pii_type, test, labeled in steps:
+        d = digit if labeled else cand
+        if test is None or d.empty:
+            continue
+        hit = test(d)
+        assign(hit, pii_type)
+        done = hit.index[hit.to_numpy()]
+        digit = digit.drop(done)
+        cand = cand.drop(cand.index.intersection(done))
+
+    # ---- 주소 ----
+    if lf.address:
+        assign(pd.Series(True, index=rest.index), "address")
+    elif not rest.empty:
+        assign(_contains(rest, ADDR_HINT) & _contains(rest, ADDR_CORE), "address")
+
+    # ---- 이름(헤더가 성명/이름 계열일 때만) ----
+    if lf.name and not rest.empty:
+        ok = ~rest.str.contains(_NON_NAME_RE, regex=True) & rest.str.match(HANGUL_NAME.pattern, na=False)
+        assign(ok, "name")
+
+    return out
+
+def classify_tabular(records: Sequence[Dict], *, profile_sample: int = 0,
+                     no_profile: Optional[Callable[[str], bool]] = None, stats: Optional[Dict] = None) -> List:
+    """
+    레코드 리스트 → 같은 길이의 판정 리스트
+      - 표 형태 소스 셀: (pii_type 또는 None, 정규화 텍스트) — 컬럼 단위 벡터화 판정
+        정규화 텍스트는 원본 text가 문자열이 아니면 None(호출 측에서 직접 정규화)
+      - 그 외(pdf_text/pdf_line 등): NOT_TABULAR → 호출 측에서 classify_text로 셀 단위 판정
+    profile_sample > 0: 컬럼 프로파일링으로 skip/single/full 결정
+    no_profile(header)가 True인 컬럼은 프로파일링 없이 전체 판정(헤더 기반 보강 컬럼)
+    stats: 지정 시 컬럼/셀 수를 처리 방식별로 누적
+           {"columns_skip", "columns_single", "columns_full", "cells_skip", "cells_single", "cells_full"}
+    """
+    result: List = [NOT_TABULAR] * len(records)
+    columns: Dict[tuple, List[int]] = defaultdict(list)
+    for i, r in enumerate(records):
+        st = r.get("source_type")
+        if st in TABULAR_SOURCES:
+            columns[(r.get("header", ""), st)].append(i)
+    for (header, st), idx in columns.items():
+        values = [records[i].get("text", "") for i in idx]
+        profiled = profile_sample and not (no_profile and no_profile(header))
+        profile = profile_column(values, header, profile_sample, st) if profiled else None
+        types, norm = _classify_values(values, header, profile)
+        if stats is not None:
+            action = profile.action if profile else "full"
+            stats[f"columns_{action}"] = stats.get(f"columns_{action}", 0) + 1
+            stats[f"cells_{action}"] = stats.get(f"cells_{action}", 0) + len(idx)
+        for i, v, t, n in zip(idx, values, types.tolist(), norm.tolist()):
+            result[i] = (t, n if isinstance(v, str) else None)
+    return result
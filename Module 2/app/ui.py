@@ -13,7 +13,6 @@ import streamlit as st
 
 # ---- 코어 모듈 (동일 venv/프로젝트 폴더에 있어야 함) ----
 import agent  # run_agent_on_paths
-from mask_pii import process as mask_process
 from xlsx_apply_mask import apply_masks_to_workbook
 from convert import convert_csv_format
 
@@ -202,7 +201,11 @@ if submitted:
 
         total_steps = 5  # 분석, 탐지, 마스킹/치환, 결과물 생성, 변환
 
-        # 1) Intermediate/PII 생성
+        # 1) Intermediate/PII 생성 + 마스킹(선택 타입만) — 파일 없이 메모리에서 이어 처리
+        enabled = {KOR2TYPE[o] for o in selected_options if o in KOR2TYPE}
+        if not enabled:
+            raise ValueError("선택된 마스킹 타입이 없습니다.")
+
         tick("텍스트/테이블 분석", 1, total_steps)
         results = agent.run_agent_on_paths(
             [src_path],
@@ -213,23 +216,16 @@ if submitted:
             dedupe=dedupe,
             debug_drops=False,
             stop_on_error=False,
+            in_memory=True,
+            mask_types=enabled,
+            mask_output="replace",
         )
         if not results or ("error" in results[0]):
             raise RuntimeError(results[0].get("error", "PII 처리 실패"))
 
-        pii_csv = Path(results[0]["pii_csv"])
-        if not pii_csv.exists():
-            raise FileNotFoundError(f"PII CSV가 없습니다: {pii_csv}")
-
+        # 2) 마스킹 결과
         tick("패턴 탐지", 2, total_steps)
-        df_pii = pd.read_csv(pii_csv, dtype=str, keep_default_na=False)
-        pii_rows = df_pii.to_dict(orient="records")
-
-        # 2) 마스킹(선택 타입만)
-        enabled = {KOR2TYPE[o] for o in selected_options if o in KOR2TYPE}
-        if not enabled:
-            raise ValueError("선택된 마스킹 타입이 없습니다.")
-        masked_records = mask_process(pii_rows, enabled, output_mode="replace")
+        masked_records = results[0]["masked_records"]
 
         # 세션 보관(후속 시각화용)
         ss.enabled_types = enabled
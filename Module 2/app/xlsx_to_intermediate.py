@@ -1,27 +1,101 @@
 # xlsx_to_intermediate.py
-import argparse, csv, json, hashlib
+import argparse, csv, json
 from pathlib import Path
-from typing import Dict, Iterable
-import pandas as pd
+from typing import Dict, Iterable, List
+from openpyxl import load_workbook
+from record_ids import DEFAULT_ID_SCHEME, id_factory
+from intermediate_io import DEFAULT_FORMATS, output_paths, parse_formats, write_records
 
 KEYS = ["id","source_path","source_type","container","row","col","header","bbox","text"]
 
-def _mk_id(*parts) -> str:
-    return hashlib.sha256("||".join(map(str, parts)).encode()).hexdigest()[:16]
+# pandas.read_excel 기본 na_values (이 문자열 셀은 NaN으로 보고 건너뜀)
+_PANDAS_NA = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+              "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+# 수식 오류 셀(values_only에서는 문자열로 들어옴) → pandas는 NaN 처리
+_EXCEL_ERRORS = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A", "#GETTING_DATA"}
 
-def xlsx_to_records(xlsx_path: str) -> Iterable[Dict]:
+def _cell_text(v):
+    """openpyxl 셀 값 → pandas(dtype=str)와 같은 문자열. 빈 값이면 None."""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        if v in _PANDAS_NA or v in _EXCEL_ERRORS:
+            return None
+        return v
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)  # pandas openpyxl 엔진과 동일하게 정수형 실수는 int로
+    return str(v)
+
+def _header_names(first_row) -> List[str]:
+    """pandas 헤더 규칙: 빈 칸 → 'Unnamed: i', 중복 → 'name.1', 'name.2' ..."""
+    names = [f"Unnamed: {i}" if v is None or v == "" else v for i, v in enumerate(first_row)]
+    counts: Dict = {}
+    for i, col in enumerate(names):
+        cur = counts.get(col, 0)
+        while cur > 0:
+            counts[col] = cur + 1
+            col = f"{col}.{cur}"
+            cur = counts.get(col, 0)
+        names[i] = col
+        counts[col] = cur + 1
+    return [str(n) for n in names]
+
+def xlsx_to_records(xlsx_path: str, id_scheme: str = DEFAULT_ID_SCHEME) -> Iterable[Dict]:
+    """
+    읽기 전용 행 이터레이터로 시트마다 한 번씩만 훑으며 셀 단위로 레코드를 생성(스트리밍).
+    - 워크북 전체를 DataFrame으로 만들지 않으므로 대용량에서도 메모리가 거의 일정
+    - 출력(row/col/header/text)은 기존 pandas 구현(xlsx_to_records_pandas)과 동일
+    - id_scheme: "fast"(시트 지문 + 행.열) | "legacy"(기존 SHA-256 ID)
+    """
+    xlsx_path = str(Path(xlsx_path).resolve())
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        for ws in wb.worksheets:
+            sheet = ws.title
+            ws.reset_dimensions()  # 잘못 기록된 dimension 무시하고 실제 데이터까지 읽기
+            rows = ws.iter_rows(values_only=True)
+            first = next(rows, None)
+            if first is None:
+                continue
+            headers = _header_names(list(first))
+            mk = id_factory(id_scheme, xlsx_path, "xlsx", sheet)
+            for r_idx, values in enumerate(rows):
+                for c_idx, v in enumerate(values):
+                    text = _cell_text(v)
+                    if text is None:
+                        continue
+                    while c_idx >= len(headers):
+                        headers.append(f"Unnamed: {len(headers)}")
+                    yield {
+                        "id": mk(f"{r_idx+1}.{c_idx+1}", r_idx+1, c_idx+1, text[:50]),
+                        "source_path": xlsx_path,
+                        "source_type": "xlsx",
+                        "container": sheet,         # 시트명
+                        "row": r_idx + 1,          # 1-based
+                        "col": c_idx + 1,
+                        "header": headers[c_idx],
+                        "bbox": None,              # XLSX 좌표 개념 없음
+                        "text": text,
+                    }
+    finally:
+        wb.close()
+
+def xlsx_to_records_pandas(xlsx_path: str, id_scheme: str = DEFAULT_ID_SCHEME) -> Iterable[Dict]:
+    """기존 구현(시트마다 pd.read_excel로 전체 재파싱). 벤치마크/비교용."""
+    import pandas as pd
     xlsx_path = str(Path(xlsx_path).resolve())
     xls = pd.ExcelFile(xlsx_path)
     for sheet in xls.sheet_names:
         df = pd.read_excel(xlsx_path, sheet_name=sheet, dtype=str)
         headers = list(df.columns)
+        mk = id_factory(id_scheme, xlsx_path, "xlsx", sheet)
         for r_idx in range(df.shape[0]):
             for c_idx, colname in enumerate(headers):
                 val = df.iat[r_idx, c_idx]
                 if pd.isna(val):
                     continue
                 yield {
-                    "id": _mk_id(xlsx_path,"xlsx",sheet,r_idx+1,c_idx+1,str(val)[:50]),
+                    "id": mk(f"{r_idx+1}.{c_idx+1}", r_idx+1, c_idx+1, str(val)[:50]),
                     "source_path": xlsx_path,
                     "source_type": "xlsx",
                     "container": sheet,         # 시트명
@@ -46,10 +120,18 @@ def dump_csv(records: Iterable[Dict], out_path: str):
             row["bbox"] = json.dumps(row["bbox"], ensure_ascii=False) if row.get("bbox") is not None else ""
             w.writerow({k: row.get(k, "") for k in KEYS})
 
+def dump_jsonl_and_csv(records: Iterable[Dict], jsonl_path: str, csv_path: str) -> int:
+    """스트리밍 레코드를 한 번만 순회하며 JSONL/CSV를 동시에 기록. 반환: 레코드 수"""
+    return write_records(records, {"jsonl": jsonl_path, "csv": csv_path}, KEYS)
+
 if __name__ == "__main__":
-    ap = argparse.ArgumentParser(description="XLSX → intermediate(JSONL/CSV)")
+    ap = argparse.ArgumentParser(description="XLSX → intermediate(Parquet/JSONL/CSV)")
     ap.add_argument("xlsx", type=str)
     ap.add_argument("--out-prefix", default="")
+    ap.add_argument("--engine", choices=["stream","pandas"], default="stream",
+                    help="stream: openpyxl 읽기 전용 스트리밍(기본) | pandas: 기존 read_excel 방식")
+    ap.add_argument("--legacy-ids", action="store_true", help="기존 SHA-256 기반 ID 유지(이전 산출물과 ID 호환)")
+    ap.add_argument("--formats", default=",".join(DEFAULT_FORMATS), help="출력 포맷(쉼표 구분): parquet,jsonl,csv")
     args = ap.parse_args()
 
     p = Path(args.xlsx)
@@ -57,7 +139,10 @@ if __name__ == "__main__":
         raise SystemExit(f"입력 경로 없음: {p}")
 
     prefix = args.out_prefix or p.with_suffix("").as_posix()
-    recs = list(xlsx_to_records(str(p)))
-    dump_jsonl(recs, f"{prefix}.xlsx.intermediate.jsonl")
-    dump_csv(recs, f"{prefix}.xlsx.intermediate.csv")
-    print(f"[OK] XLSX → {len(recs)} rows")
+    to_records = xlsx_to_records if args.engine == "stream" else xlsx_to_records_pandas
+    id_scheme = "legacy" if args.legacy_ids else DEFAULT_ID_SCHEME
+    paths = output_paths(f"{prefix}.xlsx.intermediate", parse_formats(args.formats))
+    n = write_records(to_records(str(p), id_scheme), paths, KEYS)
+    print(f"[OK] XLSX → {n} rows")
+    for path in paths.values():
+        print(f" - {path}")